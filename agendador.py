@@ -0,0 +1,170 @@
+"""
+Agendador de tarefas por prioridade.
+
+Mantém as tarefas pendentes em um heap mínimo ordenado por
+(prioridade, data de criação, id), de modo que escolher a próxima tarefa
+custa O(log N) em vez de varrer a lista. As tarefas em andamento ficam nas
+reservas de cada trabalhador (reservas.py).
+
+Alterações de prioridade, exclusões e conclusões não mexem no heap: a entrada
+antiga é apenas marcada como inválida e descartada quando chega ao topo
+(invalidação preguiçosa). O agendador se inscreve como ouvinte do
+repositório de tarefas para receber essas alterações.
+
+A ordem do heap vem de `chave`; as outras políticas de escolha (politicas.py)
+trocam só a chave ou combinam vários agendadores.
+"""
+import heapq
+import itertools
+
+from modelo import CODIGO_STATUS
+
+PENDENTE = CODIGO_STATUS["Pendente"]
+
+
+class Agendador:
+    def __init__(self, origem=None):
+        """
+        Args:
+            origem (int): Código da origem das tarefas agendadas, ou None
+                para todas
+        """
+        self._heap = []
+        self._entradas = {}
+        self._sequencia = itertools.count()
+        self._repositorio = None
+        self._primeira_consulta = False
+        self._origem = origem
+
+    def carregar(self, repositorio):
+        """
+        Prepara o agendador para o conteúdo atual do repositório.
+
+        O heap só é montado no primeiro uso, em O(P) sobre as tarefas
+        pendentes. Até lá as alterações recebidas são ignoradas, pois já
+        estarão refletidas no repositório quando ele for lido.
+
+        Args:
+            repositorio (RepositorioTarefas): Repositório recém-carregado
+        """
+        self._heap = []
+        self._entradas = {}
+        self._repositorio = repositorio
+        self._primeira_consulta = True
+
+    def _montar(self):
+        repositorio, self._repositorio = self._repositorio, None
+        origem = self._origem
+        self._heap = [
+            self._nova_entrada(t) for t in repositorio.com_status("Pendente")
+            if origem is None or t.cod_origem == origem
+        ]
+        heapq.heapify(self._heap)
+
+    def chave(self, tarefa):
+        """
+        Ordem do heap, da tarefa mais urgente para a menos urgente. O código
+        da prioridade já segue a ordem Urgente < Alta < Média < Baixa.
+
+        Entre tarefas de mesma prioridade e origem, a chave deve seguir a
+        ordem de (criação, id); a primeira consulta (proxima) conta com isso.
+
+        Returns:
+            tuple: (prioridade, criação, id)
+        """
+        return tarefa.cod_prioridade, tarefa.criacao, tarefa.id
+
+    def _nova_entrada(self, tarefa):
+        # A tarefa fica por último: uma tarefa que volta a ficar pendente ganha
+        # uma entrada nova com a mesma chave da invalidada, e a sequência
+        # desempata as duas antes de a comparação chegar ao objeto da tarefa.
+        entrada = [*self.chave(tarefa), next(self._sequencia), tarefa]
+        self._entradas[tarefa.id] = entrada
+        return entrada
+
+    def adicionar(self, tarefa):
+        """
+        Registra uma tarefa nova ou que voltou a ser elegível.
+
+        Args:
+            tarefa (Tarefa): Tarefa a ser agendada
+        """
+        if self._repositorio is not None:
+            return
+        if tarefa.cod_status == PENDENTE and (self._origem is None or tarefa.cod_origem == self._origem):
+            heapq.heappush(self._heap, self._nova_entrada(tarefa))
+
+    def remover(self, tarefa):
+        """
+        Retira a tarefa do agendador, invalidando sua entrada no heap.
+
+        Args:
+            tarefa (Tarefa): Tarefa excluída, arquivada ou que mudou de estado
+        """
+        if self._repositorio is not None:
+            return
+        entrada = self._entradas.pop(tarefa.id, None)
+        if entrada is not None:
+            entrada[-1] = None
+            self._compactar_se_necessario()
+
+    def atualizar(self, tarefa):
+        """
+        Reagenda a tarefa após mudança de prioridade ou status.
+
+        Args:
+            tarefa (Tarefa): Tarefa alterada
+        """
+        self.remover(tarefa)
+        self.adicionar(tarefa)
+
+    def proxima(self):
+        """
+        Retorna a tarefa pendente mais urgente sem retirá-la do heap.
+
+        A primeira consulta depois da carga ainda não monta o heap se o
+        repositório tiver um atalho (Repositorio.primeiras_com_status): um
+        comando que só escolhe uma tarefa não decodifica as outras pendentes
+        do snapshot binário. Da segunda consulta em diante, usa o heap.
+
+        Returns:
+            Tarefa: Próxima tarefa, ou None se não houver pendentes
+        """
+        if self._repositorio is not None:
+            if self._primeira_consulta:
+                self._primeira_consulta = False
+                candidatas = self._repositorio.primeiras_com_status("Pendente")
+                if candidatas is not None:
+                    origem = self._origem
+                    return min(
+                        (t for t in candidatas if origem is None or t.cod_origem == origem),
+                        key=self.chave, default=None,
+                    )
+            self._montar()
+        heap = self._heap
+        while heap and heap[0][-1] is None:
+            heapq.heappop(heap)
+        return heap[0][-1] if heap else None
+
+    def ao_alterar(self, evento, tarefa, anterior):
+        """
+        Ouvinte do repositório: mantém o agendador em dia com as alterações.
+
+        Args:
+            evento (str): "adicionada", "prioridade", "status" ou "removida"
+            tarefa (Tarefa): Tarefa alterada
+            anterior: Valor anterior do campo alterado
+        """
+        if evento == "adicionada":
+            self.adicionar(tarefa)
+        elif evento == "removida":
+            self.remover(tarefa)
+        else:
+            self.atualizar(tarefa)
+
+    def _compactar_se_necessario(self):
+        # Evita que entradas inválidas se acumulem quando muitas tarefas
+        # mudam de prioridade sem nunca chegarem ao topo do heap.
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entradas):
+            self._heap = [e for e in self._heap if e[-1] is not None]
+            heapq.heapify(self._heap)
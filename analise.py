@@ -0,0 +1,256 @@
+"""
+Indicadores agregados sobre as tarefas ativas e arquivadas.
+
+As tarefas são carregadas em colunas NumPy (ids, códigos de prioridade,
+status e origem, e datas em microssegundos desde a época, como em
+modelo.Tarefa), e todos os agregados são calculados de forma vetorizada:
+contagens por grupo, vazão, percentis do tempo até a conclusão e
+histogramas diários de criação e conclusão.
+
+O NumPy é uma dependência opcional, usada apenas por este módulo.
+"""
+from modelo import CODIGO_ORIGEM, CODIGO_PRIORIDADE, CODIGO_STATUS, ORIGENS, PRIORIDADES, STATUS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SEM_DATA = -1
+# Tarefas que foram concluídas: as arquivadas saem das concluídas. As
+# excluídas podem ter data de conclusão, mas não contam.
+STATUS_CONCLUIDAS = (CODIGO_STATUS["Concluída"], CODIGO_STATUS["Arquivado"])
+MICROS_POR_DIA = 86_400_000_000
+
+ROTULOS = {"prioridade": PRIORIDADES, "status": STATUS, "origem": ORIGENS}
+
+
+def _exigir_numpy():
+    if np is None:
+        raise RuntimeError("O módulo de análise precisa do NumPy (pip install numpy).")
+
+
+class Colunas:
+    """
+    Tarefas em formato colunar.
+
+    Atributos:
+        id, prioridade, status, origem, criacao, conclusao: arrays NumPy do
+        mesmo tamanho; `conclusao` vale SEM_DATA nas tarefas não concluídas
+    """
+
+    def __init__(self, id, prioridade, status, origem, criacao, conclusao):
+        self.id = id
+        self.prioridade = prioridade
+        self.status = status
+        self.origem = origem
+        self.criacao = criacao
+        self.conclusao = conclusao
+
+    def __len__(self):
+        return len(self.id)
+
+    @classmethod
+    def de_tarefas(cls, tarefas):
+        """
+        Monta as colunas a partir de objetos Tarefa (repositório ativo).
+
+        Args:
+            tarefas (iterable): Tarefas em memória
+
+        Returns:
+            Colunas: Colunas com uma posição por tarefa
+        """
+        _exigir_numpy()
+        tarefas = list(tarefas)
+        n = len(tarefas)
+        return cls(
+            np.fromiter((t.id for t in tarefas), dtype=np.int64, count=n),
+            np.fromiter((t.cod_prioridade for t in tarefas), dtype=np.int8, count=n),
+            np.fromiter((t.cod_status for t in tarefas), dtype=np.int8, count=n),
+            np.fromiter((t.cod_origem for t in tarefas), dtype=np.int8, count=n),
+            np.fromiter((t.criacao for t in tarefas), dtype=np.int64, count=n),
+            np.fromiter((SEM_DATA if t.conclusao is None else t.conclusao for t in tarefas), dtype=np.int64, count=n),
+        )
+
+    @classmethod
+    def de_registros(cls, registros):
+        """
+        Monta as colunas a partir de registros JSON (arquivo de arquivadas).
+
+        As datas ISO 8601 são convertidas de uma vez pelo NumPy, sem chamar
+        datetime.fromisoformat registro a registro.
+
+        Args:
+            registros (iterable): Tarefas no formato JSON
+
+        Returns:
+            Colunas: Colunas com uma posição por registro
+        """
+        _exigir_numpy()
+        ids, prioridades, status, origens, criacoes, conclusoes = [], [], [], [], [], []
+        for r in registros:
+            ids.append(r["id"])
+            prioridades.append(CODIGO_PRIORIDADE[r["prioridade"]])
+            status.append(CODIGO_STATUS[r["status"]])
+            origens.append(CODIGO_ORIGEM[r["origem"]])
+            criacoes.append(r["data_criacao"])
+            conclusoes.append(r.get("data_conclusao") or "NaT")
+        conclusao = np.array(conclusoes, dtype="datetime64[us]")
+        conclusao_micros = conclusao.astype(np.int64)
+        conclusao_micros[np.isnat(conclusao)] = SEM_DATA
+        return cls(
+            np.array(ids, dtype=np.int64),
+            np.array(prioridades, dtype=np.int8),
+            np.array(status, dtype=np.int8),
+            np.array(origens, dtype=np.int8),
+            np.array(criacoes, dtype="datetime64[us]").astype(np.int64),
+            conclusao_micros,
+        )
+
+    @classmethod
+    def concatenar(cls, *partes):
+        """
+        Junta várias colunas em uma só (por exemplo, ativas + arquivadas).
+
+        Returns:
+            Colunas: Colunas com todas as posições das partes
+        """
+        _exigir_numpy()
+        campos = ("id", "prioridade", "status", "origem", "criacao", "conclusao")
+        return cls(*(np.concatenate([getattr(p, campo) for p in partes]) for campo in campos))
+
+
+def carregar(tarefas, arquivadas=None):
+    """
+    Carrega as tarefas ativas e, opcionalmente, as arquivadas em colunas.
+
+    Args:
+        tarefas (iterable): Tarefas do repositório ativo
+        arquivadas (iterable): Registros JSON das tarefas arquivadas e
+            excluídas (Armazenamento.ler_arquivadas)
+
+    Returns:
+        Colunas: Todas as tarefas em formato colunar
+    """
+    ativas = Colunas.de_tarefas(tarefas)
+    if arquivadas is None:
+        return ativas
+    return Colunas.concatenar(ativas, Colunas.de_registros(arquivadas))
+
+
+def contar_por(colunas, campo):
+    """
+    Conta as tarefas por prioridade, status ou origem.
+
+    Args:
+        colunas (Colunas): Tarefas em formato colunar
+        campo (str): "prioridade", "status" ou "origem"
+
+    Returns:
+        dict: Rótulo -> quantidade
+    """
+    rotulos = ROTULOS[campo]
+    contagem = np.bincount(getattr(colunas, campo), minlength=len(rotulos))
+    return dict(zip(rotulos, contagem.tolist()))
+
+
+def _concluidas(colunas):
+    return np.isin(colunas.status, STATUS_CONCLUIDAS) & (colunas.conclusao != SEM_DATA)
+
+
+def tempos_conclusao(colunas):
+    """
+    Tempo entre criação e conclusão, em segundos, das tarefas concluídas.
+
+    Returns:
+        numpy.ndarray: Um valor float64 por tarefa concluída
+    """
+    concluidas = _concluidas(colunas)
+    return (colunas.conclusao[concluidas] - colunas.criacao[concluidas]) / 1_000_000
+
+
+def percentis_conclusao(colunas, percentis=(50, 90, 99), por=None):
+    """
+    Percentis do tempo até a conclusão, no total ou por grupo.
+
+    Args:
+        colunas (Colunas): Tarefas em formato colunar
+        percentis (tuple): Percentis desejados
+        por (str): None, "prioridade", "status" ou "origem"
+
+    Returns:
+        dict: Percentil -> segundos; com `por`, rótulo -> (percentil -> segundos)
+    """
+    concluidas = _concluidas(colunas)
+    duracao = tempos_conclusao(colunas)
+
+    def calcular(valores):
+        if not len(valores):
+            return {p: None for p in percentis}
+        return dict(zip(percentis, np.percentile(valores, percentis).tolist()))
+
+    if por is None:
+        return calcular(duracao)
+    grupos = getattr(colunas, por)[concluidas]
+    return {rotulo: calcular(duracao[grupos == codigo]) for codigo, rotulo in enumerate(ROTULOS[por])}
+
+
+def resumo_por(colunas, campo):
+    """
+    Total, concluídas, vazão diária e tempo médio de conclusão por grupo.
+
+    A vazão é o número de conclusões dividido pelo número de dias entre a
+    primeira e a última conclusão registradas.
+
+    Args:
+        colunas (Colunas): Tarefas em formato colunar
+        campo (str): "prioridade", "status" ou "origem"
+
+    Returns:
+        dict: Rótulo -> {"total", "concluidas", "vazao_diaria", "tempo_medio"}
+    """
+    rotulos = ROTULOS[campo]
+    codigos = getattr(colunas, campo)
+    concluidas = _concluidas(colunas)
+    total = np.bincount(codigos, minlength=len(rotulos))
+    n_concluidas = np.bincount(codigos[concluidas], minlength=len(rotulos))
+    duracao = tempos_conclusao(colunas)
+    soma = np.bincount(codigos[concluidas], weights=duracao, minlength=len(rotulos))
+    if concluidas.any():
+        fim = colunas.conclusao[concluidas]
+        dias = max((fim.max() - fim.min()) / MICROS_POR_DIA, 1.0)
+    else:
+        dias = 1.0
+    resumo = {}
+    for codigo, rotulo in enumerate(rotulos):
+        n = int(n_concluidas[codigo])
+        resumo[rotulo] = {
+            "total": int(total[codigo]),
+            "concluidas": n,
+            "vazao_diaria": n / dias,
+            "tempo_medio": float(soma[codigo] / n) if n else None,
+        }
+    return resumo
+
+
+def histograma_diario(colunas, campo="criacao"):
+    """
+    Quantidade de tarefas criadas ou concluídas por dia.
+
+    Args:
+        colunas (Colunas): Tarefas em formato colunar
+        campo (str): "criacao" ou "conclusao"
+
+    Returns:
+        tuple: (dias como numpy datetime64[D], quantidades)
+    """
+    datas = getattr(colunas, campo)
+    datas = datas[datas != SEM_DATA]
+    if not len(datas):
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64)
+    dias = datas // MICROS_POR_DIA
+    primeiro = dias.min()
+    contagem = np.bincount(dias - primeiro)
+    eixo = (np.arange(len(contagem)) + primeiro).astype("datetime64[D]")
+    return eixo, contagem
@@ -0,0 +1,499 @@
+"""
+Armazenamento das tarefas ativas e arquivadas.
+
+Armazenamento define o que o restante do programa usa da camada de dados:
+o repositório das tarefas ativas (atributo `tarefas`), as consultas de que
+as operações dependem (tarefa em andamento, próxima pendente, concluídas
+antes de uma data), o arquivo de arquivadas e as transações.
+
+ArmazenamentoJSON é a implementação original: snapshot em tarefas.json (ou
+no snapshot binário), diário de alterações, agendador, índice de conclusão e
+índice de busca (montado na primeira busca) em memória e arquivadas em JSONL,
+particionadas por mês e status (arquivo.py).
+Ele só pode ser aberto por um processo de cada vez (trava de arquivo); vários
+trabalhadores em processos separados usam a implementação em SQLite, em
+armazenamento_sqlite.py. As duas podem publicar cada alteração em um fluxo
+de eventos (eventos.py).
+"""
+import json
+import os
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from agendador import Agendador
+from arquivamento import IndiceConclusao
+from arquivo import ArquivoTarefas
+from busca import IndiceTextual
+from diario import Diario
+from instantaneo import InstantaneoBinario, gravar as gravar_instantaneo
+from modelo import CODIGO_PRIORIDADE, CODIGO_STATUS, Tarefa
+from paginacao import IndiceOrdenado
+from repositorio import RepositorioTarefas
+from reservas import Reservas
+
+
+def gravar_json(caminho, tarefas):
+    """
+    Grava as tarefas em JSON de forma atômica.
+
+    Grava em um arquivo temporário e troca de uma vez, para que uma queda no
+    meio da gravação não deixe um snapshot pela metade.
+
+    Args:
+        caminho (str): Caminho do arquivo
+        tarefas (iterable): Tarefas a gravar
+    """
+    data = [t.para_json() for t in tarefas]
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class ArmazenamentoOcupado(RuntimeError):
+    """Os arquivos já estão abertos por outro processo."""
+
+
+class Armazenamento:
+    tarefas = None
+    destino_migracao = None
+    # Fluxo de alterações (eventos.FluxoEventos), se houver.
+    eventos = None
+    # Se transacao() desfaz as alterações quando o bloco termina com erro.
+    atomico = False
+
+    def carregar(self, manutencao=True):
+        """
+        Lê os dados gravados e prepara as consultas.
+
+        Args:
+            manutencao (bool): Também migra as arquivadas dos formatos
+                anteriores e comprime as partições dos meses encerrados, o
+                que abre todas as partições; os comandos que só leem as
+                tarefas ativas passam False
+
+        Returns:
+            int: Quantidade de tarefas migradas de um formato anterior
+        """
+        raise NotImplementedError
+
+    def salvar(self):
+        """Grava um ponto de consistência completo (snapshot ou checkpoint)."""
+        raise NotImplementedError
+
+    def persistir(self):
+        """Grava o que for necessário antes de um processo curto terminar."""
+        self.fechar()
+
+    def fechar(self):
+        """Libera arquivos e conexões."""
+
+    def transacao(self):
+        """
+        Agrupa alterações: todas são gravadas juntas ao final do bloco.
+        """
+        return self._lote_eventos()
+
+    def _lote_eventos(self, atomico=False):
+        # Os eventos da transação vão para o fluxo de uma vez, no final.
+        if self.eventos is None:
+            return nullcontext(self)
+        return self.eventos.em_lote(atomico)
+
+    def proxima_pendente(self):
+        """
+        Returns:
+            Tarefa: Tarefa pendente mais urgente, ou None
+        """
+        raise NotImplementedError
+
+    def proximo_id(self, minimo, quantidade=1):
+        """
+        Primeiro de `quantidade` IDs livres e consecutivos a partir de
+        `minimo`, considerando tarefas gravadas por outros processos. Chame
+        dentro de `transacao()`, junto com a gravação das tarefas que usam
+        os IDs.
+
+        Args:
+            minimo (int): Próximo ID conhecido por este processo
+            quantidade (int): IDs necessários
+
+        Returns:
+            int: ID a usar
+        """
+        return minimo
+
+    def reserva(self, trabalhador):
+        """
+        Args:
+            trabalhador (str): Identificador do trabalhador
+
+        Returns:
+            Tarefa: Tarefa em andamento reservada para o trabalhador, ou None
+        """
+        raise NotImplementedError
+
+    def reservar(self, trabalhador, tarefa, expira):
+        """
+        Reserva uma tarefa em andamento para o trabalhador, substituindo a
+        reserva anterior dele.
+
+        Args:
+            trabalhador (str): Identificador do trabalhador
+            tarefa (Tarefa): Tarefa com status "Fazendo"
+            expira (int): Expiração em microssegundos desde a época, ou None
+        """
+        raise NotImplementedError
+
+    def liberar(self, trabalhador):
+        """
+        Desfaz a reserva do trabalhador, se houver.
+
+        Args:
+            trabalhador (str): Identificador do trabalhador
+        """
+        raise NotImplementedError
+
+    def reservas_vencidas(self, agora):
+        """
+        Args:
+            agora (int): Microssegundos desde a época
+
+        Returns:
+            list: Pares (trabalhador, tarefa) das reservas vencidas
+        """
+        raise NotImplementedError
+
+    def sem_reserva(self):
+        """
+        Returns:
+            list: Tarefas em andamento que não estão reservadas
+        """
+        raise NotImplementedError
+
+    def concluidas_antes(self, limite):
+        """
+        Tarefas concluídas antes de `limite`, que deixam de ser oferecidas
+        pelas próximas chamadas enquanto continuarem concluídas.
+
+        Args:
+            limite (int): Microssegundos desde a época (modelo.para_epoca)
+
+        Returns:
+            list: Tarefas da conclusão mais antiga para a mais nova
+        """
+        raise NotImplementedError
+
+    def arquivar(self, tarefas):
+        """
+        Grava tarefas arquivadas ou excluídas no arquivo de arquivadas.
+
+        Args:
+            tarefas (list): Tarefas a gravar
+        """
+        raise NotImplementedError
+
+    def ler_arquivadas(self, **filtros):
+        """
+        Percorre as tarefas arquivadas; aceita os filtros de
+        ArquivoTarefas.ler.
+
+        Yields:
+            dict: Tarefa arquivada, com as datas em ISO 8601
+        """
+        raise NotImplementedError
+
+    def particoes_arquivadas(self):
+        """
+        Resumo das arquivadas por mês e status.
+
+        Returns:
+            list: Dicionários com mes, status, quantidade e bytes
+        """
+        raise NotImplementedError
+
+    def exportar_arquivadas(self, caminho, ate=None):
+        """
+        Exporta as arquivadas de meses anteriores a `ate` para um JSONL.
+
+        Args:
+            caminho (str): Arquivo de destino
+            ate (str): Mês (AAAA-MM) exclusivo, ou None para todas
+
+        Returns:
+            int: Quantidade de tarefas exportadas
+        """
+        raise NotImplementedError
+
+    def podar_arquivadas(self, ate):
+        """
+        Apaga as arquivadas de meses anteriores a `ate`.
+
+        Args:
+            ate (str): Mês (AAAA-MM) exclusivo
+
+        Returns:
+            int: Quantidade de tarefas apagadas
+        """
+        raise NotImplementedError
+
+    def versao(self):
+        """
+        Marcas que mudam a cada alteração, usadas para invalidar os
+        relatórios em cache (cache.py).
+
+        Returns:
+            tuple: (ativas, arquivadas, externa), em que `externa` só muda
+                quando outro processo altera o armazenamento
+        """
+        raise NotImplementedError
+
+    def pagina(self, ordem, cursor=None, limite=20, status=None, prioridade=None):
+        """
+        Uma página das tarefas ativas, a partir de um cursor; as ordens e as
+        chaves estão descritas em paginacao.py.
+
+        Args:
+            ordem (str): "id", "prioridade" ou "data"
+            cursor (tuple): Cursor devolvido pela página anterior, ou None
+            limite (int): Máximo de tarefas na página; abaixo de 1, a página
+                vem vazia e sem cursor
+            status (str): Mantém só as tarefas com este status
+            prioridade (str): Mantém só as tarefas com esta prioridade
+
+        Returns:
+            tuple: (tarefas, cursor da próxima página ou None)
+        """
+        raise NotImplementedError
+
+    def buscar(self, consulta, modo="ranqueado", status=None, prioridade=None, limite=20):
+        """
+        Busca no título e na descrição das tarefas ativas e arquivadas; a
+        sintaxe da consulta está descrita em busca.py.
+
+        Args:
+            consulta (str): Palavras a procurar
+            modo (str): "ranqueado" ou "booleano"
+            status (str): Mantém só as tarefas com este status
+            prioridade (str): Mantém só as tarefas com esta prioridade
+            limite (int): Máximo de tarefas devolvidas
+
+        Returns:
+            list: Tarefas encontradas
+        """
+        raise NotImplementedError
+
+    def exportar_json(self, caminho):
+        """
+        Exporta as tarefas ativas para um arquivo JSON.
+
+        Args:
+            caminho (str): Caminho do arquivo
+        """
+        gravar_json(caminho, self.tarefas)
+
+
+class ArmazenamentoJSON(Armazenamento):
+    def __init__(self, arquivo_tarefas, arquivo_instantaneo, arquivo_diario, diretorio_arquivadas,
+                 arquivos_arquivadas_antigos, arquivo_reservas, formato="json", usar_diario=True,
+                 limite_compactacao=10000, agendador=None, eventos=None):
+        """
+        Args:
+            arquivo_tarefas (str): Snapshot JSON
+            arquivo_instantaneo (str): Snapshot binário
+            arquivo_diario (str): Diário de alterações
+            diretorio_arquivadas (str): Partições das arquivadas
+            arquivos_arquivadas_antigos (tuple): Arquivadas nos formatos anteriores, a migrar
+            arquivo_reservas (str): Reservas dos trabalhadores
+            formato (str): "json" ou "binario", formato do snapshot
+            usar_diario (bool): Anexa cada alteração ao diário
+            limite_compactacao (int): Registros no diário que disparam um snapshot
+            agendador: Política de escolha da próxima pendente (politicas.py);
+                por padrão, a ordem estrita de Agendador
+            eventos (FluxoEventos): Fluxo que recebe cada alteração, ou None
+        """
+        self.arquivo_tarefas = arquivo_tarefas
+        self.arquivo_instantaneo = arquivo_instantaneo
+        self.arquivos_arquivadas_antigos = arquivos_arquivadas_antigos
+        self.formato = formato
+        self.usar_diario = usar_diario
+        self.limite_compactacao = limite_compactacao
+        self.destino_migracao = diretorio_arquivadas
+        self.tarefas = RepositorioTarefas()
+        self.agendador = Agendador() if agendador is None else agendador
+        self.indice_conclusao = IndiceConclusao()
+        self.diario = Diario(arquivo_diario)
+        self.arquivo = ArquivoTarefas(diretorio_arquivadas)
+        self.reservas = Reservas(arquivo_reservas)
+        self.busca = IndiceTextual()
+        self.ordens = IndiceOrdenado(self.tarefas)
+        self._trava = None
+        self.tarefas.inscrever(self.agendador.ao_alterar)
+        self.tarefas.inscrever(self.indice_conclusao.ao_alterar)
+        self.tarefas.inscrever(self.busca.ao_alterar)
+        self.tarefas.inscrever(self.ordens.ao_alterar)
+        if usar_diario:
+            self.tarefas.inscrever(self._registrar_alteracao)
+        self.eventos = eventos
+        if eventos is not None:
+            self.tarefas.inscrever(eventos.ao_alterar)
+
+    def _registrar_alteracao(self, evento, tarefa, anterior):
+        self.diario.ao_alterar(evento, tarefa, anterior)
+        if self.diario.registros >= self.limite_compactacao:
+            self.salvar()
+
+    def _travar(self):
+        if fcntl is None or self._trava is not None:
+            return
+        trava = open(self.arquivo_tarefas + ".lock", "a")
+        try:
+            fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            trava.close()
+            raise ArmazenamentoOcupado(
+                f"{self.arquivo_tarefas} já está aberto por outro processo; "
+                "para vários trabalhadores use TAREFAS_BACKEND=sqlite."
+            )
+        self._trava = trava
+
+    def carregar(self, manutencao=True):
+        self._travar()
+        snapshot = self._snapshot_mais_novo()
+        if snapshot == self.arquivo_instantaneo:
+            self.tarefas.carregar_instantaneo(InstantaneoBinario(self.arquivo_instantaneo))
+        elif snapshot == self.arquivo_tarefas:
+            with open(self.arquivo_tarefas, "r", encoding="utf-8") as f:
+                self.tarefas.carregar(Tarefa.de_json(t) for t in json.load(f))
+        else:
+            with open(self.arquivo_tarefas, "w", encoding="utf-8") as f:
+                json.dump([], f)
+        if self.usar_diario:
+            self.diario.reproduzir(self.tarefas)
+        migradas = 0
+        if manutencao:
+            migradas = self.arquivo.migrar(*self.arquivos_arquivadas_antigos)
+            self.arquivo.fechar_antigas()
+        self.reservas.carregar()
+        self.agendador.carregar(self.tarefas)
+        self.indice_conclusao.carregar(self.tarefas)
+        return migradas
+
+    def _snapshot_mais_novo(self):
+        # salvar grava só o formato escolhido e trunca o diário: depois de
+        # uma troca de formato, o arquivo do outro formato fica para trás.
+        # Vale o mais novo; no empate, o do formato escolhido.
+        escolhido, outro = self.arquivo_tarefas, self.arquivo_instantaneo
+        if self.formato == "binario":
+            escolhido, outro = outro, escolhido
+        existentes = [c for c in (escolhido, outro) if os.path.exists(c)]
+        return max(existentes, key=lambda c: os.stat(c).st_mtime_ns, default=None)
+
+    def salvar(self):
+        if self.formato == "binario":
+            gravar_instantaneo(self.arquivo_instantaneo, self.tarefas)
+        else:
+            gravar_json(self.arquivo_tarefas, self.tarefas)
+        self.arquivo.gravar_indices()
+        if self.usar_diario:
+            self.diario.truncar()
+
+    def persistir(self):
+        if not self.usar_diario or self.diario.registros >= self.limite_compactacao:
+            self.salvar()
+        self.fechar()
+
+    def fechar(self):
+        self.arquivo.gravar_indices()
+        self.diario.fechar()
+        if self.eventos is not None:
+            self.eventos.fechar()
+        if self._trava is not None:
+            self._trava.close()
+            self._trava = None
+
+    @contextmanager
+    def transacao(self):
+        # O diário é gravado antes dos eventos: quem lê o fluxo nunca vê uma
+        # alteração que ainda pode se perder.
+        with self._lote_eventos(), (self.diario.em_lote() if self.usar_diario else nullcontext()):
+            yield self
+
+    def proxima_pendente(self):
+        return self.agendador.proxima()
+
+    def _em_andamento(self, id_tarefa):
+        tarefa = self.tarefas.obter(id_tarefa) if id_tarefa is not None else None
+        return tarefa if tarefa is not None and tarefa.status == "Fazendo" else None
+
+    def reserva(self, trabalhador):
+        return self._em_andamento(self.reservas.id_de(trabalhador))
+
+    def reservar(self, trabalhador, tarefa, expira):
+        self.reservas.reservar(trabalhador, tarefa.id, expira)
+
+    def liberar(self, trabalhador):
+        self.reservas.liberar(trabalhador)
+
+    def reservas_vencidas(self, agora):
+        vencidas = []
+        for trabalhador, id_tarefa in self.reservas.vencidas(agora):
+            tarefa = self._em_andamento(id_tarefa)
+            if tarefa is None:
+                self.reservas.liberar(trabalhador)
+            else:
+                vencidas.append((trabalhador, tarefa))
+        return vencidas
+
+    def sem_reserva(self):
+        return [t for t in self.tarefas.com_status("Fazendo") if t.id not in self.reservas]
+
+    def concluidas_antes(self, limite):
+        return self.indice_conclusao.vencidas(limite)
+
+    def arquivar(self, tarefas):
+        self.arquivo.anexar_lote(tarefas)
+
+    def ler_arquivadas(self, **filtros):
+        return self.arquivo.ler(**filtros)
+
+    def particoes_arquivadas(self):
+        return [
+            {"mes": p.mes, "status": p.status, "quantidade": p.quantidade,
+             "bytes": os.path.getsize(p.caminho_comprimido if p.comprimida else p.caminho)}
+            for p in self.arquivo.particoes() if p.quantidade
+        ]
+
+    def exportar_arquivadas(self, caminho, ate=None):
+        return self.arquivo.exportar(caminho, ate)
+
+    def podar_arquivadas(self, ate):
+        apagadas = self.arquivo.podar(ate)
+        if apagadas:
+            self.busca.descartar()
+        return apagadas
+
+    def versao(self):
+        # A trava garante que só este processo altera os arquivos.
+        return self.tarefas.versao, self.arquivo.versao, 0
+
+    def pagina(self, ordem, cursor=None, limite=20, status=None, prioridade=None):
+        return self.ordens.pagina(ordem, cursor, limite, status, prioridade)
+
+    def buscar(self, consulta, modo="ranqueado", status=None, prioridade=None, limite=20):
+        # O índice só é montado na primeira busca, para não pesar na carga;
+        # dali em diante acompanha o repositório pelas notificações.
+        if not self.busca.construido:
+            self.busca.carregar(self.tarefas, (Tarefa.de_json(t) for t in self.arquivo.ler()))
+        return self.busca.buscar(
+            consulta, modo,
+            None if status is None else CODIGO_STATUS[status],
+            None if prioridade is None else CODIGO_PRIORIDADE[prioridade],
+            limite,
+        )
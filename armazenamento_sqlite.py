@@ -0,0 +1,659 @@
+"""
+Armazenamento das tarefas em SQLite (módulo sqlite3 da biblioteca padrão).
+
+As tarefas ativas e as arquivadas ficam em duas tabelas de um único arquivo,
+com os mesmos códigos inteiros e datas em microssegundos de modelo.Tarefa.
+Em vez de manter heaps e índices em memória, cada consulta usa um índice do
+banco:
+
+    idx_tarefas_fila       (status, prioridade, criacao, id)  próxima pendente,
+                                                               filtros por status
+    idx_tarefas_urgencia   (prioridade, criacao)              filtros por prioridade,
+                                                               páginas por prioridade
+    idx_tarefas_criacao    (criacao)                          páginas por data
+    idx_tarefas_conclusao  (status, conclusao)                concluídas a arquivar
+    idx_tarefas_politica   (status, expressão da política)    próxima pendente com
+                                                               envelhecimento ou prazo
+    idx_tarefas_origem     (status, origem, prioridade, ...)  próxima pendente de cada
+                                                               origem (fila justa)
+    idx_arquivadas_filtro  (status, prioridade, origem)       relatório de arquivadas
+    idx_arquivadas_id      (id)
+    idx_arquivadas_criacao (criacao)                          relatórios por período
+    idx_arquivadas_conclusao (conclusao)
+    idx_arquivadas_mes     (COALESCE(conclusao, criacao))      resumo, exportação e
+                                                               poda por mês
+    idx_reservas_expira    (expira)                           reservas vencidas
+    busca                  (FTS5 sobre titulo e descricao)    busca textual
+
+As reservas dos trabalhadores ficam na tabela `reservas`, com no máximo uma
+linha por trabalhador e por tarefa. Reservas de tarefas que deixaram de
+estar em andamento são ignoradas nas consultas e substituídas na próxima
+reserva. Vários processos podem usar o mesmo banco: `transacao()` começa com
+BEGIN IMMEDIATE, que serializa as reservas entre eles.
+
+Cada alteração fora de uma transação é gravada sozinha (autocommit); dentro
+de `transacao()` tudo é confirmado ou desfeito junto. O banco usa o modo WAL,
+de modo que leituras não esperam pelas gravações.
+
+A tabela `busca` é mantida por esta classe, e não por gatilhos: no FTS5 cada
+comando de um gatilho grava no índice o buffer da transação, e arquivar
+custaria várias vezes mais. A linha de uma tarefa ativa tem rowid igual ao
+ID e a de uma arquivada, o rowid dela em `arquivadas` menos
+DESLOCAMENTO_BUSCA (negativo, e crescente na ordem do arquivamento: o FTS5
+também grava o buffer a cada rowid fora de ordem). Pelo mesmo motivo, as
+tarefas removidas dentro de uma transação só saem da busca no COMMIT, em
+ordem de ID. As arquivadas, como no índice do ArmazenamentoJSON, só são
+indexadas na primeira busca depois de arquivadas, para não pesar no
+arquivamento: `busca_arquivadas` guarda o último rowid já indexado. Em
+bancos criados antes da busca, as ativas são indexadas ao abrir.
+O título e a descrição entram na tabela já quebrados por busca.palavras
+(função SQL `palavras_busca`, registrada em cada conexão), e as consultas
+passam pelo mesmo busca.analisar: o FTS5 só separa as palavras nos espaços
+e devolve os mesmos resultados do índice do ArmazenamentoJSON. Uma tabela
+`busca` de outra definição (a de antes, que quebrava o texto cru com o
+unicode61) é recriada ao abrir.
+
+As arquivadas não guardam a data do arquivamento: no banco, o mês de uma
+arquivada (resumo, exportação e poda) é o da conclusão ou, sem ela, o da
+criação, o mesmo critério que o ArmazenamentoJSON usa ao migrar arquivos
+antigos para as partições.
+"""
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+from armazenamento import Armazenamento
+from busca import analisar, palavras
+from paginacao import CHAVES
+from politicas import Estrita, FilaJusta
+from modelo import CODIGO_ORIGEM, CODIGO_PRIORIDADE, CODIGO_STATUS, ORIGENS, STATUS, Tarefa, para_epoca
+from repositorio import Repositorio
+
+PENDENTE = CODIGO_STATUS["Pendente"]
+FAZENDO = CODIGO_STATUS["Fazendo"]
+CONCLUIDA = CODIGO_STATUS["Concluída"]
+
+COLUNAS = "id, titulo, descricao, prioridade, status, origem, criacao, conclusao"
+COLUNAS_T = ", ".join("t." + coluna for coluna in COLUNAS.split(", "))
+# Colunas das chaves de paginacao.CHAVES; as páginas comparam linhas inteiras,
+# (prioridade, criacao, id) > (?, ?, ?), e seguem o índice da ordem.
+COLUNAS_ORDEM = {"id": "id", "prioridade": "prioridade, criacao, id", "data": "criacao, id"}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tarefas (
+    id INTEGER PRIMARY KEY,
+    titulo TEXT NOT NULL,
+    descricao TEXT NOT NULL,
+    prioridade INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    origem INTEGER NOT NULL,
+    criacao INTEGER NOT NULL,
+    conclusao INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_tarefas_fila ON tarefas (status, prioridade, criacao, id);
+DROP INDEX IF EXISTS idx_tarefas_prioridade;
+CREATE INDEX IF NOT EXISTS idx_tarefas_urgencia ON tarefas (prioridade, criacao);
+CREATE INDEX IF NOT EXISTS idx_tarefas_criacao ON tarefas (criacao);
+CREATE INDEX IF NOT EXISTS idx_tarefas_conclusao ON tarefas (status, conclusao);
+CREATE TABLE IF NOT EXISTS arquivadas (
+    id INTEGER NOT NULL,
+    titulo TEXT NOT NULL,
+    descricao TEXT NOT NULL,
+    prioridade INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    origem INTEGER NOT NULL,
+    criacao INTEGER NOT NULL,
+    conclusao INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_arquivadas_filtro ON arquivadas (status, prioridade, origem);
+CREATE INDEX IF NOT EXISTS idx_arquivadas_id ON arquivadas (id);
+CREATE INDEX IF NOT EXISTS idx_arquivadas_criacao ON arquivadas (criacao);
+CREATE INDEX IF NOT EXISTS idx_arquivadas_conclusao ON arquivadas (conclusao);
+CREATE INDEX IF NOT EXISTS idx_arquivadas_mes ON arquivadas (COALESCE(conclusao, criacao));
+CREATE TABLE IF NOT EXISTS reservas (
+    trabalhador TEXT PRIMARY KEY,
+    id_tarefa INTEGER NOT NULL UNIQUE,
+    expira INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_reservas_expira ON reservas (expira);
+"""
+
+DESLOCAMENTO_BUSCA = 1 << 62
+# As palavras de busca.palavras são só caracteres \w; o "_" precisa entrar em
+# tokenchars para o unicode61 não quebrá-las de novo. Status e prioridade
+# ficam fora: no FTS5, alterar uma coluna regrava a linha inteira no índice,
+# e cada conclusão ou arquivamento pagaria por isso; os filtros da busca usam
+# as tabelas das tarefas.
+TABELA_BUSCA = """CREATE VIRTUAL TABLE busca USING fts5(
+        titulo, descricao,
+        tokenize = "unicode61 remove_diacritics 0 tokenchars '_'"
+    )"""
+TABELA_ARQUIVADAS = "CREATE TABLE busca_arquivadas (ate INTEGER NOT NULL)"
+# Criado em uma transação só quando a tabela ainda não existe, junto com a
+# indexação das tarefas ativas já gravadas.
+ESQUEMA_BUSCA = (
+    TABELA_BUSCA,
+    TABELA_ARQUIVADAS,
+    "INSERT INTO busca_arquivadas (ate) VALUES (0)",
+    "INSERT INTO busca (rowid, titulo, descricao) "
+    "SELECT id, palavras_busca(titulo), palavras_busca(descricao) FROM tarefas ORDER BY id",
+)
+INSERIR_BUSCA = "INSERT INTO busca (rowid, titulo, descricao) VALUES (?, palavras_busca(?), palavras_busca(?))"
+# Arquivadas depois do último rowid indexado.
+INDEXAR_ARQUIVADAS = (
+    "INSERT INTO busca (rowid, titulo, descricao) "
+    f"SELECT rowid - {DESLOCAMENTO_BUSCA}, palavras_busca(titulo), palavras_busca(descricao) FROM arquivadas "
+    "WHERE rowid > ? ORDER BY rowid"
+)
+# Os gatilhos são das versões que mantinham a busca por eles.
+DESFAZER_BUSCA = (
+    "DROP TRIGGER IF EXISTS busca_tarefas_inserir",
+    "DROP TRIGGER IF EXISTS busca_tarefas_alterar",
+    "DROP TRIGGER IF EXISTS busca_tarefas_remover",
+    "DROP TRIGGER IF EXISTS busca_arquivadas_inserir",
+    "DROP TRIGGER IF EXISTS busca_arquivadas_remover",
+    "DROP TABLE IF EXISTS busca",
+    "DROP TABLE IF EXISTS busca_arquivadas",
+)
+# Fila justa (politicas.FilaJusta): etiqueta de cada origem e, na linha
+# VIRTUAL, o tempo virtual.
+ESQUEMA_JUSTA = """
+CREATE TABLE IF NOT EXISTS filas_origem (
+    origem INTEGER PRIMARY KEY,
+    etiqueta REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tarefas_origem ON tarefas (status, origem, prioridade, criacao, id);
+"""
+VIRTUAL = -1
+COLUNAS_BUSCA = ", ".join(f"CASE WHEN t.id IS NULL THEN a.{c} ELSE t.{c} END" for c in COLUNAS.split(", "))
+
+
+def _palavras_busca(texto):
+    return " ".join(palavras(texto or ""))
+
+
+def _inicio_mes(mes):
+    return para_epoca(datetime.strptime(mes, "%Y-%m"))
+
+
+def _linha(tarefa):
+    return (
+        tarefa.id, tarefa.titulo, tarefa.descricao, tarefa.cod_prioridade,
+        tarefa.cod_status, tarefa.cod_origem, tarefa.criacao, tarefa.conclusao,
+    )
+
+
+class RepositorioSQLite(Repositorio):
+    def __init__(self, conexao):
+        super().__init__()
+        self._conexao = conexao
+        # IDs removidos na transação em curso cuja linha ainda está na busca.
+        self._fora_da_busca = set()
+
+    def _gravar_busca(self):
+        if self._fora_da_busca:
+            self._conexao.executemany(
+                "DELETE FROM busca WHERE rowid = ?", ((i,) for i in sorted(self._fora_da_busca))
+            )
+            self._fora_da_busca.clear()
+
+    def _uma(self, sql, parametros=()):
+        linha = self._conexao.execute(sql, parametros).fetchone()
+        return Tarefa.de_codigos(*linha) if linha else None
+
+    def _varias(self, sql, parametros=()):
+        return [Tarefa.de_codigos(*linha) for linha in self._conexao.execute(sql, parametros)]
+
+    def maior_id(self):
+        return self._conexao.execute("SELECT COALESCE(MAX(id), 0) FROM tarefas").fetchone()[0]
+
+    def adicionar(self, tarefa):
+        self._conexao.execute(f"INSERT INTO tarefas ({COLUNAS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", _linha(tarefa))
+        if tarefa.id in self._fora_da_busca:
+            self._fora_da_busca.discard(tarefa.id)
+            self._conexao.execute("DELETE FROM busca WHERE rowid = ?", (tarefa.id,))
+        self._conexao.execute(INSERIR_BUSCA, (tarefa.id, tarefa.titulo, tarefa.descricao))
+        self._notificar("adicionada", tarefa)
+
+    def obter(self, id_tarefa):
+        """
+        Busca uma tarefa pela chave primária.
+
+        Args:
+            id_tarefa (int): ID da tarefa
+
+        Returns:
+            Tarefa: Tarefa encontrada, ou None
+        """
+        return self._uma(f"SELECT {COLUNAS} FROM tarefas WHERE id = ?", (id_tarefa,))
+
+    def remover(self, id_tarefa):
+        tarefa = self.obter(id_tarefa)
+        if tarefa is None:
+            return None
+        self._conexao.execute("DELETE FROM tarefas WHERE id = ?", (id_tarefa,))
+        self._fora_da_busca.add(id_tarefa)
+        if not self._conexao.in_transaction:
+            self._gravar_busca()
+        self._notificar("removida", tarefa)
+        return tarefa
+
+    def alterar_prioridade(self, tarefa, prioridade):
+        anterior = tarefa.prioridade
+        tarefa.prioridade = prioridade
+        self._conexao.execute("UPDATE tarefas SET prioridade = ? WHERE id = ?", (tarefa.cod_prioridade, tarefa.id))
+        self._notificar("prioridade", tarefa, anterior)
+
+    def alterar_status(self, tarefa, status, data_conclusao=None):
+        anterior = tarefa.status
+        tarefa.status = status
+        if data_conclusao is not None:
+            tarefa.data_conclusao = data_conclusao
+        self._conexao.execute(
+            "UPDATE tarefas SET status = ?, conclusao = ? WHERE id = ?",
+            (tarefa.cod_status, tarefa.conclusao, tarefa.id),
+        )
+        self._notificar("status", tarefa, anterior)
+
+    def com_status(self, status):
+        """
+        Tarefas com o status informado, da mais urgente para a menos urgente.
+
+        Args:
+            status (str): Status desejado
+
+        Returns:
+            list: Tarefas com o status
+        """
+        return self._varias(
+            f"SELECT {COLUNAS} FROM tarefas WHERE status = ? ORDER BY prioridade, criacao, id",
+            (CODIGO_STATUS[status],),
+        )
+
+    def com_prioridade(self, prioridade):
+        return self._varias(
+            f"SELECT {COLUNAS} FROM tarefas WHERE prioridade = ? ORDER BY id",
+            (CODIGO_PRIORIDADE[prioridade],),
+        )
+
+    def __iter__(self):
+        cursor = self._conexao.execute(f"SELECT {COLUNAS} FROM tarefas ORDER BY id")
+        while True:
+            linhas = cursor.fetchmany(500)
+            if not linhas:
+                return
+            for linha in linhas:
+                yield Tarefa.de_codigos(*linha)
+
+    def __len__(self):
+        return self._conexao.execute("SELECT COUNT(*) FROM tarefas").fetchone()[0]
+
+    def __bool__(self):
+        return self._conexao.execute("SELECT 1 FROM tarefas LIMIT 1").fetchone() is not None
+
+    def __contains__(self, id_tarefa):
+        return self._conexao.execute("SELECT 1 FROM tarefas WHERE id = ?", (id_tarefa,)).fetchone() is not None
+
+
+class ArmazenamentoSQLite(Armazenamento):
+    atomico = True
+
+    def __init__(self, caminho, origem=None, politica=None, eventos=None):
+        """
+        Args:
+            caminho (str): Arquivo do banco
+            origem (callable): Devolve o armazenamento de onde copiar as
+                tarefas quando o banco ainda não existe (migração do JSON)
+            politica: Política de escolha da próxima pendente (politicas.py);
+                por padrão, a estrita
+            eventos (FluxoEventos): Fluxo que recebe cada alteração, ou None
+        """
+        self.caminho = caminho
+        self.origem = origem
+        self.destino_migracao = caminho
+        self._novo = not os.path.exists(caminho)
+        # O menu e a varredura periódica usam a conexão em threads diferentes,
+        # sempre sob a trava de tarefas.py.
+        self._conexao = sqlite3.connect(caminho, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode = WAL")
+        self._conexao.execute("PRAGMA synchronous = NORMAL")
+        self._conexao.create_function("palavras_busca", 1, _palavras_busca, deterministic=True)
+        self._conexao.executescript(ESQUEMA)
+        self._nivel = 0
+        self._versao_arquivadas = 0
+        self.tarefas = RepositorioSQLite(self._conexao)
+        if not self._tem_busca():
+            with self.transacao():
+                if not self._tem_busca():
+                    for comando in DESFAZER_BUSCA + ESQUEMA_BUSCA:
+                        self._conexao.execute(comando)
+        self.politica = Estrita() if politica is None else politica
+        self._justa = isinstance(self.politica, FilaJusta)
+        if self._justa:
+            self._conexao.executescript(ESQUEMA_JUSTA)
+            self.tarefas.inscrever(self._ao_servir)
+        else:
+            self._ordem = self.politica.ordem_sql()
+            self._indexar_politica()
+        self.eventos = eventos
+        if eventos is not None:
+            self.tarefas.inscrever(eventos.ao_alterar)
+
+    def _indexar_politica(self):
+        # A ordem estrita usa idx_tarefas_fila; as outras, um índice sobre a
+        # própria expressão de ordem, refeito se a política mudar.
+        esperado = None
+        if self._ordem != Estrita().ordem_sql():
+            esperado = f"CREATE INDEX idx_tarefas_politica ON tarefas (status, {self._ordem})"
+        consulta = "SELECT sql FROM sqlite_master WHERE name = 'idx_tarefas_politica'"
+        if (self._conexao.execute(consulta).fetchone() or (None,))[0] == esperado:
+            return
+        with self.transacao():
+            if (self._conexao.execute(consulta).fetchone() or (None,))[0] != esperado:
+                self._conexao.execute("DROP INDEX IF EXISTS idx_tarefas_politica")
+                if esperado is not None:
+                    self._conexao.execute(esperado)
+
+    def _ler_etiquetas(self):
+        for origem, etiqueta in self._conexao.execute("SELECT origem, etiqueta FROM filas_origem"):
+            if origem == VIRTUAL:
+                self.politica.virtual = etiqueta
+            else:
+                self.politica.etiquetas[origem] = etiqueta
+
+    def _ao_servir(self, evento, tarefa, anterior):
+        if evento != "status" or anterior != "Pendente" or tarefa.cod_status != FAZENDO:
+            return
+        with self.transacao():
+            self._ler_etiquetas()
+            self.politica.servir(tarefa.cod_origem)
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO filas_origem (origem, etiqueta) VALUES (?, ?)",
+                [(tarefa.cod_origem, self.politica.etiquetas[tarefa.cod_origem]), (VIRTUAL, self.politica.virtual)],
+            )
+
+    def _tem_busca(self):
+        # Um gatilho da busca que tenha sobrado inseriria as linhas em dobro.
+        linhas = self._conexao.execute(
+            "SELECT sql FROM sqlite_master WHERE name IN ('busca', 'busca_arquivadas') "
+            "OR (type = 'trigger' AND name LIKE 'busca!_%' ESCAPE '!') ORDER BY name"
+        ).fetchall()
+        return linhas == [(TABELA_BUSCA,), (TABELA_ARQUIVADAS,)]
+
+    def _indexar_arquivadas(self):
+        # Também as arquivadas por outros processos desde a última busca.
+        consulta = "SELECT ate, (SELECT COALESCE(MAX(rowid), 0) FROM arquivadas) FROM busca_arquivadas"
+        ate, ultima = self._conexao.execute(consulta).fetchone()
+        if ultima <= ate:
+            return
+        with self.transacao():
+            ate, ultima = self._conexao.execute(consulta).fetchone()
+            if ultima > ate:
+                self._conexao.execute(INDEXAR_ARQUIVADAS, (ate,))
+                self._conexao.execute("UPDATE busca_arquivadas SET ate = ?", (ultima,))
+
+    def carregar(self, manutencao=True):
+        # A cópia do JSON roda mesmo sem manutenção: sem ela o banco novo
+        # estaria vazio.
+        if not self._novo or self.origem is None:
+            return 0
+        self._novo = False
+        return self._migrar(self.origem())
+
+    def _migrar(self, origem):
+        origem.carregar()
+        linhas = [_linha(t) for t in origem.tarefas]
+        with self.transacao():
+            self._conexao.executemany(f"INSERT INTO tarefas ({COLUNAS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+            self._inserir_arquivadas(
+                Tarefa.de_json(t) for t in origem.ler_arquivadas()
+            )
+        origem.fechar()
+        return len(linhas)
+
+    def salvar(self):
+        # Tudo já está no banco; o checkpoint só devolve o WAL ao arquivo principal.
+        self._conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def fechar(self):
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+        if self.eventos is not None:
+            self.eventos.fechar()
+
+    @contextmanager
+    def transacao(self):
+        if self._nivel:
+            self._nivel += 1
+            try:
+                yield self
+            finally:
+                self._nivel -= 1
+            return
+        self._conexao.execute("BEGIN IMMEDIATE")
+        self._nivel = 1
+        try:
+            # Os eventos são anexados antes do COMMIT, ainda com a trava de
+            # escrita do banco: a ordem dos offsets é a dos commits. Se a
+            # transação for desfeita, eles são descartados.
+            with self._lote_eventos(self.atomico):
+                yield self
+                self.tarefas._gravar_busca()
+        except BaseException:
+            self._conexao.execute("ROLLBACK")
+            self.tarefas._fora_da_busca.clear()
+            raise
+        else:
+            self._conexao.execute("COMMIT")
+        finally:
+            self._nivel = 0
+
+    def proximo_id(self, minimo, quantidade=1):
+        return max(minimo, self.tarefas.maior_id() + 1)
+
+    def reserva(self, trabalhador):
+        return self.tarefas._uma(
+            f"SELECT {COLUNAS_T} FROM reservas r JOIN tarefas t ON t.id = r.id_tarefa "
+            "WHERE r.trabalhador = ? AND t.status = ?",
+            (trabalhador, FAZENDO),
+        )
+
+    def reservar(self, trabalhador, tarefa, expira):
+        # O REPLACE também apaga uma reserva antiga da mesma tarefa.
+        self._conexao.execute(
+            "INSERT OR REPLACE INTO reservas (trabalhador, id_tarefa, expira) VALUES (?, ?, ?)",
+            (trabalhador, tarefa.id, expira),
+        )
+
+    def liberar(self, trabalhador):
+        self._conexao.execute("DELETE FROM reservas WHERE trabalhador = ?", (trabalhador,))
+
+    def reservas_vencidas(self, agora):
+        linhas = self._conexao.execute(
+            f"SELECT r.trabalhador, {COLUNAS_T} FROM reservas r JOIN tarefas t ON t.id = r.id_tarefa "
+            "WHERE r.expira < ? AND t.status = ?",
+            (agora, FAZENDO),
+        ).fetchall()
+        return [(linha[0], Tarefa.de_codigos(*linha[1:])) for linha in linhas]
+
+    def sem_reserva(self):
+        return self.tarefas._varias(
+            f"SELECT {COLUNAS_T} FROM tarefas t WHERE t.status = ? "
+            "AND NOT EXISTS (SELECT 1 FROM reservas r WHERE r.id_tarefa = t.id)",
+            (FAZENDO,),
+        )
+
+    def proxima_pendente(self):
+        if self._justa:
+            cabecas = [
+                self.tarefas._uma(
+                    f"SELECT {COLUNAS} FROM tarefas WHERE status = ? AND origem = ? "
+                    "ORDER BY prioridade, criacao, id LIMIT 1",
+                    (PENDENTE, codigo),
+                )
+                for codigo in range(len(ORIGENS))
+            ]
+            self._ler_etiquetas()
+            return self.politica.escolher(cabecas)
+        return self.tarefas._uma(
+            f"SELECT {COLUNAS} FROM tarefas WHERE status = ? ORDER BY {self._ordem} LIMIT 1",
+            (PENDENTE,),
+        )
+
+    def concluidas_antes(self, limite):
+        return self.tarefas._varias(
+            f"SELECT {COLUNAS} FROM tarefas WHERE status = ? AND conclusao < ? ORDER BY conclusao, id",
+            (CONCLUIDA, limite),
+        )
+
+    def _inserir_arquivadas(self, tarefas):
+        self._conexao.executemany(
+            f"INSERT INTO arquivadas ({COLUNAS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (_linha(t) for t in tarefas),
+        )
+
+    def arquivar(self, tarefas):
+        with self.transacao():
+            self._inserir_arquivadas(tarefas)
+        self._versao_arquivadas += 1
+
+    def ler_arquivadas(self, status=None, prioridade=None, origem=None, inicio=None, fim=None,
+                       campo_data="data_criacao", offset=0, limite=None, id_tarefa=None):
+        condicoes = []
+        parametros = []
+        for coluna, valor, codigos in (
+            ("status", status, CODIGO_STATUS),
+            ("prioridade", prioridade, CODIGO_PRIORIDADE),
+            ("origem", origem, CODIGO_ORIGEM),
+        ):
+            if valor is not None:
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(codigos[valor])
+        if id_tarefa is not None:
+            condicoes.append("id = ?")
+            parametros.append(id_tarefa)
+        coluna_data = "criacao" if campo_data == "data_criacao" else "conclusao"
+        if inicio is not None:
+            condicoes.append(f"{coluna_data} >= ?")
+            parametros.append(para_epoca(inicio))
+        if fim is not None:
+            condicoes.append(f"{coluna_data} < ?")
+            parametros.append(para_epoca(fim))
+        sql = f"SELECT {COLUNAS} FROM arquivadas"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY rowid LIMIT ? OFFSET ?"
+        parametros += [-1 if limite is None else limite, offset]
+        cursor = self._conexao.execute(sql, parametros)
+        while True:
+            linhas = cursor.fetchmany(500)
+            if not linhas:
+                return
+            for linha in linhas:
+                yield Tarefa.de_codigos(*linha).para_json()
+
+    def particoes_arquivadas(self):
+        linhas = self._conexao.execute(
+            "SELECT strftime('%Y-%m', COALESCE(conclusao, criacao) / 1000000, 'unixepoch') AS mes, status, COUNT(*) "
+            "FROM arquivadas GROUP BY mes, status ORDER BY mes, status"
+        )
+        return [{"mes": mes, "status": STATUS[status], "quantidade": quantidade, "bytes": None}
+                for mes, status, quantidade in linhas]
+
+    def exportar_arquivadas(self, caminho, ate=None):
+        sql = f"SELECT {COLUNAS} FROM arquivadas"
+        parametros = ()
+        if ate is not None:
+            sql += " WHERE COALESCE(conclusao, criacao) < ?"
+            parametros = (_inicio_mes(ate),)
+        temporario = caminho + ".tmp"
+        exportadas = 0
+        with open(temporario, "w", encoding="utf-8") as f:
+            for linha in self._conexao.execute(sql + " ORDER BY rowid", parametros):
+                f.write(json.dumps(Tarefa.de_codigos(*linha).para_json(), ensure_ascii=False, separators=(",", ":")) + "\n")
+                exportadas += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+        return exportadas
+
+    def podar_arquivadas(self, ate):
+        with self.transacao():
+            self._conexao.execute(
+                f"DELETE FROM busca WHERE rowid IN (SELECT rowid - {DESLOCAMENTO_BUSCA} FROM arquivadas "
+                "WHERE COALESCE(conclusao, criacao) < ? AND rowid <= (SELECT ate FROM busca_arquivadas))",
+                (_inicio_mes(ate),),
+            )
+            cursor = self._conexao.execute(
+                "DELETE FROM arquivadas WHERE COALESCE(conclusao, criacao) < ?", (_inicio_mes(ate),)
+            )
+            # Sem as últimas linhas, o SQLite reaproveita os rowids delas, e as
+            # próximas arquivadas precisam cair depois de `ate`.
+            self._conexao.execute(
+                "UPDATE busca_arquivadas SET ate = MIN(ate, (SELECT COALESCE(MAX(rowid), 0) FROM arquivadas))"
+            )
+        self._versao_arquivadas += 1
+        return cursor.rowcount
+
+    def versao(self):
+        # data_version muda quando outra conexão confirma uma transação; as
+        # alterações desta conexão são contadas à parte.
+        externa = self._conexao.execute("PRAGMA data_version").fetchone()[0]
+        return self.tarefas.versao, self._versao_arquivadas, externa
+
+    def pagina(self, ordem, cursor=None, limite=20, status=None, prioridade=None):
+        if limite < 1:
+            return [], None
+        colunas = COLUNAS_ORDEM[ordem]
+        condicoes = []
+        parametros = []
+        if cursor is not None:
+            condicoes.append(f"({colunas}) > ({', '.join('?' * len(cursor))})")
+            parametros.extend(cursor)
+        if status is not None:
+            condicoes.append("status = ?")
+            parametros.append(CODIGO_STATUS[status])
+        if prioridade is not None:
+            condicoes.append("prioridade = ?")
+            parametros.append(CODIGO_PRIORIDADE[prioridade])
+        sql = f"SELECT {COLUNAS} FROM tarefas"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        tarefas = self.tarefas._varias(f"{sql} ORDER BY {colunas} LIMIT ?", parametros + [limite + 1])
+        if len(tarefas) <= limite:
+            return tarefas, None
+        del tarefas[limite:]
+        return tarefas, CHAVES[ordem](tarefas[-1])
+
+    def buscar(self, consulta, modo="ranqueado", status=None, prioridade=None, limite=20):
+        opcionais, obrigatorias, proibidas = analisar(consulta)
+        if modo == "booleano":
+            obrigatorias += opcionais
+            opcionais = []
+        if obrigatorias:
+            expressao = " AND ".join(f'"{p}"' for p in obrigatorias)
+        else:
+            expressao = "(" + " OR ".join(f'"{p}"' for p in opcionais) + ")"
+        for palavra in proibidas:
+            expressao += f' NOT "{palavra}"'
+        condicoes = ["busca MATCH ?"]
+        parametros = [expressao]
+        if status is not None:
+            condicoes.append("COALESCE(t.status, a.status) = ?")
+            parametros.append(CODIGO_STATUS[status])
+        if prioridade is not None:
+            condicoes.append("COALESCE(t.prioridade, a.prioridade) = ?")
+            parametros.append(CODIGO_PRIORIDADE[prioridade])
+        # Dentro de uma transação, as removidas ainda estariam na busca.
+        self.tarefas._gravar_busca()
+        self._indexar_arquivadas()
+        ordem = "b.rank" if modo == "ranqueado" else "COALESCE(t.id, a.id) DESC, t.id IS NULL, b.rowid"
+        return self.tarefas._varias(
+            f"SELECT {COLUNAS_BUSCA} FROM busca b "
+            f"LEFT JOIN tarefas t ON t.id = b.rowid LEFT JOIN arquivadas a ON a.rowid = b.rowid + {DESLOCAMENTO_BUSCA} "
+            f"WHERE {' AND '.join(condicoes)} ORDER BY {ordem} LIMIT ?",
+            parametros + [limite],
+        )
@@ -0,0 +1,162 @@
+"""
+Índice de conclusão e varredura incremental de arquivamento.
+
+As tarefas concluídas ficam em um heap ordenado pela data de conclusão, de
+modo que a varredura só retira o prefixo já vencido: o custo depende da
+quantidade de tarefas arquivadas, não do tamanho do repositório. Como no
+agendador, entradas de tarefas que deixaram de estar concluídas são apenas
+invalidadas e descartadas quando chegam ao topo.
+
+VarreduraPeriodica executa uma função de arquivamento em segundo plano, em
+intervalos fixos.
+"""
+import heapq
+import itertools
+import threading
+
+from modelo import CODIGO_STATUS
+
+CONCLUIDA = CODIGO_STATUS["Concluída"]
+
+
+class IndiceConclusao:
+    def __init__(self):
+        self._heap = []
+        self._entradas = {}
+        self._sequencia = itertools.count()
+        self._repositorio = None
+        self._primeira_consulta = False
+
+    def carregar(self, repositorio):
+        """
+        Prepara o índice para o conteúdo atual do repositório; o heap só é
+        montado quando for usado. A primeira varredura, como a do comando
+        "arquivar", pede as vencidas direto ao repositório quando ele tem
+        esse atalho (Repositorio.concluidas_antes), sem decodificar as
+        outras concluídas do snapshot binário.
+
+        Args:
+            repositorio (RepositorioTarefas): Repositório recém-carregado
+        """
+        self._heap = []
+        self._entradas = {}
+        self._repositorio = repositorio
+        self._primeira_consulta = True
+
+    def _montar(self):
+        repositorio, self._repositorio = self._repositorio, None
+        self._heap = [
+            self._nova_entrada(t) for t in repositorio.com_status("Concluída") if t.conclusao is not None
+        ]
+        heapq.heapify(self._heap)
+
+    def _nova_entrada(self, tarefa):
+        # A sequência desempata a entrada nova de uma tarefa que voltou a ficar
+        # concluída e a antiga, invalidada, sem comparar as tarefas.
+        entrada = [tarefa.conclusao, tarefa.id, next(self._sequencia), tarefa]
+        self._entradas[tarefa.id] = entrada
+        return entrada
+
+    def _invalidar(self, tarefa):
+        entrada = self._entradas.pop(tarefa.id, None)
+        if entrada is not None:
+            entrada[-1] = None
+
+    def ao_alterar(self, evento, tarefa, anterior):
+        """
+        Ouvinte do repositório: indexa as conclusões e invalida as entradas
+        de tarefas que deixaram de estar concluídas.
+
+        Args:
+            evento (str): "adicionada", "prioridade", "status" ou "removida"
+            tarefa (Tarefa): Tarefa alterada
+            anterior: Valor anterior do campo alterado
+        """
+        if self._repositorio is not None or evento == "prioridade":
+            return
+        self._invalidar(tarefa)
+        if evento != "removida" and tarefa.cod_status == CONCLUIDA and tarefa.conclusao is not None:
+            heapq.heappush(self._heap, self._nova_entrada(tarefa))
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entradas):
+            self._heap = [e for e in self._heap if e[-1] is not None]
+            heapq.heapify(self._heap)
+
+    def vencidas(self, limite):
+        """
+        Retira do índice as tarefas concluídas antes de `limite`.
+
+        Args:
+            limite (int): Data de conclusão limite, em microssegundos desde a
+                época (modelo.para_epoca)
+
+        Returns:
+            list: Tarefas vencidas, da conclusão mais antiga para a mais nova
+        """
+        if self._repositorio is not None:
+            if self._primeira_consulta:
+                self._primeira_consulta = False
+                vencidas = self._repositorio.concluidas_antes(limite)
+                if vencidas is not None:
+                    return sorted(vencidas, key=lambda t: (t.conclusao, t.id))
+            self._montar()
+        heap = self._heap
+        vencidas = []
+        while heap and heap[0][0] < limite:
+            entrada = heapq.heappop(heap)
+            tarefa = entrada[-1]
+            if tarefa is not None:
+                del self._entradas[tarefa.id]
+                vencidas.append(tarefa)
+        return vencidas
+
+    def devolver(self, tarefas):
+        """
+        Recoloca no índice tarefas retiradas por `vencidas` que não puderam
+        ser arquivadas.
+
+        Args:
+            tarefas (iterable): Tarefas ainda concluídas
+        """
+        if self._repositorio is not None:
+            return
+        for tarefa in tarefas:
+            if tarefa.id not in self._entradas:
+                heapq.heappush(self._heap, self._nova_entrada(tarefa))
+
+
+class VarreduraPeriodica:
+    def __init__(self, intervalo, funcao):
+        """
+        Args:
+            intervalo (float): Segundos entre duas execuções
+            funcao (callable): Função executada a cada intervalo
+        """
+        self.intervalo = intervalo
+        self.funcao = funcao
+        self._timer = None
+        self._parada = threading.Event()
+
+    def _executar(self):
+        if self._parada.is_set():
+            return
+        try:
+            self.funcao()
+        except Exception as e:
+            print(f"Erro na varredura periódica: {e}")
+        self._agendar()
+
+    def _agendar(self):
+        self._timer = threading.Timer(self.intervalo, self._executar)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def iniciar(self):
+        """Começa a executar a função em segundo plano."""
+        self._parada.clear()
+        self._agendar()
+
+    def parar(self):
+        """Cancela as próximas execuções."""
+        self._parada.set()
+        if self._timer is not None:
+            self._timer.cancel()
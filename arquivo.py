@@ -0,0 +1,523 @@
+"""
+Arquivo de tarefas arquivadas e excluídas, particionado por mês e status.
+
+Cada partição guarda as tarefas de um status arquivadas em um mês, em um
+arquivo JSONL (uma tarefa por linha) dentro do diretório do arquivo:
+
+    2026-10.arquivado.jsonl       mês atual: só cresce por anexação
+    2026-10.arquivado.idx.json    índice lateral
+    2026-09.excluida.jsonl.gz     mês encerrado: comprimido
+    2026-09.excluida.idx.json
+
+O índice lateral de cada partição tem a quantidade de tarefas, o menor e o
+maior ID, o intervalo das datas de criação e de conclusão e a posição (em
+bytes, no texto descomprimido) de uma a cada INTERVALO_POSICOES linhas.
+Arquivar só anexa à partição do mês atual; ao arquivar no mês seguinte, as
+partições dos meses anteriores são comprimidas.
+
+O índice é atualizado em memória a cada anexação e gravado só em pontos de
+controle (gravar_indices, chamado junto com o snapshot e ao fechar) ou
+quando o trecho ainda não gravado passa de LIMITE_CAUDA bytes. Ao abrir,
+as linhas além do tamanho gravado no índice são lidas do fim do arquivo e
+registradas; um índice ausente ou que não corresponde ao arquivo é refeito.
+
+A leitura só abre as partições que podem ter tarefas dentro dos filtros
+(status, intervalo de datas, ID) e, sem outros filtros, pula partições
+inteiras e salta dentro delas pelas posições do índice. O uso de memória
+não depende do tamanho do arquivo.
+"""
+import json
+import os
+import unicodedata
+from datetime import datetime
+
+from modelo import STATUS
+
+INTERVALO_POSICOES = 1000
+LIMITE_CAUDA = 4 << 20
+
+
+def _compacto(valor):
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":"))
+
+
+def _nome_status(status):
+    texto = unicodedata.normalize("NFKD", status.casefold())
+    return "".join(c for c in texto if c.isascii() and c.isalnum())
+
+
+_STATUS_POR_NOME = {_nome_status(s): s for s in STATUS}
+
+
+def mes_de(data):
+    """
+    Returns:
+        str: Mês no formato AAAA-MM
+    """
+    return data.strftime("%Y-%m")
+
+
+def _gravar_atomico(caminho, dados):
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        f.write(dados)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class Particao:
+    def __init__(self, diretorio, mes, status):
+        """
+        Args:
+            diretorio (str): Diretório do arquivo
+            mes (str): Mês do arquivamento (AAAA-MM)
+            status (str): "Arquivado" ou "Excluída"
+        """
+        self.mes = mes
+        self.status = status
+        base = os.path.join(diretorio, f"{mes}.{_nome_status(status)}")
+        self.caminho = base + ".jsonl"
+        self.caminho_comprimido = base + ".jsonl.gz"
+        self.caminho_indice = base + ".idx.json"
+        self.indice = self._indice_vazio()
+        # Tamanho descrito pelo índice gravado em disco.
+        self._gravado = 0
+
+    def _indice_vazio(self):
+        return {
+            "mes": self.mes, "status": self.status, "quantidade": 0, "id_min": None, "id_max": None,
+            "data_criacao": None, "data_conclusao": None, "posicoes": [], "tamanho": 0, "comprimida": False,
+            "tamanho_comprimido": None,
+        }
+
+    @property
+    def quantidade(self):
+        return self.indice["quantidade"]
+
+    @property
+    def comprimida(self):
+        return self.indice["comprimida"]
+
+    def abrir(self):
+        """
+        Lê o índice lateral e registra as tarefas anexadas depois do último
+        ponto de controle. Refaz o índice se ele estiver ausente ou não
+        corresponder ao arquivo; sem o arquivo (só o índice sobrou de uma
+        queda), a partição fica vazia.
+        """
+        if os.path.exists(self.caminho_comprimido) and os.path.exists(self.caminho):
+            # Queda durante a compressão: o .gz só aparece completo.
+            os.remove(self.caminho)
+        try:
+            with open(self.caminho_indice, "r", encoding="utf-8") as f:
+                self.indice = json.load(f)
+        except (OSError, ValueError):
+            self.indice = self._indice_vazio()
+        self._gravado = self.indice["tamanho"]
+        if os.path.exists(self.caminho_comprimido):
+            tamanho = os.path.getsize(self.caminho_comprimido)
+            if not self.indice["comprimida"] or self.indice.get("tamanho_comprimido") != tamanho:
+                self.reindexar()
+            return
+        if not os.path.exists(self.caminho):
+            if self.indice != self._indice_vazio():
+                self.indice = self._indice_vazio()
+                self._gravado = None
+                self.gravar_indice()
+            return
+        tamanho = os.path.getsize(self.caminho)
+        if self.indice["comprimida"] or tamanho < self.indice["tamanho"]:
+            self.reindexar()
+        elif tamanho > self.indice["tamanho"]:
+            with open(self.caminho, "rb") as f:
+                f.seek(self.indice["tamanho"])
+                self._indexar(f, self.indice["tamanho"])
+
+    def _registrar(self, t, posicao):
+        indice = self.indice
+        if indice["quantidade"] % INTERVALO_POSICOES == 0:
+            indice["posicoes"].append(posicao)
+        indice["quantidade"] += 1
+        id_tarefa = t["id"]
+        indice["id_min"] = id_tarefa if indice["id_min"] is None else min(indice["id_min"], id_tarefa)
+        indice["id_max"] = id_tarefa if indice["id_max"] is None else max(indice["id_max"], id_tarefa)
+        for campo in ("data_criacao", "data_conclusao"):
+            data = t.get(campo)
+            if data:
+                intervalo = indice[campo]
+                indice[campo] = [data, data] if intervalo is None else [min(intervalo[0], data), max(intervalo[1], data)]
+
+    def _indexar(self, f, posicao):
+        for linha in f:
+            if linha.strip():
+                self._registrar(json.loads(linha), posicao)
+            posicao += len(linha)
+        self.indice["tamanho"] = posicao
+
+    def gravar_indice(self):
+        """Grava o índice lateral, se ele mudou desde a última gravação."""
+        if self._gravado == self.indice["tamanho"] and os.path.exists(self.caminho_indice):
+            return
+        _gravar_atomico(self.caminho_indice, _compacto(self.indice).encode("utf-8"))
+        self._gravado = self.indice["tamanho"]
+
+    def reindexar(self):
+        self.indice = self._indice_vazio()
+        if os.path.exists(self.caminho_comprimido):
+            self.indice["comprimida"] = True
+            self.indice["tamanho_comprimido"] = os.path.getsize(self.caminho_comprimido)
+        with self._abrir_leitura() as f:
+            self._indexar(f, 0)
+        self._gravado = None
+        self.gravar_indice()
+
+    def _abrir_leitura(self):
+        if self.comprimida:
+            import gzip
+            return gzip.open(self.caminho_comprimido, "rb")
+        return open(self.caminho, "rb")
+
+    def anexar(self, registros):
+        """
+        Anexa tarefas (em JSON) com uma escrita e atualiza o índice em
+        memória. Uma partição já comprimida (um mês encerrado, ao migrar
+        arquivos antigos) é regravada comprimida, com as tarefas no fim.
+
+        Args:
+            registros (list): Tarefas no formato de para_json
+        """
+        linhas = [(_compacto(t) + "\n").encode("utf-8") for t in registros]
+        if self.comprimida:
+            with self._abrir_leitura() as origem:
+                self._gravar_comprimida(origem, b"".join(linhas))
+        else:
+            with open(self.caminho, "ab") as f:
+                f.write(b"".join(linhas))
+                f.flush()
+                os.fsync(f.fileno())
+        posicao = self.indice["tamanho"]
+        for t, linha in zip(registros, linhas):
+            self._registrar(t, posicao)
+            posicao += len(linha)
+        self.indice["tamanho"] = posicao
+        # O tamanho do .gz não diz se o índice está atrasado: ele é gravado já.
+        if self.comprimida or posicao - (self._gravado or 0) > LIMITE_CAUDA:
+            self.gravar_indice()
+
+    def _gravar_comprimida(self, origem, fim=b""):
+        import gzip
+        temporario = self.caminho_comprimido + ".tmp"
+        with open(temporario, "wb") as bruto:
+            with gzip.GzipFile(fileobj=bruto, mode="wb") as destino:
+                for bloco in iter(lambda: origem.read(1 << 20), b""):
+                    destino.write(bloco)
+                destino.write(fim)
+            bruto.flush()
+            os.fsync(bruto.fileno())
+        os.replace(temporario, self.caminho_comprimido)
+        self.indice["tamanho_comprimido"] = os.path.getsize(self.caminho_comprimido)
+
+    def comprimir(self):
+        """Troca o JSONL pela versão comprimida; as posições continuam valendo."""
+        with open(self.caminho, "rb") as origem:
+            self._gravar_comprimida(origem)
+        self.indice["comprimida"] = True
+        self._gravado = None
+        self.gravar_indice()
+        os.remove(self.caminho)
+
+    def pode_conter(self, campo_data=None, inicio=None, fim=None, id_tarefa=None):
+        """
+        Args:
+            campo_data (str): "data_criacao" ou "data_conclusao"
+            inicio (str): Data mínima em ISO 8601, ou None
+            fim (str): Data máxima (exclusiva) em ISO 8601, ou None
+            id_tarefa (int): ID procurado, ou None
+
+        Returns:
+            bool: False se o índice garante que nenhuma tarefa passa
+        """
+        indice = self.indice
+        if not indice["quantidade"]:
+            return False
+        if id_tarefa is not None and not indice["id_min"] <= id_tarefa <= indice["id_max"]:
+            return False
+        if inicio or fim:
+            intervalo = indice[campo_data]
+            if intervalo is None or (inicio and intervalo[1] < inicio) or (fim and intervalo[0] >= fim):
+                return False
+        return True
+
+    def ler(self, pular=0):
+        """
+        Percorre as linhas da partição, saltando as `pular` primeiras pelas
+        posições do índice.
+
+        Yields:
+            bytes: Linha de uma tarefa em JSON
+        """
+        if pular >= self.quantidade:
+            return
+        bloco, resto = divmod(pular, INTERVALO_POSICOES)
+        with self._abrir_leitura() as f:
+            f.seek(self.indice["posicoes"][bloco])
+            for linha in f:
+                if not linha.strip():
+                    continue
+                if resto:
+                    resto -= 1
+                    continue
+                yield linha
+
+    def remover(self):
+        for caminho in (self.caminho, self.caminho_comprimido, self.caminho_indice):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+
+class ArquivoTarefas:
+    def __init__(self, diretorio):
+        """
+        Args:
+            diretorio (str): Diretório das partições (criado na primeira escrita)
+        """
+        self.diretorio = diretorio
+        self._particoes = {}
+        self._aberto = False
+        self._mes_escrita = None
+        # Conta as gravações e podas deste processo (Armazenamento.versao).
+        self.versao = 0
+
+    def _abrir(self):
+        if self._aberto:
+            return
+        self._aberto = True
+        if not os.path.isdir(self.diretorio):
+            return
+        for nome in os.listdir(self.diretorio):
+            mes, _, resto = nome.partition(".")
+            nome_status, _, extensao = resto.partition(".")
+            if extensao in ("jsonl", "jsonl.gz", "idx.json") and nome_status in _STATUS_POR_NOME:
+                self._particao(mes, _STATUS_POR_NOME[nome_status])
+        for particao in self._particoes.values():
+            particao.abrir()
+
+    def _particao(self, mes, status):
+        chave = (mes, status)
+        particao = self._particoes.get(chave)
+        if particao is None:
+            particao = self._particoes[chave] = Particao(self.diretorio, mes, status)
+        return particao
+
+    def particoes(self):
+        """
+        Returns:
+            list: Partições em ordem de mês e status
+        """
+        self._abrir()
+        return [self._particoes[chave] for chave in sorted(self._particoes)]
+
+    def anexar(self, tarefa):
+        """
+        Anexa uma única tarefa ao arquivo.
+
+        Args:
+            tarefa (Tarefa): Tarefa arquivada ou excluída
+        """
+        self.anexar_lote([tarefa])
+
+    def anexar_lote(self, tarefas, agora=None):
+        """
+        Anexa tarefas às partições do mês atual, uma escrita por status. Na
+        primeira anexação de cada mês, comprime as partições de meses
+        anteriores que ainda estiverem abertas.
+
+        Args:
+            tarefas (iterable): Tarefas arquivadas ou excluídas
+            agora (datetime): Data do arquivamento (padrão: agora)
+        """
+        self._abrir()
+        mes = mes_de(agora or datetime.now())
+        por_status = {}
+        for tarefa in tarefas:
+            registro = tarefa.para_json()
+            por_status.setdefault(registro["status"], []).append(registro)
+        if not por_status:
+            return
+        os.makedirs(self.diretorio, exist_ok=True)
+        for status, registros in por_status.items():
+            self._particao(mes, status).anexar(registros)
+        self.versao += 1
+        if mes != self._mes_escrita:
+            self._mes_escrita = mes
+            self.fechar_antigas(mes)
+
+    def gravar_indices(self):
+        """Ponto de controle: grava os índices das partições alteradas."""
+        for particao in self._particoes.values():
+            particao.gravar_indice()
+
+    def fechar_antigas(self, mes_atual=None):
+        """
+        Comprime as partições de meses anteriores a `mes_atual`.
+
+        Returns:
+            int: Quantidade de partições comprimidas
+        """
+        mes_atual = mes_atual or mes_de(datetime.now())
+        comprimidas = 0
+        for particao in self.particoes():
+            if particao.mes < mes_atual and not particao.comprimida and particao.quantidade:
+                particao.comprimir()
+                comprimidas += 1
+        return comprimidas
+
+    def ler(self, status=None, prioridade=None, origem=None, inicio=None, fim=None,
+            campo_data="data_criacao", offset=0, limite=None, id_tarefa=None):
+        """
+        Percorre as tarefas do arquivo, uma de cada vez, aplicando os filtros,
+        do mês de arquivamento mais antigo para o mais novo.
+
+        Os filtros de prioridade e origem são testados primeiro sobre o texto
+        da linha (o arquivo é sempre gravado no formato compacto), e só as
+        linhas candidatas são decodificadas. O intervalo de datas é comparado
+        sobre as strings ISO 8601, sem converter para datetime.
+
+        Args:
+            status (str): Mantém só as tarefas com este status
+            prioridade (str): Mantém só as tarefas com esta prioridade
+            origem (str): Mantém só as tarefas com esta origem
+            inicio (datetime): Data mínima (inclusiva) de `campo_data`
+            fim (datetime): Data máxima (exclusiva) de `campo_data`
+            campo_data (str): "data_criacao" ou "data_conclusao"
+            offset (int): Quantidade de tarefas filtradas a pular
+            limite (int): Quantidade máxima de tarefas a devolver
+            id_tarefa (int): Mantém só as tarefas com este ID
+
+        Yields:
+            dict: Tarefa arquivada, com as datas em ISO 8601
+        """
+        if limite == 0:
+            return
+        filtros = {"prioridade": prioridade, "origem": origem, "id": id_tarefa}
+        filtros = {campo: valor for campo, valor in filtros.items() if valor is not None}
+        trechos = [f'"{campo}":{_compacto(valor)}'.encode("utf-8") for campo, valor in filtros.items()]
+        inicio = inicio.isoformat() if inicio else None
+        fim = fim.isoformat() if fim else None
+        # Sem filtros dentro das partições, o offset é contado pelos índices.
+        por_indice = not filtros and not inicio and not fim
+        pulados = devolvidos = 0
+        for particao in self.particoes():
+            if status is not None and particao.status != status:
+                continue
+            if not particao.pode_conter(campo_data, inicio, fim, id_tarefa):
+                continue
+            pular = 0
+            if por_indice:
+                pular = min(offset - pulados, particao.quantidade)
+                pulados += pular
+            for linha in particao.ler(pular):
+                if not all(trecho in linha for trecho in trechos):
+                    continue
+                t = json.loads(linha)
+                if any(t.get(campo) != valor for campo, valor in filtros.items()):
+                    continue
+                if inicio or fim:
+                    data = t.get(campo_data)
+                    if not data or (inicio and data < inicio) or (fim and data >= fim):
+                        continue
+                if pulados < offset:
+                    pulados += 1
+                    continue
+                yield t
+                devolvidos += 1
+                if limite is not None and devolvidos >= limite:
+                    return
+
+    def migrar(self, *caminhos):
+        """
+        Distribui arquivos de um formato anterior (a lista JSON original ou o
+        JSONL único) pelas partições e os renomeia com o sufixo ".migrado".
+
+        O mês de arquivamento dessas tarefas não foi gravado; usa-se o mês da
+        conclusão ou, sem ela, o da criação. Uma migração interrompida antes
+        de renomear o arquivo pode ser repetida: as tarefas que já estão na
+        partição de destino não são anexadas de novo.
+
+        Args:
+            caminhos: Arquivos antigos, do mais antigo para o mais novo
+
+        Returns:
+            int: Quantidade de tarefas migradas
+        """
+        self._abrir()
+        migradas = 0
+        for caminho in caminhos:
+            if not os.path.exists(caminho):
+                continue
+            with open(caminho, "r", encoding="utf-8") as f:
+                if caminho.endswith(".jsonl"):
+                    registros = [json.loads(linha) for linha in f if linha.strip()]
+                else:
+                    registros = json.load(f)
+            grupos = {}
+            for t in registros:
+                data = t.get("data_conclusao") or t["data_criacao"]
+                grupos.setdefault((data[:7], t["status"]), []).append(t)
+            if grupos:
+                os.makedirs(self.diretorio, exist_ok=True)
+            for (mes, status), lista in sorted(grupos.items()):
+                particao = self._particao(mes, status)
+                if any(particao.pode_conter(id_tarefa=t["id"]) for t in lista):
+                    existentes = {json.loads(linha)["id"] for linha in particao.ler()}
+                    lista = [t for t in lista if t["id"] not in existentes]
+                if lista:
+                    particao.anexar(lista)
+            os.replace(caminho, caminho + ".migrado")
+            migradas += len(registros)
+            self.versao += 1
+        return migradas
+
+    def exportar(self, caminho, ate=None):
+        """
+        Copia as tarefas das partições anteriores a `ate` para um JSONL.
+
+        Args:
+            caminho (str): Arquivo de destino
+            ate (str): Mês (AAAA-MM) exclusivo, ou None para todas
+
+        Returns:
+            int: Quantidade de tarefas exportadas
+        """
+        temporario = caminho + ".tmp"
+        exportadas = 0
+        with open(temporario, "wb") as f:
+            for particao in self.particoes():
+                if ate is None or particao.mes < ate:
+                    for linha in particao.ler():
+                        f.write(linha)
+                        exportadas += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+        return exportadas
+
+    def podar(self, ate):
+        """
+        Apaga as partições anteriores a `ate`.
+
+        Args:
+            ate (str): Mês (AAAA-MM) exclusivo
+
+        Returns:
+            int: Quantidade de tarefas apagadas
+        """
+        apagadas = 0
+        for particao in self.particoes():
+            if particao.mes < ate:
+                apagadas += particao.quantidade
+                particao.remover()
+                del self._particoes[(particao.mes, particao.status)]
+        self.versao += 1
+        return apagadas
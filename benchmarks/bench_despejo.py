@@ -0,0 +1,62 @@
+"""
+Mede a exportação e a leitura de despejos (despejo.py) com números
+diferentes de processos no pool, nos dois formatos.
+
+Uso:
+    python benchmarks/bench_despejo.py [tarefas] [processos...]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import despejo
+from armazenamento import Armazenamento
+from modelo import PRIORIDADES, Tarefa
+from repositorio import RepositorioTarefas
+
+
+class Origem(Armazenamento):
+    """Armazenamento mínimo em memória, só com as páginas por ID."""
+
+    def __init__(self, quantidade):
+        agora = datetime.now()
+        self.tarefas = RepositorioTarefas()
+        self.tarefas.carregar(
+            Tarefa(i, f"Tarefa {i}", f"Descrição da tarefa {i}", PRIORIDADES[i % len(PRIORIDADES)], "Pendente",
+                   "E-mail", agora - timedelta(seconds=quantidade - i))
+            for i in range(1, quantidade + 1)
+        )
+
+    def pagina(self, ordem, cursor=None, limite=20, status=None, prioridade=None):
+        inicio = 1 if cursor is None else cursor[0] + 1
+        fim = min(inicio + limite, len(self.tarefas) + 1)
+        pagina = [self.tarefas.obter(i) for i in range(inicio, fim)]
+        return pagina, ((fim - 1,) if fim <= len(self.tarefas) else None)
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    contagens = [int(n) for n in sys.argv[2:]] or [1, 2, 4, 8]
+    origem = Origem(quantidade)
+    print(f"Tarefas: {quantidade} | Núcleos: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for formato in ("jsonl", "json"):
+            caminho = os.path.join(diretorio, f"despejo.{formato}")
+            for processos in contagens:
+                comeco = time.perf_counter()
+                despejo.exportar(origem, caminho, processos)
+                exportacao = time.perf_counter() - comeco
+                comeco = time.perf_counter()
+                lidas, erros = despejo.ler(caminho, processos)
+                leitura = time.perf_counter() - comeco
+                assert len(lidas) == quantidade and not erros
+                print(f"{formato:5s} {processos:2d} processo(s): exportar {exportacao:6.2f} s | ler {leitura:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
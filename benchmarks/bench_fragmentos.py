@@ -0,0 +1,71 @@
+"""
+Compara um armazenamento único com um dividido em fragmentos
+(fragmentos.py):
+
+    reservas   vazão de reservas com vários trabalhadores em processos
+               separados, em SQLite (como bench_reservas.py)
+    salvar     save_data no JSON depois de alterar poucas tarefas: só os
+               fragmentos alterados regravam o snapshot
+
+Uso:
+    python benchmarks/bench_fragmentos.py [--tarefas N] [--trabalhadores W]
+        [--fragmentos 1 4 8] [--tarefas-json N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_reservas
+
+MEDIR_SALVAR = """
+import time
+import tarefas
+tarefas.load_data()
+tarefas.importar_tarefas(
+    {"titulo": f"Tarefa {i}", "descricao": "", "prioridade": "Alta", "origem": "E-mail"} for i in range(%d)
+)
+tarefas.save_data()
+for id_tarefa in (1, 2, 3):
+    tarefas.alterar_prioridade(id_tarefa, "Urgente")
+comeco = time.perf_counter()
+tarefas.save_data()
+print(time.perf_counter() - comeco)
+tarefas.armazenamento.fechar()
+"""
+
+
+def medir_salvar(quantidade, fragmentos):
+    with tempfile.TemporaryDirectory() as diretorio:
+        ambiente = dict(os.environ, TAREFAS_BACKEND="json", TAREFAS_FRAGMENTOS=str(fragmentos),
+                        TAREFAS_EVENTOS="0", PYTHONPATH=RAIZ)
+        saida = subprocess.run(
+            [sys.executable, "-c", MEDIR_SALVAR % quantidade], cwd=diretorio, env=ambiente,
+            capture_output=True, text=True, check=True,
+        ).stdout
+    return float(saida.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Armazenamento único x fragmentado")
+    parser.add_argument("--tarefas", type=int, default=2000)
+    parser.add_argument("--trabalhadores", type=int, default=4)
+    parser.add_argument("--fragmentos", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--tarefas-json", type=int, default=100000)
+    args = parser.parse_args()
+    print(f"Reservas em SQLite: {args.tarefas} tarefas, {args.trabalhadores} trabalhadores")
+    for fragmentos in args.fragmentos:
+        os.environ["TAREFAS_FRAGMENTOS"] = str(fragmentos)
+        feitas, duracao = bench_reservas.medir(args.tarefas, args.trabalhadores)
+        print(f"  {fragmentos:2d} fragmento(s): {feitas / duracao:8.0f} reservas/s")
+    print(f"save_data em JSON depois de 3 alterações, {args.tarefas_json} tarefas")
+    for fragmentos in args.fragmentos:
+        print(f"  {fragmentos:2d} fragmento(s): {medir_salvar(args.tarefas_json, fragmentos) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
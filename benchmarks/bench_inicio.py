@@ -0,0 +1,103 @@
+"""
+Mede a partida dos comandos de uma operação só, como um script ou o cron os
+chamaria: o tempo de parede de `python -m tarefas <comando>` em um processo
+novo, por armazenamento e quantidade de tarefas, já descontado o de um
+interpretador vazio.
+
+    proxima     mostra a próxima pendente
+    relatorio   relatorio --status Fazendo (poucas linhas de saída)
+    arquivar    arquiva as concluídas vencidas (nenhuma, neste teste)
+    script      proxima chamado como `python tarefas.py`, que recompila o
+                tarefas.py a cada vez; com -m o bytecode vem do cache
+
+Em cada repositório, 1% das tarefas está pendente, dez estão em andamento e
+o resto foi concluído na véspera, dentro da retenção. Os armazenamentos:
+
+    json        snapshot em texto: o tarefas.json é sempre lido inteiro
+    binario     TAREFAS_SNAPSHOT=binario, aberto via mmap e lido sob demanda
+    sqlite      TAREFAS_BACKEND=sqlite
+
+Uso:
+    python benchmarks/bench_inicio.py [--tarefas 1000 100000] [--repeticoes R]
+        [--armazenamentos json binario sqlite]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PREPARAR = """
+from datetime import datetime, timedelta
+import tarefas
+tarefas.load_data()
+tarefas.importar_tarefas(
+    {"titulo": f"Tarefa {i}", "descricao": "", "prioridade": ("Urgente", "Alta", "Média", "Baixa")[i %% 4],
+     "origem": "E-mail"}
+    for i in range(%d)
+)
+ontem = datetime.now() - timedelta(days=1)
+with tarefas.armazenamento.transacao():
+    for tarefa in list(tarefas.tarefas.com_status("Pendente")):
+        if tarefa.id %% 100:
+            tarefas.tarefas.alterar_status(tarefa, "Concluída", ontem)
+for i in range(10):
+    tarefas.reservar_proxima(f"trabalhador-{i}")
+tarefas.save_data()
+tarefas.armazenamento.fechar()
+"""
+AMBIENTES = {
+    "json": {"TAREFAS_BACKEND": "json", "TAREFAS_SNAPSHOT": "json"},
+    "binario": {"TAREFAS_BACKEND": "json", "TAREFAS_SNAPSHOT": "binario"},
+    "sqlite": {"TAREFAS_BACKEND": "sqlite"},
+}
+COMANDOS = {
+    "proxima": ["-m", "tarefas", "proxima"],
+    "relatorio": ["-m", "tarefas", "relatorio", "--status", "Fazendo"],
+    "arquivar": ["-m", "tarefas", "arquivar"],
+    "script": [os.path.join(RAIZ, "tarefas.py"), "proxima"],
+}
+
+
+def cronometrar(argumentos, diretorio, ambiente, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        comeco = time.perf_counter()
+        subprocess.run([sys.executable, *argumentos], cwd=diretorio, env=ambiente,
+                       stdout=subprocess.DEVNULL, check=True)
+        tempos.append(time.perf_counter() - comeco)
+    return statistics.median(tempos)
+
+
+def medir(armazenamento, quantidade, repeticoes, vazio):
+    ambiente = dict(os.environ, **AMBIENTES[armazenamento], PYTHONPATH=RAIZ)
+    with tempfile.TemporaryDirectory() as diretorio:
+        subprocess.run([sys.executable, "-c", PREPARAR % quantidade], cwd=diretorio,
+                       env=dict(ambiente, TAREFAS_EVENTOS="0"), check=True)
+        return {
+            nome: cronometrar(argumentos, diretorio, ambiente, repeticoes) - vazio
+            for nome, argumentos in COMANDOS.items()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partida dos comandos de linha de comando")
+    parser.add_argument("--tarefas", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--armazenamentos", nargs="+", choices=list(AMBIENTES), default=list(AMBIENTES))
+    args = parser.parse_args()
+    vazio = cronometrar(["-c", "pass"], RAIZ, os.environ, args.repeticoes)
+    print(f"Interpretador vazio: {vazio * 1000:.1f} ms (descontado abaixo)")
+    print(f"{'':<9} {'tarefas':>8} " + " ".join(f"{nome:>10}" for nome in COMANDOS))
+    for armazenamento in args.armazenamentos:
+        for quantidade in args.tarefas:
+            tempos = medir(armazenamento, quantidade, args.repeticoes, vazio)
+            print(f"{armazenamento:<9} {quantidade:>8} " + " ".join(f"{t * 1000:8.1f}ms" for t in tempos.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Mede quantos bytes cada tarefa ocupa em memória: dicionário x Tarefa.
+
+Uso:
+    python benchmarks/bench_memoria.py [quantidade]
+"""
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo import ORIGENS, PRIORIDADES, STATUS, Tarefa
+
+
+def gerar_campos(quantidade):
+    # Títulos e descrições são criados fora da medição: as duas representações
+    # guardam exatamente as mesmas strings, então elas não entram na conta.
+    return [
+        (
+            i + 1,
+            f"Tarefa {i + 1}",
+            f"Descrição da tarefa {i + 1}",
+            PRIORIDADES[i % len(PRIORIDADES)],
+            STATUS[i % 3],
+            ORIGENS[i % len(ORIGENS)],
+        )
+        for i in range(quantidade)
+    ]
+
+
+def como_dicionario(campos, base):
+    return [
+        {
+            "id": id_tarefa,
+            "titulo": titulo,
+            "descricao": descricao,
+            "prioridade": prioridade,
+            "status": status,
+            "origem": origem,
+            "data_criacao": base + timedelta(seconds=id_tarefa),
+            "data_conclusao": base + timedelta(days=1, seconds=id_tarefa) if status == "Concluída" else None,
+        }
+        for id_tarefa, titulo, descricao, prioridade, status, origem in campos
+    ]
+
+
+def como_tarefa(campos, base):
+    return [
+        Tarefa(
+            id_tarefa,
+            titulo,
+            descricao,
+            prioridade,
+            status,
+            origem,
+            base + timedelta(seconds=id_tarefa),
+            base + timedelta(days=1, seconds=id_tarefa) if status == "Concluída" else None,
+        )
+        for id_tarefa, titulo, descricao, prioridade, status, origem in campos
+    ]
+
+
+def medir(construir, campos, base):
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    tarefas = construir(campos, base)
+    usado = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    return usado / len(tarefas), tarefas
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    campos = gerar_campos(quantidade)
+    base = datetime(2024, 1, 1)
+    bytes_dict, _ = medir(como_dicionario, campos, base)
+    bytes_tarefa, _ = medir(como_tarefa, campos, base)
+    print(f"Tarefas medidas: {quantidade}")
+    print(f"dict:   {bytes_dict:8.1f} bytes/tarefa")
+    print(f"Tarefa: {bytes_tarefa:8.1f} bytes/tarefa")
+    print(f"Redução: {100 * (1 - bytes_tarefa / bytes_dict):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
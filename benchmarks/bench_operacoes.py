@@ -0,0 +1,242 @@
+"""
+Mede as operações de tarefas.py sobre armazenamentos sintéticos de 10³ a 10⁶
+tarefas e compara o resultado com uma linha de base gravada.
+
+Para cada tamanho e backend, um processo gera os arquivos em um diretório
+temporário (fora da medição) e outro processo, novo, mede:
+
+    load_data                  carga completa
+    obter_id                   busca por ID (média por busca)
+    verificar_urgencia         primeira escolha da próxima tarefa
+    ciclo_concluir_verificar   concluir + escolher a próxima (média por ciclo)
+    arquivar_tarefas_antigas   arquivamento das concluídas vencidas
+    save_arquivadas            gravação de um lote de 1000 arquivadas
+    relatorio                  relatório completo (saída descartada)
+    save_data                  snapshot completo
+
+Os valores usam as prioridades, status e origens aceitos por validar_*
+(modelo.PRIORIDADES, STATUS e ORIGENS), com proporções parecidas com as de
+uso real. Cada medição é repetida e o menor tempo é mantido.
+
+Uso:
+    python benchmarks/bench_operacoes.py [--tamanhos 1000 10000 100000]
+        [--backends json binario sqlite] [--saida resultados.json]
+        [--base benchmarks/linha_de_base.json] [--gravar-base] [--tolerancia 0.5]
+        [--minimo 0.005]
+
+Com --base, sai com código 1 se alguma operação ficou mais lenta que a linha
+de base além da tolerância.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from modelo import ORIGENS, PRIORIDADES, STATUS, Tarefa
+
+PESOS_PRIORIDADE = (10, 25, 40, 25)
+PESOS_STATUS = (50, 0, 45, 0, 0)
+PESOS_ORIGEM = (50, 20, 30)
+LOTE_ARQUIVADAS = 1000
+CICLOS = 100
+AMOSTRAS_ID = 10_000
+AMBIENTE = {
+    "json": {"TAREFAS_BACKEND": "json", "TAREFAS_SNAPSHOT": "json"},
+    "binario": {"TAREFAS_BACKEND": "json", "TAREFAS_SNAPSHOT": "binario"},
+    "sqlite": {"TAREFAS_BACKEND": "sqlite"},
+}
+
+
+def gerar(tamanho, semente=42):
+    """
+    Gera tarefas.json e tarefas_arquivadas.jsonl no diretório atual.
+
+    Metade das concluídas terminou há mais de 30 dias (e será arquivada);
+    o arquivo de arquivadas começa com um quarto do tamanho do ativo.
+    """
+    aleatorio = random.Random(semente)
+    agora = datetime.now()
+    prioridades = aleatorio.choices(PRIORIDADES, PESOS_PRIORIDADE, k=tamanho)
+    status = aleatorio.choices(STATUS, PESOS_STATUS, k=tamanho)
+    origens = aleatorio.choices(ORIGENS, PESOS_ORIGEM, k=tamanho)
+    tarefas = []
+    for i in range(tamanho):
+        criacao = agora - timedelta(days=60, seconds=tamanho - i)
+        conclusao = None
+        if status[i] == "Concluída":
+            conclusao = criacao + timedelta(days=aleatorio.choice((1, 59)), seconds=aleatorio.randrange(3600))
+        tarefas.append({
+            "id": i + 1,
+            "titulo": f"Tarefa {i + 1}",
+            "descricao": f"Descrição sintética da tarefa {i + 1}",
+            "prioridade": prioridades[i],
+            "status": status[i],
+            "origem": origens[i],
+            "data_criacao": criacao.isoformat(),
+            "data_conclusao": conclusao.isoformat() if conclusao else None,
+        })
+    with open("tarefas.json", "w", encoding="utf-8") as f:
+        json.dump(tarefas, f, ensure_ascii=False)
+    with open("tarefas_arquivadas.jsonl", "w", encoding="utf-8") as f:
+        for t in tarefas[: tamanho // 4]:
+            f.write(json.dumps(dict(t, status="Arquivado"), ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+
+
+def preparar(tamanho):
+    gerar(tamanho)
+    # Converte para o formato do backend (e as arquivadas para as partições)
+    # fora da medição.
+    import tarefas
+    tarefas.load_data()
+    tarefas.save_data()
+    tarefas.armazenamento.fechar()
+
+
+@contextmanager
+def cronometro(resultados, nome, divisor=1):
+    inicio = time.perf_counter()
+    yield
+    resultados[nome] = (time.perf_counter() - inicio) / divisor
+
+
+def medir(tamanho):
+    import tarefas
+    resultados = {}
+    aleatorio = random.Random(7)
+    with open(os.devnull, "w", encoding="utf-8") as nulo, redirect_stdout(nulo):
+        with cronometro(resultados, "load_data"):
+            tarefas.load_data()
+        ids = [aleatorio.randint(1, tamanho) for _ in range(AMOSTRAS_ID)]
+        with cronometro(resultados, "obter_id", len(ids)):
+            for id_tarefa in ids:
+                tarefas.tarefas.obter(id_tarefa)
+        with cronometro(resultados, "verificar_urgencia"):
+            tarefas.verificar_urgencia()
+        with cronometro(resultados, "ciclo_concluir_verificar", CICLOS):
+            for _ in range(CICLOS):
+                tarefas.concluir_tarefa()
+                tarefas.verificar_urgencia()
+        with cronometro(resultados, "arquivar_tarefas_antigas"):
+            tarefas.arquivar_tarefas_antigas()
+        agora = datetime.now()
+        lote = [
+            Tarefa(tamanho + i + 1, "Arquivada", "", "Média", "Arquivado", "E-mail", agora, agora)
+            for i in range(LOTE_ARQUIVADAS)
+        ]
+        with cronometro(resultados, "save_arquivadas"):
+            tarefas.save_arquivadas(lote)
+        with cronometro(resultados, "relatorio"):
+            tarefas.relatorio()
+        with cronometro(resultados, "save_data"):
+            tarefas.save_data()
+    tarefas.armazenamento.fechar()
+    return resultados
+
+
+def _filho(etapa, tamanho, backend, diretorio):
+    ambiente = dict(os.environ, TAREFAS_DIARIO="1", TAREFAS_RETENCAO_DIAS="30", **AMBIENTE[backend])
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--filho", etapa, str(tamanho), backend],
+        cwd=diretorio, env=ambiente, check=True, stdout=subprocess.PIPE, text=True,
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1]) if etapa == "medir" else None
+
+
+def executar(tamanho, backend, repeticoes):
+    melhores = {}
+    for _ in range(repeticoes):
+        with tempfile.TemporaryDirectory() as diretorio:
+            _filho("preparar", tamanho, backend, diretorio)
+            for operacao, segundos in _filho("medir", tamanho, backend, diretorio).items():
+                melhores[operacao] = min(segundos, melhores.get(operacao, segundos))
+    return melhores
+
+
+def comparar(resultados, base, tolerancia, minimo=0.005):
+    """
+    Lista as operações mais lentas que na linha de base.
+
+    Diferenças abaixo de `minimo` segundos são ignoradas, pois operações
+    muito rápidas (ou dominadas por um fsync) variam mais que a tolerância
+    entre execuções.
+
+    Returns:
+        list: Tuplas (backend, tamanho, operação, base, atual)
+    """
+    regressoes = []
+    for backend, tamanhos in resultados.items():
+        for tamanho, operacoes in tamanhos.items():
+            anteriores = base.get(backend, {}).get(tamanho, {})
+            for operacao, atual in operacoes.items():
+                anterior = anteriores.get(operacao)
+                if anterior is not None and atual > anterior * (1 + tolerancia) and atual - anterior > minimo:
+                    regressoes.append((backend, tamanho, operacao, anterior, atual))
+    return regressoes
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--filho":
+        etapa, tamanho, backend = sys.argv[2], int(sys.argv[3]), sys.argv[4]
+        if etapa == "preparar":
+            preparar(tamanho)
+        else:
+            print(json.dumps(medir(tamanho)))
+        return
+    parser = argparse.ArgumentParser(description="Benchmark das operações de tarefas.py")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--backends", nargs="+", choices=sorted(AMBIENTE), default=["json"])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", default="resultados_operacoes.json")
+    parser.add_argument("--base", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "linha_de_base.json"))
+    parser.add_argument("--gravar-base", action="store_true", help="grava os resultados como nova linha de base")
+    parser.add_argument("--tolerancia", type=float, default=0.5)
+    parser.add_argument("--minimo", type=float, default=0.005, help="diferença mínima em segundos")
+    args = parser.parse_args()
+
+    resultados = {}
+    for backend in args.backends:
+        for tamanho in args.tamanhos:
+            operacoes = executar(tamanho, backend, args.repeticoes)
+            resultados.setdefault(backend, {})[str(tamanho)] = operacoes
+            print(f"{backend} {tamanho}:")
+            for operacao, segundos in operacoes.items():
+                print(f"  {operacao:26s} {segundos * 1000:12.4f} ms")
+    documento = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(documento, f, ensure_ascii=False, indent=4)
+    print(f"Resultados gravados em {args.saida}.")
+    if args.gravar_base:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(documento, f, ensure_ascii=False, indent=4)
+        print(f"Linha de base gravada em {args.base}.")
+        return
+    if not os.path.exists(args.base):
+        return
+    with open(args.base, "r", encoding="utf-8") as f:
+        base = json.load(f)["resultados"]
+    regressoes = comparar(resultados, base, args.tolerancia, args.minimo)
+    for backend, tamanho, operacao, anterior, atual in regressoes:
+        print(f"REGRESSÃO {backend} {tamanho} {operacao}: {anterior * 1000:.3f} ms -> {atual * 1000:.3f} ms")
+    if regressoes:
+        sys.exit(1)
+    print(f"Nenhuma regressão acima de {args.tolerancia:.0%} em relação à linha de base.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Mede a vazão de reservas com vários trabalhadores em processos separados
+sobre o mesmo banco SQLite: cada trabalhador reserva a próxima tarefa e a
+conclui, até a fila esvaziar.
+
+Com --lote K, cada processo atende K trabalhadores e faz as K reservas em
+uma transação (tarefas.reservar_proximas) e as K conclusões em outra: o
+custo da trava de escrita do banco é dividido pelo lote, e a vazão cresce
+com o número de trabalhadores por transação mesmo quando os processos se
+revezam na trava.
+
+Uso:
+    python benchmarks/bench_reservas.py [--lote K] [tarefas] [trabalhadores...]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.environ["TAREFAS_BACKEND"] = "sqlite"
+
+
+def preparar(diretorio, quantidade):
+    os.chdir(diretorio)
+    import tarefas
+    tarefas.load_data()
+    registros = (
+        {"titulo": f"Tarefa {i}", "descricao": "", "prioridade": ("Urgente", "Alta", "Média", "Baixa")[i % 4],
+         "origem": "E-mail"}
+        for i in range(quantidade)
+    )
+    tarefas.importar_tarefas(registros)
+    tarefas.armazenamento.fechar()
+
+
+def trabalhar(diretorio, nome, inicio, resultado, lote=1):
+    os.chdir(diretorio)
+    import tarefas
+    tarefas.load_data()
+    inicio.wait()
+    feitas = 0
+    if lote == 1:
+        while tarefas.reservar_proxima(nome) is not None:
+            tarefas.concluir_tarefa_atual(nome)
+            feitas += 1
+    else:
+        nomes = [f"{nome}.{i}" for i in range(lote)]
+        while any(t is not None for t in tarefas.reservar_proximas(nomes).values()):
+            feitas += len(tarefas.concluir_tarefas_atuais(nomes))
+    tarefas.armazenamento.fechar()
+    resultado.put(feitas)
+
+
+def medir(quantidade, trabalhadores, lote=1):
+    with tempfile.TemporaryDirectory() as diretorio:
+        processo = multiprocessing.Process(target=preparar, args=(diretorio, quantidade))
+        processo.start()
+        processo.join()
+        inicio = multiprocessing.Event()
+        resultado = multiprocessing.Queue()
+        processos = [
+            multiprocessing.Process(target=trabalhar, args=(diretorio, f"trabalhador-{i}", inicio, resultado, lote))
+            for i in range(trabalhadores)
+        ]
+        for p in processos:
+            p.start()
+        time.sleep(0.5)
+        comeco = time.perf_counter()
+        inicio.set()
+        feitas = [resultado.get() for _ in processos]
+        duracao = time.perf_counter() - comeco
+        for p in processos:
+            p.join()
+    return sum(feitas), duracao
+
+
+def main():
+    argumentos = sys.argv[1:]
+    lote = 1
+    if argumentos[:1] == ["--lote"]:
+        lote = int(argumentos[1])
+        argumentos = argumentos[2:]
+    quantidade = int(argumentos[0]) if argumentos else 2000
+    contagens = [int(n) for n in argumentos[1:]] or [1, 2, 4, 8]
+    print(f"Tarefas na fila: {quantidade}, {lote} trabalhador(es) por processo")
+    for processos in contagens:
+        feitas, duracao = medir(quantidade, processos, lote)
+        print(f"{processos:2d} processo(s), {processos * lote:3d} trabalhador(es): "
+              f"{feitas} reservas em {duracao:6.2f} s ({feitas / duracao:8.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Gerador de carga para o servidor HTTP/JSON (servidor.py).
+
+Abre várias conexões keep-alive e, durante alguns segundos, envia uma mistura
+de leituras (consulta por ID), criações e ciclos de reserva + conclusão.
+Mostra pedidos por segundo e percentis de latência.
+
+Sem --url, sobe um servidor novo em um diretório temporário.
+
+Uso:
+    python benchmarks/carga_servidor.py [--url http://127.0.0.1:8080]
+        [--conexoes 64] [--duracao 5] [--leituras 0.8]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Cliente:
+    def __init__(self, leitor, escritor):
+        self.leitor = leitor
+        self.escritor = escritor
+
+    @classmethod
+    async def conectar(cls, host, porta):
+        return cls(*await asyncio.open_connection(host, porta))
+
+    async def pedir(self, metodo, caminho, corpo=None):
+        dados = json.dumps(corpo).encode("utf-8") if corpo is not None else b""
+        self.escritor.write(
+            f"{metodo} {caminho} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(dados)}\r\n\r\n".encode("latin-1")
+            + dados
+        )
+        cabecalho = await self.leitor.readuntil(b"\r\n\r\n")
+        linhas = cabecalho.decode("latin-1").split("\r\n")
+        status = int(linhas[0].split(" ", 2)[1])
+        tamanho = 0
+        for linha in linhas[1:]:
+            nome, _, valor = linha.partition(":")
+            if nome.strip().lower() == "content-length":
+                tamanho = int(valor)
+        return status, json.loads(await self.leitor.readexactly(tamanho))
+
+    def fechar(self):
+        self.escritor.close()
+
+
+async def trabalhar(cliente, nome, fim, proporcao_leituras, ids, latencias, erros):
+    while time.perf_counter() < fim:
+        sorteio = random.random()
+        inicio = time.perf_counter()
+        if sorteio < proporcao_leituras and ids:
+            status, _ = await cliente.pedir("GET", f"/tarefas/{random.choice(ids)}")
+            ok = status in (200, 404)
+        elif sorteio < (1 + proporcao_leituras) / 2:
+            status, tarefa = await cliente.pedir("POST", "/tarefas", {
+                "titulo": "Carga", "descricao": "", "prioridade": random.choice(["Urgente", "Alta", "Média", "Baixa"]),
+                "origem": "E-mail",
+            })
+            ok = status == 201
+            if ok:
+                ids.append(tarefa["id"])
+        else:
+            status, tarefa = await cliente.pedir("POST", f"/trabalhadores/{nome}/proxima", {"duracao_segundos": 60})
+            ok = status == 200
+            if ok and tarefa is not None:
+                latencias.append(time.perf_counter() - inicio)
+                inicio = time.perf_counter()
+                status, _ = await cliente.pedir("POST", f"/trabalhadores/{nome}/concluir")
+                ok = status == 200
+        latencias.append(time.perf_counter() - inicio)
+        if not ok:
+            erros.append(status)
+
+
+async def gerar_carga(host, porta, conexoes, duracao, proporcao_leituras):
+    clientes = [await Cliente.conectar(host, porta) for _ in range(conexoes)]
+    status, existentes = await clientes[0].pedir("GET", "/tarefas?limite=1000")
+    ids = [t["id"] for t in existentes] if status == 200 else []
+    latencias = []
+    erros = []
+    inicio = time.perf_counter()
+    fim = inicio + duracao
+    await asyncio.gather(*(
+        trabalhar(cliente, f"carga-{i}", fim, proporcao_leituras, ids, latencias, erros)
+        for i, cliente in enumerate(clientes)
+    ))
+    total = time.perf_counter() - inicio
+    for cliente in clientes:
+        cliente.fechar()
+    return latencias, erros, total
+
+
+def esperar_porta(host, porta, limite=10.0):
+    fim = time.time() + limite
+    while time.time() < fim:
+        try:
+            asyncio.run(asyncio.wait_for(asyncio.open_connection(host, porta), 1))
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("O servidor não respondeu.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga para o servidor de tarefas")
+    parser.add_argument("--url")
+    parser.add_argument("--conexoes", type=int, default=64)
+    parser.add_argument("--duracao", type=float, default=5.0)
+    parser.add_argument("--leituras", type=float, default=0.8, help="proporção de leituras (0 a 1)")
+    args = parser.parse_args()
+    processo = None
+    diretorio = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, porta = url.hostname, url.port or 80
+    else:
+        host, porta = "127.0.0.1", 18080
+        diretorio = tempfile.TemporaryDirectory()
+        processo = subprocess.Popen(
+            [sys.executable, os.path.join(RAIZ, "tarefas.py"), "servidor", "--host", host, "--porta", str(porta)],
+            cwd=diretorio.name, stdout=subprocess.DEVNULL,
+        )
+        esperar_porta(host, porta)
+    try:
+        latencias, erros, total = asyncio.run(gerar_carga(host, porta, args.conexoes, args.duracao, args.leituras))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+            diretorio.cleanup()
+    latencias.sort()
+
+    def percentil(p):
+        return latencias[min(len(latencias) - 1, int(p / 100 * len(latencias)))] * 1000
+
+    print(f"Conexões: {args.conexoes} | Leituras: {args.leituras:.0%} | Duração: {total:.1f} s")
+    print(f"Pedidos: {len(latencias)} ({len(latencias) / total:.0f}/s) | Erros: {len(erros)}")
+    print(f"Latência: p50 {percentil(50):.2f} ms | p90 {percentil(90):.2f} ms | p99 {percentil(99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Simula uma fila de chegadas sintéticas com cada política de politicas.py e
+mostra os percentis da espera (da criação até o início do atendimento).
+
+As tarefas chegam em um processo de Poisson com a mistura de prioridades e
+origens abaixo e são atendidas por um único trabalhador, uma de cada vez,
+com duração exponencial. Com --carga acima de 1 a fila cresce sem parar e a
+política estrita deixa as tarefas de prioridade baixa esperando para
+sempre; "pendentes" conta as que ficaram sem atendimento no fim.
+
+Uso:
+    python benchmarks/simular_politicas.py [--horas H] [--chegadas N] [--carga R] [--semente S]
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import politicas
+from modelo import ORIGENS, PRIORIDADES, Tarefa
+from repositorio import RepositorioTarefas
+
+PESOS_PRIORIDADE = (1, 2, 3, 4)
+PESOS_ORIGEM = (6, 3, 1)
+PERCENTIS = (50, 90, 99)
+
+
+def chegadas(horas, por_hora, semente):
+    """
+    Yields:
+        tuple: (instante em horas, prioridade, origem), em ordem de chegada
+    """
+    aleatorio = random.Random(semente)
+    instante = 0.0
+    while True:
+        instante += aleatorio.expovariate(por_hora)
+        if instante >= horas:
+            return
+        yield (
+            instante,
+            aleatorio.choices(PRIORIDADES, PESOS_PRIORIDADE)[0],
+            aleatorio.choices(ORIGENS, PESOS_ORIGEM)[0],
+        )
+
+
+def simular(politica, horas, por_hora, carga, semente):
+    """
+    Returns:
+        tuple: (esperas, pendentes), em que esperas é uma lista de
+        (espera em horas, prioridade, origem) das tarefas atendidas e
+        pendentes é a quantidade sem atendimento no fim
+    """
+    inicio = datetime(2026, 1, 1)
+    repositorio = RepositorioTarefas()
+    repositorio.inscrever(politica.ao_alterar)
+    politica.carregar(repositorio)
+    duracoes = random.Random(semente + 1)
+    # Eventos: (instante, ordem, tipo, dados); o trabalhador fica livre em "fim".
+    eventos = [(h, i, "chegada", (p, o)) for i, (h, p, o) in enumerate(chegadas(horas, por_hora, semente))]
+    heapq.heapify(eventos)
+    sequencia = len(eventos)
+    livre = True
+    esperas = []
+    while eventos:
+        agora, _, tipo, dados = heapq.heappop(eventos)
+        if tipo == "chegada":
+            prioridade, origem = dados
+            repositorio.adicionar(Tarefa(
+                len(repositorio) + len(esperas) + 1, "Simulada", "", prioridade, "Pendente", origem,
+                inicio + timedelta(hours=agora),
+            ))
+        else:
+            repositorio.alterar_status(dados, "Concluída", inicio + timedelta(hours=agora))
+            repositorio.remover(dados.id)
+            livre = True
+        if livre:
+            tarefa = politica.proxima()
+            if tarefa is not None:
+                repositorio.alterar_status(tarefa, "Fazendo")
+                espera = agora - (tarefa.data_criacao - inicio) / timedelta(hours=1)
+                esperas.append((espera, tarefa.prioridade, tarefa.origem))
+                fim = agora + duracoes.expovariate(por_hora * carga ** -1)
+                if fim < horas:
+                    heapq.heappush(eventos, (fim, sequencia, "fim", tarefa))
+                    sequencia += 1
+                livre = False
+    return esperas, len(repositorio) - (0 if livre else 1)
+
+
+def percentis(valores):
+    valores = sorted(valores)
+    if not valores:
+        return {p: None for p in PERCENTIS}
+    return {p: valores[min(len(valores) - 1, len(valores) * p // 100)] for p in PERCENTIS}
+
+
+def _formatar(resultado):
+    return " ".join("-" if v is None else f"p{p}={v:7.1f}h" for p, v in resultado.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulação das políticas de escolha")
+    parser.add_argument("--horas", type=float, default=2000)
+    parser.add_argument("--chegadas", type=float, default=10, help="tarefas por hora")
+    parser.add_argument("--carga", type=float, default=1.02, help="chegadas / capacidade de atendimento")
+    parser.add_argument("--semente", type=int, default=1)
+    args = parser.parse_args()
+    print(f"{args.horas:.0f} h, {args.chegadas:g} chegadas/h, carga {args.carga:g}")
+    for nome in politicas.NOMES:
+        esperas, pendentes = simular(politicas.criar(nome), args.horas, args.chegadas, args.carga, args.semente)
+        prazos = politicas.PRAZOS_ORIGEM
+        fora_do_prazo = sum(e > prazos[o] / timedelta(hours=1) for e, _, o in esperas)
+        print(f"\n{nome}: {len(esperas)} atendidas | {pendentes} pendentes | "
+              f"{100 * fora_do_prazo / max(len(esperas), 1):.1f}% fora do prazo da origem")
+        print(f"  {'todas':<20} {_formatar(percentis(e for e, _, _ in esperas))}")
+        for grupo, indice in ((PRIORIDADES, 1), (ORIGENS, 2)):
+            for rotulo in grupo:
+                print(f"  {rotulo:<20} {_formatar(percentis(e[0] for e in esperas if e[indice] == rotulo))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Busca textual no título e na descrição das tarefas ativas e arquivadas.
+
+O texto é quebrado em palavras em minúsculas e sem acento ("Média", "média"
+e "media" são a mesma palavra), sem as palavras curtas mais comuns do
+português (PARADAS). Um índice invertido aponta cada palavra para as tarefas
+em que ela aparece e quantas vezes, de modo que uma busca só visita as
+tarefas que contêm as palavras pedidas.
+
+Consultas:
+
+    relatorio mensal      qualquer das palavras
+    +relatorio mensal     "+" exige a palavra
+    relatorio -mensal     "-" exclui as tarefas com a palavra
+
+No modo "ranqueado" o resultado vem da tarefa mais relevante para a menos
+relevante (BM25). No modo "booleano" todas as palavras sem sinal também são
+exigidas e o resultado vem do ID mais novo para o mais antigo, sem cálculo
+de relevância.
+"""
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from modelo import CODIGO_STATUS
+
+MODOS = ("ranqueado", "booleano")
+PARADAS = frozenset("a o as os e de da do das dos em no na nos nas um uma para por com que".split())
+
+ARQUIVADO = CODIGO_STATUS["Arquivado"]
+EXCLUIDA = CODIGO_STATUS["Excluída"]
+
+_PALAVRA = re.compile(r"\w+")
+_ACENTO = re.compile("[\u0300-\u036f]")
+
+
+def palavras(texto):
+    """
+    Args:
+        texto (str): Texto livre
+
+    Returns:
+        list: Palavras normalizadas do texto, na ordem em que aparecem
+    """
+    texto = _ACENTO.sub("", unicodedata.normalize("NFKD", texto.casefold()))
+    return [p for p in _PALAVRA.findall(texto) if p not in PARADAS]
+
+
+def analisar(consulta):
+    """
+    Separa as palavras de uma consulta.
+
+    Args:
+        consulta (str): Consulta digitada
+
+    Returns:
+        tuple: Listas (opcionais, obrigatorias, proibidas)
+
+    Raises:
+        ValueError: Se a consulta não tiver nenhuma palavra a procurar
+    """
+    opcionais, obrigatorias, proibidas = [], [], []
+    for parte in consulta.split():
+        destino = opcionais
+        if parte[0] == "+":
+            destino = obrigatorias
+        elif parte[0] == "-":
+            destino = proibidas
+        destino.extend(palavras(parte.lstrip("+-")))
+    if not opcionais and not obrigatorias:
+        raise ValueError("Informe ao menos uma palavra para buscar.")
+    return opcionais, obrigatorias, proibidas
+
+
+class IndiceTextual:
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.construido = False
+        # palavra -> {chave: ocorrências}. A chave de uma tarefa ativa é o ID;
+        # a de uma arquivada é negativa, pois IDs arquivados podem se repetir.
+        self._postagens = {}
+        self._documentos = {}
+        self._total_palavras = 0
+        self._proxima_arquivada = -1
+
+    def carregar(self, ativas, arquivadas):
+        """
+        Constrói o índice. Até aqui as notificações do repositório são
+        ignoradas.
+
+        Args:
+            ativas (iterable): Tarefas do repositório
+            arquivadas (iterable): Tarefas arquivadas ou excluídas
+        """
+        for tarefa in ativas:
+            self._indexar(tarefa.id, tarefa)
+        for tarefa in arquivadas:
+            self._indexar_arquivada(tarefa)
+        self.construido = True
+
+    def descartar(self):
+        """Esvazia o índice; a próxima busca o constrói de novo."""
+        self.__init__()
+
+    def _indexar(self, chave, tarefa):
+        contagem = Counter(palavras(tarefa.titulo))
+        contagem.update(palavras(tarefa.descricao))
+        postagens = self._postagens
+        for palavra, ocorrencias in contagem.items():
+            lista = postagens.get(palavra)
+            if lista is None:
+                lista = postagens[palavra] = {}
+            lista[chave] = ocorrencias
+        tamanho = sum(contagem.values())
+        self._documentos[chave] = (tarefa, tamanho)
+        self._total_palavras += tamanho
+
+    def _indexar_arquivada(self, tarefa):
+        self._indexar(self._proxima_arquivada, tarefa)
+        self._proxima_arquivada -= 1
+
+    def _desindexar(self, chave):
+        tarefa, tamanho = self._documentos.pop(chave)
+        for palavra in set(palavras(tarefa.titulo) + palavras(tarefa.descricao)):
+            lista = self._postagens[palavra]
+            del lista[chave]
+            if not lista:
+                del self._postagens[palavra]
+        self._total_palavras -= tamanho
+        return tarefa
+
+    def ao_alterar(self, evento, tarefa, anterior):
+        """
+        Ouvinte do repositório. Status e prioridade são lidos da própria
+        tarefa na hora da busca, então só criação e remoção mexem no índice;
+        uma tarefa removida depois de arquivada ou excluída continua
+        pesquisável como arquivada.
+        """
+        if not self.construido:
+            return
+        if evento == "adicionada":
+            self._indexar(tarefa.id, tarefa)
+        elif evento == "removida" and tarefa.id in self._documentos:
+            self._desindexar(tarefa.id)
+            if tarefa.cod_status in (ARQUIVADO, EXCLUIDA):
+                self._indexar_arquivada(tarefa)
+
+    def buscar(self, consulta, modo="ranqueado", status=None, prioridade=None, limite=20):
+        """
+        Args:
+            consulta (str): Consulta (veja o início do módulo)
+            modo (str): "ranqueado" ou "booleano"
+            status (int): Código de status exigido, ou None
+            prioridade (int): Código de prioridade exigido, ou None
+            limite (int): Máximo de tarefas devolvidas
+
+        Returns:
+            list: Tarefas encontradas, na ordem do modo
+        """
+        opcionais, obrigatorias, proibidas = analisar(consulta)
+        if modo == "booleano":
+            obrigatorias += opcionais
+            opcionais = []
+        postagens = self._postagens
+        vazia = {}
+        if obrigatorias:
+            # Começa pela lista mais curta; as interseções só encolhem.
+            listas = sorted((postagens.get(p, vazia) for p in set(obrigatorias)), key=len)
+            candidatas = set(listas[0])
+            for lista in listas[1:]:
+                candidatas.intersection_update(lista)
+        else:
+            candidatas = set()
+            for palavra in set(opcionais):
+                candidatas.update(postagens.get(palavra, vazia))
+        for palavra in proibidas:
+            candidatas.difference_update(postagens.get(palavra, vazia))
+        documentos = self._documentos
+        if status is not None:
+            candidatas = {c for c in candidatas if documentos[c][0].cod_status == status}
+        if prioridade is not None:
+            candidatas = {c for c in candidatas if documentos[c][0].cod_prioridade == prioridade}
+        if modo == "booleano":
+            chaves = heapq.nlargest(limite, candidatas, key=lambda c: (documentos[c][0].id, c))
+        else:
+            pontos = self._pontuar(candidatas, set(opcionais + obrigatorias))
+            chaves = heapq.nlargest(limite, pontos, key=pontos.get)
+        return [documentos[c][0] for c in chaves]
+
+    def _pontuar(self, candidatas, termos):
+        documentos = self._documentos
+        total = len(documentos)
+        media = self._total_palavras / total if total else 0
+        k1, b = self.K1, self.B
+        pontos = dict.fromkeys(candidatas, 0.0)
+        for palavra in termos:
+            lista = self._postagens.get(palavra)
+            if not lista:
+                continue
+            idf = math.log(1 + (total - len(lista) + 0.5) / (len(lista) + 0.5))
+            if len(lista) <= len(pontos):
+                pares = ((c, n) for c, n in lista.items() if c in pontos)
+            else:
+                pares = ((c, lista[c]) for c in pontos if c in lista)
+            for chave, ocorrencias in pares:
+                tamanho = documentos[chave][1]
+                pontos[chave] += idf * ocorrencias * (k1 + 1) / (
+                    ocorrencias + k1 * (1 - b + b * tamanho / media)
+                )
+        return pontos
@@ -0,0 +1,164 @@
+"""
+Cache dos relatórios já formatados.
+
+Três caches LRU, limitados pelo total de linhas guardadas:
+
+    linhas      linha formatada de cada tarefa ativa; uma alteração (criar,
+                mudar prioridade, concluir, excluir, arquivar) descarta só a
+                linha da tarefa alterada, avisada pelo repositório
+    paginas     páginas do relatório, pela versão das ativas, ordem, cursor,
+                tamanho e filtros; depois de uma alteração as páginas são
+                remontadas com as linhas que continuam no cache
+    agregados   relatório de arquivadas e painel, pela versão das ativas
+                e/ou das arquivadas
+
+As versões vêm de Armazenamento.versao(). Se outro processo alterar o
+armazenamento (SQLite), todas as linhas são descartadas, pois os avisos do
+repositório só cobrem as alterações deste processo.
+"""
+from collections import OrderedDict
+
+
+class LRU:
+    def __init__(self, capacidade):
+        """
+        Args:
+            capacidade (int): Peso máximo somado das entradas
+        """
+        self.capacidade = capacidade
+        self.peso = 0
+        self.acertos = 0
+        self.falhas = 0
+        self._entradas = OrderedDict()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obter(self, chave):
+        """
+        Returns:
+            object: Valor guardado, ou None (a entrada passa a ser a mais recente)
+        """
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            self.falhas += 1
+            return None
+        self._entradas.move_to_end(chave)
+        self.acertos += 1
+        return entrada[0]
+
+    def guardar(self, chave, valor, peso=1):
+        """
+        Guarda um valor, descartando as entradas menos usadas até caber.
+        Valores mais pesados que a capacidade inteira não são guardados.
+        """
+        self.descartar(chave)
+        if peso > self.capacidade:
+            return
+        self._entradas[chave] = (valor, peso)
+        self.peso += peso
+        while self.peso > self.capacidade:
+            _, (_, removido) = self._entradas.popitem(last=False)
+            self.peso -= removido
+
+    def descartar(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is not None:
+            self.peso -= entrada[1]
+
+    def limpar(self):
+        self._entradas.clear()
+        self.peso = 0
+
+
+class CacheRelatorios:
+    def __init__(self, armazenamento, linhas=100000, paginas=20000, agregados=50000):
+        """
+        Args:
+            armazenamento (Armazenamento): De onde vêm as tarefas e as versões
+            linhas (int): Máximo de linhas de tarefas guardadas
+            paginas (int): Máximo de linhas somadas das páginas guardadas
+            agregados (int): Máximo de linhas somadas dos agregados guardados
+        """
+        self.armazenamento = armazenamento
+        self.linhas = LRU(linhas)
+        self.paginas = LRU(paginas)
+        self.agregados = LRU(agregados)
+        self._formatadores = set()
+        self._externa = None
+        armazenamento.tarefas.inscrever(self.ao_alterar)
+
+    def ao_alterar(self, evento, tarefa, anterior):
+        for formatar in self._formatadores:
+            self.linhas.descartar((formatar, tarefa.id))
+
+    def _versao(self):
+        ativas, arquivadas, externa = self.armazenamento.versao()
+        if externa != self._externa:
+            self.linhas.limpar()
+            self._externa = externa
+        return ativas, arquivadas, externa
+
+    def _linha(self, formatar, tarefa):
+        chave = (formatar, tarefa.id)
+        linha = self.linhas.obter(chave)
+        if linha is None:
+            linha = formatar(tarefa)
+            self._formatadores.add(formatar)
+            self.linhas.guardar(chave, linha)
+        return linha
+
+    def pagina(self, formatar, ordem, cursor=None, limite=20, status=None, prioridade=None):
+        """
+        Uma página já formatada (veja Armazenamento.pagina).
+
+        Returns:
+            tuple: (linhas, cursor da próxima página ou None)
+        """
+        ativas, _, externa = self._versao()
+        chave = (formatar, ativas, externa, ordem, cursor, limite, status, prioridade)
+        pagina = self.paginas.obter(chave)
+        if pagina is None:
+            tarefas, proximo = self.armazenamento.pagina(ordem, cursor, limite, status, prioridade)
+            pagina = ([self._linha(formatar, t) for t in tarefas], proximo)
+            self.paginas.guardar(chave, pagina, max(len(tarefas), 1))
+        return pagina
+
+    def agregado(self, chave, calcular, arquivadas=True):
+        """
+        Resultado de `calcular()` (uma lista de linhas), refeito só quando as
+        ativas ou, com `arquivadas`, as arquivadas mudam.
+        """
+        ativas, versao_arquivadas, externa = self._versao()
+        chave = (chave, ativas, versao_arquivadas if arquivadas else None, externa)
+        linhas = self.agregados.obter(chave)
+        if linhas is None:
+            linhas = calcular()
+            self.agregados.guardar(chave, linhas, max(len(linhas), 1))
+        return linhas
+
+    def arquivadas(self, formatar, **filtros):
+        """
+        Linhas do relatório de arquivadas (filtros de ler_arquivadas). A
+        primeira leitura é feita aos poucos e só guardada se chegar ao fim e
+        couber no cache.
+
+        Yields:
+            str: Linha de uma tarefa arquivada
+        """
+        _, versao_arquivadas, externa = self._versao()
+        chave = (formatar, versao_arquivadas, externa, tuple(sorted(filtros.items())))
+        linhas = self.agregados.obter(chave)
+        if linhas is not None:
+            yield from linhas
+            return
+        linhas = []
+        for t in self.armazenamento.ler_arquivadas(**filtros):
+            linha = formatar(t)
+            if linhas is not None:
+                linhas.append(linha)
+                if len(linhas) > self.agregados.capacidade:
+                    linhas = None
+            yield linha
+        if linhas is not None:
+            self.agregados.guardar(chave, linhas, max(len(linhas), 1))
@@ -0,0 +1,264 @@
+"""
+Exportação e importação paralelas de despejos completos das tarefas ativas.
+
+Um despejo tem as tarefas com ID, status e datas, no formato de
+Tarefa.para_json: em JSONL (uma tarefa por linha) ou em uma lista JSON,
+escrita com uma tarefa por linha. O trabalho caro por tarefa (datas em ISO
+8601, JSON e validação) é dividido em blocos e feito em um
+ProcessPoolExecutor:
+
+    exportar    o processo principal percorre as ativas em ordem de ID, em
+                páginas de TAMANHO_BLOCO (Armazenamento.pagina), e os
+                processos serializam cada bloco; os blocos são gravados na
+                ordem em que foram lidos, com no máximo dois por processo em
+                andamento
+    ler         o arquivo é cortado em faixas de bytes no início de uma
+                tarefa (nova linha no JSONL, '{"id":' na lista JSON); cada
+                processo lê a sua faixa do disco e devolve as tarefas já
+                validadas como códigos e datas em microssegundos
+
+As tarefas lidas voltam em ordem de ID do despejo; quem importa atribui IDs
+novos nessa ordem (tarefas.importar_despejo). Despejos menores que um bloco
+são tratados no próprio processo.
+"""
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import chain, islice
+
+from modelo import CODIGO_ORIGEM, CODIGO_PRIORIDADE, CODIGO_STATUS, Tarefa, para_epoca
+
+TAMANHO_BLOCO = 50000
+BYTES_BLOCO = 16 * 1024 * 1024
+
+# Uma tarefa sendo feita na origem volta para a fila no destino, onde a
+# reserva não existe; arquivadas e excluídas não são tarefas ativas.
+STATUS_IMPORTADO = {
+    "Pendente": CODIGO_STATUS["Pendente"],
+    "Fazendo": CODIGO_STATUS["Pendente"],
+    "Concluída": CODIGO_STATUS["Concluída"],
+}
+
+# Dentro de uma string JSON as aspas são escapadas, então '{"id":' só
+# aparece no início de uma tarefa.
+_INICIO_TAREFA = re.compile(rb'\{\s*"id"\s*:')
+
+
+def formato_de(caminho):
+    """
+    Returns:
+        str: "jsonl" para arquivos .jsonl, senão "json"
+    """
+    return "jsonl" if caminho.endswith(".jsonl") else "json"
+
+
+def _codigos(tarefa):
+    return (
+        tarefa.id, tarefa.titulo, tarefa.descricao, tarefa.cod_prioridade,
+        tarefa.cod_status, tarefa.cod_origem, tarefa.criacao, tarefa.conclusao,
+    )
+
+
+def _serializar(linhas, formato):
+    partes = [
+        json.dumps(Tarefa.de_codigos(*linha).para_json(), ensure_ascii=False, separators=(",", ":"))
+        for linha in linhas
+    ]
+    separador = "\n" if formato == "jsonl" else ",\n"
+    return len(partes), separador.join(partes).encode("utf-8")
+
+
+def _blocos(armazenamento, tamanho_bloco):
+    cursor = None
+    while True:
+        tarefas, cursor = armazenamento.pagina("id", cursor, tamanho_bloco)
+        if tarefas:
+            yield [_codigos(t) for t in tarefas]
+        if cursor is None:
+            return
+
+
+def _em_ordem(funcao, tarefas, processos):
+    # Como Executor.map, mas sem consumir a entrada inteira de uma vez.
+    processos = processos or os.cpu_count() or 1
+    tarefas = iter(tarefas)
+    inicio = list(islice(tarefas, 2))
+    if len(inicio) < 2 or processos == 1:
+        for argumentos in chain(inicio, tarefas):
+            yield funcao(*argumentos)
+        return
+    with ProcessPoolExecutor(processos) as executor:
+        pendentes = deque()
+        for argumentos in chain(inicio, tarefas):
+            if len(pendentes) >= 2 * processos:
+                yield pendentes.popleft().result()
+            pendentes.append(executor.submit(funcao, *argumentos))
+        while pendentes:
+            yield pendentes.popleft().result()
+
+
+def exportar(armazenamento, caminho, processos=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Grava as tarefas ativas em ordem de ID (arquivo temporário trocado no fim).
+
+    Args:
+        armazenamento (Armazenamento): Origem das tarefas
+        caminho (str): Arquivo de destino; o formato vem da extensão
+        processos (int): Processos do pool (padrão: um por núcleo)
+        tamanho_bloco (int): Tarefas por bloco
+
+    Returns:
+        int: Quantidade de tarefas exportadas
+    """
+    formato = formato_de(caminho)
+    temporario = caminho + ".tmp"
+    exportadas = 0
+    blocos = ((bloco, formato) for bloco in _blocos(armazenamento, tamanho_bloco))
+    with open(temporario, "wb") as f:
+        if formato == "json":
+            f.write(b"[\n")
+        primeiro = True
+        for quantidade, dados in _em_ordem(_serializar, blocos, processos):
+            if not primeiro:
+                f.write(b"\n" if formato == "jsonl" else b",\n")
+            f.write(dados)
+            primeiro = False
+            exportadas += quantidade
+        if formato == "json":
+            f.write(b"\n]\n")
+        elif not primeiro:
+            f.write(b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+    return exportadas
+
+
+def _validar(registros):
+    validas = []
+    erros = []
+    for numero, t in enumerate(registros, start=1):
+        if not isinstance(t, dict):
+            erros.append((numero, "Registro inválido."))
+            continue
+        try:
+            id_original = t["id"]
+            titulo = (t.get("titulo") or "").strip()
+            criacao = para_epoca(datetime.fromisoformat(t["data_criacao"]))
+            conclusao = t.get("data_conclusao")
+            conclusao = para_epoca(datetime.fromisoformat(conclusao)) if conclusao else None
+        except (KeyError, TypeError, ValueError):
+            erros.append((numero, "ID ou datas ausentes ou inválidos."))
+            continue
+        status = STATUS_IMPORTADO.get(t.get("status"))
+        if not isinstance(id_original, int) or not titulo:
+            erros.append((numero, "ID e título são obrigatórios."))
+        elif t.get("prioridade") not in CODIGO_PRIORIDADE:
+            erros.append((numero, f"Prioridade inválida: {t.get('prioridade')!r}."))
+        elif status is None:
+            erros.append((numero, f"Status inválido: {t.get('status')!r}."))
+        elif t.get("origem") not in CODIGO_ORIGEM:
+            erros.append((numero, f"Origem inválida: {t.get('origem')!r}."))
+        elif status == STATUS_IMPORTADO["Concluída"] and conclusao is None:
+            erros.append((numero, "Tarefa concluída sem data de conclusão."))
+        else:
+            validas.append((
+                id_original, titulo, (t.get("descricao") or "").strip(), CODIGO_PRIORIDADE[t["prioridade"]],
+                status, CODIGO_ORIGEM[t["origem"]], criacao, conclusao,
+            ))
+    return validas, erros, len(registros)
+
+
+def _ler_faixa(caminho, inicio, fim, formato):
+    with open(caminho, "rb") as f:
+        f.seek(inicio)
+        dados = f.read(fim - inicio)
+    if formato == "jsonl":
+        linhas = [linha for linha in dados.splitlines() if linha.strip()]
+        try:
+            # Uma chamada só para a faixa inteira; linha a linha só se falhar.
+            registros = json.loads(b"[" + b",".join(linhas) + b"]")
+        except ValueError:
+            registros = []
+            for linha in linhas:
+                try:
+                    registros.append(json.loads(linha))
+                except ValueError:
+                    registros.append(None)
+        return _validar(registros)
+    corpo = dados.strip().lstrip(b"[").rstrip(b"]").strip().rstrip(b",")
+    try:
+        registros = json.loads(b"[" + corpo + b"]")
+    except ValueError:
+        return [], [(None, f"JSON inválido entre os bytes {inicio} e {fim}.")], 0
+    return _validar(registros)
+
+
+def _faixas(caminho, formato, bytes_bloco):
+    tamanho = os.path.getsize(caminho)
+    inicio = 0
+    with open(caminho, "rb") as f:
+        while inicio < tamanho:
+            corte = inicio + bytes_bloco
+            if corte >= tamanho:
+                break
+            f.seek(corte)
+            # Avança até o início da próxima tarefa, lendo em pedaços.
+            deslocamento = corte
+            proximo = None
+            while proximo is None:
+                pedaco = f.read(1 << 16)
+                if not pedaco:
+                    break
+                if formato == "jsonl":
+                    posicao = pedaco.find(b"\n")
+                    if posicao >= 0:
+                        proximo = deslocamento + posicao + 1
+                else:
+                    achado = _INICIO_TAREFA.search(pedaco)
+                    if achado:
+                        proximo = deslocamento + achado.start()
+                    elif len(pedaco) > 16:
+                        # O padrão pode estar cortado entre dois pedaços.
+                        f.seek(-16, os.SEEK_CUR)
+                        pedaco = pedaco[:-16]
+                deslocamento += len(pedaco)
+            if proximo is None or proximo >= tamanho:
+                break
+            yield inicio, proximo
+            inicio = proximo
+    if inicio < tamanho:
+        yield inicio, tamanho
+
+
+def ler(caminho, processos=None, bytes_bloco=BYTES_BLOCO):
+    """
+    Lê e valida um despejo em paralelo.
+
+    Args:
+        caminho (str): Arquivo .json ou .jsonl
+        processos (int): Processos do pool (padrão: um por núcleo)
+        bytes_bloco (int): Tamanho aproximado de cada faixa lida
+
+    Returns:
+        tuple: (tarefas, erros), em que tarefas são tuplas de códigos
+        (id do despejo, titulo, descricao, prioridade, status, origem,
+        criacao, conclusao) em ordem de ID do despejo e erros são tuplas
+        (número do registro, mensagem)
+    """
+    formato = formato_de(caminho)
+    faixas = ((caminho, inicio, fim, formato) for inicio, fim in _faixas(caminho, formato, bytes_bloco))
+    tarefas = []
+    erros = []
+    anteriores = 0
+    for validas, erros_bloco, quantidade in _em_ordem(_ler_faixa, faixas, processos):
+        tarefas.extend(validas)
+        erros.extend((None if numero is None else anteriores + numero, mensagem) for numero, mensagem in erros_bloco)
+        anteriores += quantidade
+    # Os blocos já vêm em ordem de arquivo; a ordenação estável só trabalha
+    # de fato se o despejo não estava em ordem de ID.
+    tarefas.sort(key=lambda t: t[0])
+    return tarefas, erros
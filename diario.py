@@ -0,0 +1,167 @@
+"""
+Diário de alterações (write-ahead log) das tarefas.
+
+Cada alteração no repositório (criação, mudança de prioridade, mudança de
+status e remoção) vira uma linha JSON compacta anexada ao arquivo de diário,
+com custo de E/S O(1) por alteração. O fsync é feito em lotes. Na
+inicialização, o estado é reconstruído lendo o snapshot (tarefas.json) e
+reaplicando o diário; a compactação grava um novo snapshot e esvazia o diário.
+
+Os registros guardam valores absolutos, então reaplicar um registro que já
+está refletido no snapshot não altera o resultado.
+"""
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+from modelo import Tarefa
+
+
+class Diario:
+    def __init__(self, caminho, lote_fsync=32):
+        self.caminho = caminho
+        self.lote_fsync = lote_fsync
+        self.registros = 0
+        self._arquivo = None
+        self._nao_sincronizados = 0
+        self._lote = None
+
+    def registrar(self, registro):
+        """
+        Anexa um registro ao diário.
+
+        O registro é enviado ao sistema operacional imediatamente, o que o
+        protege contra a queda do processo; o fsync, que protege contra a
+        queda da máquina, é feito a cada `lote_fsync` registros.
+
+        Args:
+            registro (dict): Registro com a chave "op"
+        """
+        linha = json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n"
+        if self._lote is not None:
+            self._lote.append(linha)
+            return
+        self._escrever(linha, 1)
+        if self._nao_sincronizados >= self.lote_fsync:
+            self.sincronizar()
+
+    def _escrever(self, texto, quantidade):
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, "a", encoding="utf-8")
+        self._arquivo.write(texto)
+        self._arquivo.flush()
+        self.registros += quantidade
+        self._nao_sincronizados += quantidade
+
+    @contextmanager
+    def em_lote(self):
+        """
+        Acumula os registros feitos dentro do bloco e grava todos de uma vez,
+        com uma única escrita e um único fsync ao final. Blocos aninhados
+        fazem parte do lote mais externo.
+        """
+        if self._lote is not None:
+            yield self
+            return
+        self._lote = []
+        try:
+            yield self
+        finally:
+            linhas, self._lote = self._lote, None
+            if linhas:
+                self._escrever("".join(linhas), len(linhas))
+                self.sincronizar()
+
+    def ao_alterar(self, evento, tarefa, anterior):
+        """
+        Ouvinte do repositório: transforma cada alteração em um registro.
+
+        Args:
+            evento (str): "adicionada", "prioridade", "status" ou "removida"
+            tarefa (Tarefa): Tarefa alterada
+            anterior: Valor anterior do campo alterado
+        """
+        if evento == "adicionada":
+            self.registrar({"op": "criar", "tarefa": tarefa.para_json()})
+        elif evento == "prioridade":
+            self.registrar({"op": "prioridade", "id": tarefa.id, "prioridade": tarefa.prioridade})
+        elif evento == "status":
+            conclusao = tarefa.data_conclusao
+            self.registrar({
+                "op": "status",
+                "id": tarefa.id,
+                "status": tarefa.status,
+                "data_conclusao": conclusao.isoformat() if conclusao else None,
+            })
+        elif evento == "removida":
+            self.registrar({"op": "remover", "id": tarefa.id})
+
+    def sincronizar(self):
+        """Força a gravação em disco dos registros ainda não sincronizados."""
+        if self._arquivo is not None and self._nao_sincronizados:
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+        self._nao_sincronizados = 0
+
+    def reproduzir(self, repositorio):
+        """
+        Reaplica o diário sobre o repositório carregado do snapshot, sem
+        notificar os ouvintes do repositório.
+
+        Uma última linha incompleta (queda no meio de uma escrita) é cortada
+        do arquivo, para que os próximos registros não sejam anexados a ela.
+
+        Args:
+            repositorio (RepositorioTarefas): Repositório com o snapshot
+        """
+        self.registros = 0
+        if not os.path.exists(self.caminho):
+            return
+        valido = 0
+        with open(self.caminho, "rb") as f, repositorio.sem_notificar():
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    break
+                valido += len(linha)
+                self.registros += 1
+                op = registro["op"]
+                if op == "criar":
+                    tarefa = Tarefa.de_json(registro["tarefa"])
+                    repositorio.remover(tarefa.id)
+                    repositorio.adicionar(tarefa)
+                elif op == "remover":
+                    repositorio.remover(registro["id"])
+                else:
+                    tarefa = repositorio.obter(registro["id"])
+                    if tarefa is None:
+                        continue
+                    if op == "prioridade":
+                        repositorio.alterar_prioridade(tarefa, registro["prioridade"])
+                    elif op == "status":
+                        conclusao = registro["data_conclusao"]
+                        repositorio.alterar_status(
+                            tarefa,
+                            registro["status"],
+                            data_conclusao=datetime.fromisoformat(conclusao) if conclusao else None,
+                        )
+        if valido < os.path.getsize(self.caminho):
+            os.truncate(self.caminho, valido)
+
+    def truncar(self):
+        """Esvazia o diário depois que um snapshot novo foi gravado."""
+        self.fechar()
+        with open(self.caminho, "w", encoding="utf-8"):
+            pass
+        self.registros = 0
+
+    def fechar(self):
+        """Sincroniza e fecha o arquivo do diário."""
+        if self._arquivo is not None:
+            self.sincronizar()
+            self._arquivo.close()
+            self._arquivo = None
@@ -0,0 +1,510 @@
+"""
+Fluxo de alterações das tarefas (change feed) em um log de segmentos.
+
+Cada alteração do repositório vira um evento com um offset sequencial,
+anexado ao log no diretório do fluxo:
+
+    00000000000000000000.jsonl   eventos 0 a EVENTOS_POR_SEGMENTO - 1
+    00000000000000010000.jsonl   os seguintes (o nome é o primeiro offset)
+    assinantes/<nome>.offset     próximo offset de cada assinante
+
+Um evento é uma linha JSON com "offset", "quando", "evento", "id",
+"anterior" (quando houver) e "tarefa" (Tarefa.para_json depois da
+alteração). Os eventos são os do Repositorio: "adicionada", "prioridade",
+"status" e "removida"; arquivar ou excluir uma tarefa gera um "status" para
+"Arquivado" ou "Excluída" seguido de um "removida".
+
+Quem consome guarda o offset do próximo evento e retoma dele: `ler` devolve
+os eventos já gravados, `acompanhar` (iterador bloqueante) e
+`acompanhar_async` (gerador assíncrono) esperam pelos novos, consultando o
+fim do log a cada `intervalo`. Uma Assinatura guarda o offset em disco; como
+ele só avança em `confirmar`, cada evento é entregue pelo menos uma vez.
+
+Os eventos de uma transação do armazenamento são gravados juntos no fim
+dela (em_lote), com uma escrita e um fsync. Vários processos (SQLite)
+anexam sob uma trava de arquivo, ainda dentro da transação do banco, então
+a ordem dos offsets é a ordem dos commits. Os segmentos já confirmados por
+todos os assinantes podem ser apagados (podar).
+"""
+import json
+import os
+import re
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime
+from json.encoder import encode_basestring
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+EVENTOS_POR_SEGMENTO = 10000
+INTERVALO_ESPERA = 0.5
+LIMITE_LEITURA = 1000
+EXTENSAO = ".jsonl"
+_NOME_ASSINANTE = re.compile(r"[\w.-]+")
+_CODIFICADOR = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _texto_tarefa(tarefa):
+    # O mesmo texto de _CODIFICADOR.encode(tarefa.para_json()), sem montar o
+    # dicionário: prioridade, status e origem são os nomes de modelo.py e as
+    # datas, ISO 8601; só o título e a descrição precisam de escape.
+    conclusao = tarefa.data_conclusao
+    conclusao = f'"{conclusao.isoformat()}"' if conclusao else "null"
+    return (
+        f'{{"id":{tarefa.id},"titulo":{encode_basestring(tarefa.titulo)},'
+        f'"descricao":{encode_basestring(tarefa.descricao)},"prioridade":"{tarefa.prioridade}",'
+        f'"status":"{tarefa.status}","origem":"{tarefa.origem}",'
+        f'"data_criacao":"{tarefa.data_criacao.isoformat()}","data_conclusao":{conclusao}}}'
+    )
+
+
+def _gravar_atomico(caminho, texto):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(texto)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class FluxoEventos:
+    def __init__(self, diretorio, eventos_por_segmento=EVENTOS_POR_SEGMENTO, lote_fsync=32):
+        """
+        Args:
+            diretorio (str): Diretório dos segmentos (criado na primeira escrita)
+            eventos_por_segmento (int): Eventos em cada segmento
+            lote_fsync (int): Eventos avulsos entre dois fsyncs; um lote
+                tem sempre o seu fsync
+        """
+        self.diretorio = diretorio
+        self.eventos_por_segmento = eventos_por_segmento
+        self.lote_fsync = lote_fsync
+        self._lote = None
+        # Tarefas já serializadas no lote, por ID: o "removida" de quem foi
+        # arquivada ou excluída no mesmo lote reaproveita o texto.
+        self._textos = {}
+        self._trava = None
+        # Segmento aberto para anexar: primeiro offset, próximo offset e
+        # tamanho em bytes depois da última escrita deste processo.
+        self._arquivo = None
+        self._base = 0
+        self._proximo = 0
+        self._tamanho = 0
+        self._nao_sincronizados = 0
+
+    def _caminho(self, base):
+        return os.path.join(self.diretorio, f"{base:020d}{EXTENSAO}")
+
+    def _bases(self):
+        try:
+            nomes = os.listdir(self.diretorio)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            int(nome[:-len(EXTENSAO)]) for nome in nomes
+            if nome.endswith(EXTENSAO) and nome[:-len(EXTENSAO)].isdigit()
+        )
+
+    # Escrita
+
+    def ao_alterar(self, evento, tarefa, anterior):
+        """
+        Ouvinte do repositório: transforma cada alteração em um evento.
+
+        Args:
+            evento (str): "adicionada", "prioridade", "status" ou "removida"
+            tarefa (Tarefa): Tarefa alterada
+            anterior: Valor anterior do campo alterado
+        """
+        # O evento é serializado já, sem o offset, que só é conhecido ao
+        # anexar. Remover não altera a tarefa: ela está como no último evento
+        # dela.
+        texto_tarefa = self._textos.get(tarefa.id) if evento == "removida" else None
+        if texto_tarefa is None:
+            texto_tarefa = _texto_tarefa(tarefa)
+            if self._lote is not None:
+                self._textos[tarefa.id] = texto_tarefa
+        # A data, o nome do evento e o ID não precisam de escape.
+        registro = f'{{"quando":"{datetime.now().isoformat()}","evento":"{evento}","id":{tarefa.id}'
+        if anterior is not None:
+            registro += f',"anterior":{_CODIFICADOR.encode(anterior)}'
+        registro += f',"tarefa":{texto_tarefa}}}'
+        if self._lote is not None:
+            self._lote.append(registro)
+        else:
+            self.anexar([registro])
+
+    @contextmanager
+    def em_lote(self, atomico=False):
+        """
+        Acumula os eventos do bloco e grava todos de uma vez no final. Blocos
+        aninhados fazem parte do lote mais externo.
+
+        Args:
+            atomico (bool): Descarta os eventos se o bloco terminar com uma
+                exceção (o armazenamento desfaz a transação)
+        """
+        if self._lote is not None:
+            yield self
+            return
+        self._lote = []
+        concluido = False
+        try:
+            yield self
+            concluido = True
+        finally:
+            registros, self._lote = self._lote, None
+            self._textos.clear()
+            if registros and (concluido or not atomico):
+                self.anexar(registros)
+
+    def anexar(self, registros):
+        """
+        Grava eventos no fim do log, com offsets consecutivos.
+
+        Args:
+            registros (list): Eventos sem "offset", já em JSON compacto
+
+        Returns:
+            int: Offset do primeiro evento gravado
+        """
+        with self._travado():
+            self._posicionar()
+            primeiro = self._proximo
+            restantes = registros
+            while restantes:
+                if self._proximo - self._base >= self.eventos_por_segmento:
+                    self._abrir_segmento(self._proximo)
+                cabem = self.eventos_por_segmento - (self._proximo - self._base)
+                parte, restantes = restantes[:cabem], restantes[cabem:]
+                linhas = [f'{{"offset":{offset},{registro[1:]}'
+                          for offset, registro in enumerate(parte, self._proximo)]
+                self._proximo += len(parte)
+                dados = ("\n".join(linhas) + "\n").encode("utf-8")
+                self._arquivo.write(dados)
+                self._arquivo.flush()
+                self._tamanho += len(dados)
+                self._nao_sincronizados += len(parte)
+            if len(registros) > 1 or self._nao_sincronizados >= self.lote_fsync:
+                self.sincronizar()
+        return primeiro
+
+    @contextmanager
+    def _travado(self):
+        if self._trava is None:
+            os.makedirs(self.diretorio, exist_ok=True)
+            self._trava = open(os.path.join(self.diretorio, ".trava"), "a")
+        if fcntl is not None:
+            fcntl.flock(self._trava, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._trava, fcntl.LOCK_UN)
+
+    def _posicionar(self):
+        # Outro processo pode ter anexado desde a última escrita deste: o
+        # segmento mudou de tamanho ou, se estava cheio, já há um seguinte.
+        if self._arquivo is not None:
+            cheio = self._proximo - self._base >= self.eventos_por_segmento
+            if os.fstat(self._arquivo.fileno()).st_size == self._tamanho and not (
+                cheio and os.path.exists(self._caminho(self._proximo))
+            ):
+                return
+        bases = self._bases()
+        base = bases[-1] if bases else 0
+        caminho = self._caminho(base)
+        with open(caminho, "ab+") as f:
+            f.seek(0)
+            dados = f.read()
+            # Uma última linha incompleta (queda no meio de uma escrita) é
+            # cortada; ninguém mais está escrevendo, por causa da trava.
+            valido = dados.rfind(b"\n") + 1
+            if valido < len(dados):
+                f.truncate(valido)
+        self._abrir_segmento(base, dados.count(b"\n", 0, valido), valido)
+
+    def _abrir_segmento(self, base, quantidade=0, tamanho=0):
+        if self._arquivo is not None:
+            self.sincronizar()
+            self._arquivo.close()
+        self._arquivo = open(self._caminho(base), "ab")
+        self._base = base
+        self._proximo = base + quantidade
+        self._tamanho = tamanho
+
+    def sincronizar(self):
+        """Força a gravação em disco dos eventos ainda não sincronizados."""
+        if self._arquivo is not None and self._nao_sincronizados:
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+        self._nao_sincronizados = 0
+
+    def fechar(self):
+        """Sincroniza e fecha o segmento aberto e a trava."""
+        if self._arquivo is not None:
+            self.sincronizar()
+            self._arquivo.close()
+            self._arquivo = None
+        if self._trava is not None:
+            self._trava.close()
+            self._trava = None
+
+    # Leitura
+
+    def inicio(self):
+        """
+        Returns:
+            int: Offset do evento mais antigo ainda guardado
+        """
+        bases = self._bases()
+        return bases[0] if bases else 0
+
+    def fim(self):
+        """
+        Returns:
+            int: Offset que o próximo evento gravado vai receber
+        """
+        bases = self._bases()
+        if not bases:
+            return 0
+        with open(self._caminho(bases[-1]), "rb") as f:
+            dados = f.read()
+        return bases[-1] + dados.count(b"\n", 0, dados.rfind(b"\n") + 1)
+
+    def ler(self, desde=0, limite=LIMITE_LEITURA):
+        """
+        Eventos já gravados a partir de um offset, sem esperar por novos.
+
+        Args:
+            desde (int): Offset do primeiro evento
+            limite (int): Quantidade máxima de eventos (None para todos)
+
+        Returns:
+            list: Eventos em ordem de offset
+
+        Raises:
+            ValueError: Se `desde` já foi apagado por `podar`
+        """
+        leitor = _Leitor(self, desde)
+        try:
+            return leitor.novos(limite)
+        finally:
+            leitor.fechar()
+
+    def acompanhar(self, desde=0, intervalo=INTERVALO_ESPERA, parada=None):
+        """
+        Iterador bloqueante: devolve os eventos a partir de `desde` e espera
+        pelos novos.
+
+        Args:
+            desde (int): Offset do primeiro evento
+            intervalo (float): Segundos entre duas consultas ao fim do log
+            parada (threading.Event): Encerra a iteração quando for ligado
+
+        Yields:
+            dict: Eventos em ordem de offset
+
+        Raises:
+            ValueError: Se `desde` já foi apagado por `podar`
+        """
+        leitor = _Leitor(self, desde)
+        try:
+            while parada is None or not parada.is_set():
+                eventos = leitor.novos(LIMITE_LEITURA)
+                yield from eventos
+                if not eventos:
+                    if parada is None:
+                        time.sleep(intervalo)
+                    else:
+                        parada.wait(intervalo)
+        finally:
+            leitor.fechar()
+
+    async def acompanhar_async(self, desde=0, intervalo=INTERVALO_ESPERA):
+        """
+        Como `acompanhar`, mas cedendo o laço de eventos enquanto espera.
+
+        Yields:
+            dict: Eventos em ordem de offset
+        """
+        # Importado aqui: o asyncio sozinho pesa mais na partida de cada
+        # comando do que todo o resto deste módulo.
+        import asyncio
+        leitor = _Leitor(self, desde)
+        try:
+            while True:
+                eventos = leitor.novos(LIMITE_LEITURA)
+                for evento in eventos:
+                    yield evento
+                if not eventos:
+                    await asyncio.sleep(intervalo)
+        finally:
+            leitor.fechar()
+
+    # Assinantes e retenção
+
+    def assinatura(self, nome):
+        """
+        Args:
+            nome (str): Nome do assinante (letras, números, ".", "-" e "_")
+
+        Returns:
+            Assinatura: Offset salvo do assinante
+
+        Raises:
+            ValueError: Se o nome for inválido
+        """
+        if not _NOME_ASSINANTE.fullmatch(nome):
+            raise ValueError("Nome de assinante inválido.")
+        return Assinatura(self, nome)
+
+    def assinaturas(self):
+        """
+        Returns:
+            dict: Nome -> offset salvo de cada assinante
+        """
+        diretorio = os.path.join(self.diretorio, "assinantes")
+        try:
+            nomes = os.listdir(diretorio)
+        except FileNotFoundError:
+            return {}
+        return {
+            nome[:-len(".offset")]: Assinatura(self, nome[:-len(".offset")]).offset
+            for nome in nomes if nome.endswith(".offset")
+        }
+
+    def podar(self, antes_de=None):
+        """
+        Apaga os segmentos cujos eventos são todos anteriores a um offset. O
+        último segmento nunca é apagado.
+
+        Args:
+            antes_de (int): Offset limite (padrão: o menor offset salvo pelos
+                assinantes; sem assinantes, nada é apagado)
+
+        Returns:
+            int: Quantidade de eventos apagados
+        """
+        if antes_de is None:
+            antes_de = min(self.assinaturas().values(), default=0)
+        apagados = 0
+        with self._travado():
+            bases = self._bases()
+            for base, seguinte in zip(bases, bases[1:]):
+                if seguinte > antes_de:
+                    break
+                os.remove(self._caminho(base))
+                apagados += seguinte - base
+        return apagados
+
+
+class Assinatura:
+    def __init__(self, fluxo, nome):
+        """
+        Args:
+            fluxo (FluxoEventos): Fluxo assinado
+            nome (str): Nome do assinante
+        """
+        self.fluxo = fluxo
+        self.nome = nome
+        self.caminho = os.path.join(fluxo.diretorio, "assinantes", nome + ".offset")
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                self.offset = int(f.read())
+        except FileNotFoundError:
+            # Um assinante novo começa no evento mais antigo guardado.
+            self.offset = fluxo.inicio()
+
+    def eventos(self, seguir=True, intervalo=INTERVALO_ESPERA):
+        """
+        Eventos a partir do offset salvo.
+
+        Args:
+            seguir (bool): Espera pelos novos (acompanhar) em vez de parar no
+                fim do log
+            intervalo (float): Segundos entre duas consultas ao fim do log
+
+        Returns:
+            iterable: Eventos em ordem de offset
+        """
+        if seguir:
+            return self.fluxo.acompanhar(self.offset, intervalo)
+        return self.fluxo.ler(self.offset, None)
+
+    def confirmar(self, evento):
+        """
+        Salva o offset seguinte ao de um evento já processado.
+
+        Args:
+            evento (dict): Último evento processado
+        """
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        _gravar_atomico(self.caminho, str(evento["offset"] + 1))
+        self.offset = evento["offset"] + 1
+
+
+class _Leitor:
+    """Posição de leitura em um segmento, mantida entre as consultas."""
+
+    def __init__(self, fluxo, desde):
+        self.fluxo = fluxo
+        self.offset = desde
+        self._arquivo = None
+        self._base = None
+        self._linha = None
+
+    def _abrir(self):
+        bases = self.fluxo._bases()
+        if not bases:
+            return False
+        if self.offset < bases[0]:
+            raise ValueError(f"O offset {self.offset} já foi apagado; o mais antigo é {bases[0]}.")
+        self._entrar(bases[bisect_right(bases, self.offset) - 1])
+        return True
+
+    def _entrar(self, base):
+        self.fechar()
+        self._arquivo = open(self.fluxo._caminho(base), "rb")
+        self._base = self._linha = base
+
+    def novos(self, limite=None):
+        """
+        Returns:
+            list: Eventos completos gravados depois da última consulta
+        """
+        eventos = []
+        while limite is None or len(eventos) < limite:
+            if self._arquivo is None and not self._abrir():
+                break
+            posicao = self._arquivo.tell()
+            linha = self._arquivo.readline()
+            if linha.endswith(b"\n"):
+                self._linha += 1
+                if self._linha > self.offset:
+                    eventos.append(json.loads(linha))
+                    self.offset = self._linha
+                continue
+            self._arquivo.seek(posicao)
+            # Fim do que já foi gravado neste segmento. Se já existe um
+            # segmento seguinte, este está completo; lê de novo antes de
+            # passar, porque as últimas linhas podem ter chegado agora.
+            bases = self.fluxo._bases()
+            seguinte = bases[bisect_right(bases, self._base):][:1]
+            if not seguinte:
+                break
+            linha = self._arquivo.readline()
+            self._arquivo.seek(posicao)
+            if linha.endswith(b"\n"):
+                continue
+            self._entrar(seguinte[0])
+        return eventos
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
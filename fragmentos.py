@@ -0,0 +1,388 @@
+"""
+Armazenamento dividido em fragmentos, cada um com o seu diretório.
+
+Um ArmazenamentoFragmentado junta N armazenamentos comuns (JSON ou SQLite)
+em subdiretórios de um diretório de dados:
+
+    fragmentos.json     número de fragmentos, fixo desde a criação
+    ids                 próximo ID livre do contador compartilhado
+    fragmento-00/       arquivos de um armazenamento comum
+    fragmento-01/
+    ...
+
+Cada tarefa mora no fragmento `id % N`, então uma consulta por ID vai
+direto ao fragmento certo; como os IDs são consecutivos, as tarefas novas
+se espalham por igual entre os fragmentos. Os IDs vêm de blocos reservados
+no contador compartilhado (BlocosIds), sob uma trava de arquivo: são únicos
+entre processos e nunca são reaproveitados, mesmo os de tarefas já
+arquivadas. IDs de um bloco não usado até o fim do processo ficam sem uso.
+Com um fragmento só, tarefas.py usa o armazenamento comum direto, sem
+BlocosIds: no JSON o diretório tem um processo só (a trava do
+armazenamento), e no SQLite o ID sai do maior ID gravado, dentro da
+transação; ali, o ID de uma tarefa arquivada por outro processo pode
+voltar a ser usado.
+
+Cada fragmento tem o seu diário, snapshot, arquivadas e travas (ou o seu
+banco), de modo que gravar um não espera pelos outros; salvar só regrava
+os fragmentos alterados desde o último salvamento. A próxima pendente é a
+mais urgente entre as primeiras de cada fragmento, pela chave da política
+(a estrita, para a fila justa). Listagens por página juntam as páginas dos
+fragmentos na ordem do cursor.
+
+Uma transação entra na transação de cada fragmento na primeira vez que ele
+é alterado; ao final, cada fragmento confirma (ou, no SQLite, desfaz) a
+sua parte, sem atomicidade entre fragmentos. Com o SQLite, a próxima
+pendente e a reserva do trabalhador são lidas de novo no fragmento
+escolhido já dentro da transação dele, para que dois processos não peguem
+a mesma tarefa; as concluídas a arquivar são lidas em cada fragmento já
+dentro da transação dele.
+
+Para mudar o número de fragmentos, exporte um despejo e importe-o em um
+diretório novo (tarefas.py exportar / importar-despejo).
+"""
+import heapq
+import json
+import os
+import shutil
+from contextlib import ExitStack, contextmanager
+from itertools import chain, islice, zip_longest
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from armazenamento import Armazenamento
+from paginacao import CHAVES
+from politicas import Estrita
+from repositorio import Repositorio
+
+TAMANHO_BLOCO_IDS = 1000
+
+
+class BlocosIds:
+    def __init__(self, caminho, tamanho=TAMANHO_BLOCO_IDS):
+        """
+        Args:
+            caminho (str): Arquivo do contador compartilhado
+            tamanho (int): IDs reservados de cada vez
+        """
+        self.caminho = caminho
+        self.tamanho = tamanho
+        self._proximo = 0
+        self._fim = 0
+
+    def reservar(self, quantidade, minimo=1):
+        """
+        Args:
+            quantidade (int): IDs consecutivos necessários
+            minimo (int): Menor ID aceitável em um bloco novo
+
+        Returns:
+            int: Primeiro dos IDs reservados
+        """
+        if self._fim - self._proximo < quantidade:
+            self._proximo, self._fim = self._novo_bloco(max(self.tamanho, quantidade), minimo)
+        inicio = self._proximo
+        self._proximo += quantidade
+        return inicio
+
+    def _novo_bloco(self, tamanho, minimo):
+        with os.fdopen(os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644), "r+", encoding="utf-8") as f:
+            # A trava é solta quando o arquivo é fechado.
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            texto = f.read().strip()
+            inicio = max(int(texto) if texto else 1, minimo)
+            f.seek(0)
+            f.truncate()
+            f.write(str(inicio + tamanho))
+            f.flush()
+            os.fsync(f.fileno())
+        return inicio, inicio + tamanho
+
+
+class RepositorioFragmentado(Repositorio):
+    """Repositório das ativas de todos os fragmentos, encaminhado pelo ID."""
+
+    def __init__(self, armazenamento):
+        super().__init__()
+        self._armazenamento = armazenamento
+        self._repositorios = [f.tarefas for f in armazenamento.fragmentos]
+
+    def inscrever(self, ouvinte):
+        for repositorio in self._repositorios:
+            repositorio.inscrever(ouvinte)
+
+    @contextmanager
+    def sem_notificar(self):
+        with ExitStack() as pilha:
+            for repositorio in self._repositorios:
+                pilha.enter_context(repositorio.sem_notificar())
+            yield self
+
+    def _alterado(self, id_tarefa):
+        return self._armazenamento._fragmento(self._armazenamento.indice_de(id_tarefa)).tarefas
+
+    def adicionar(self, tarefa):
+        self._alterado(tarefa.id).adicionar(tarefa)
+
+    def obter(self, id_tarefa):
+        return self._repositorios[self._armazenamento.indice_de(id_tarefa)].obter(id_tarefa)
+
+    def remover(self, id_tarefa):
+        return self._alterado(id_tarefa).remover(id_tarefa)
+
+    def alterar_prioridade(self, tarefa, prioridade):
+        self._alterado(tarefa.id).alterar_prioridade(tarefa, prioridade)
+
+    def alterar_status(self, tarefa, status, data_conclusao=None):
+        self._alterado(tarefa.id).alterar_status(tarefa, status, data_conclusao)
+
+    def com_status(self, status):
+        return list(chain.from_iterable(r.com_status(status) for r in self._repositorios))
+
+    def com_prioridade(self, prioridade):
+        return list(chain.from_iterable(r.com_prioridade(prioridade) for r in self._repositorios))
+
+    def maior_id(self):
+        return max(r.maior_id() for r in self._repositorios)
+
+    def __iter__(self):
+        return chain.from_iterable(self._repositorios)
+
+    def __len__(self):
+        return sum(len(r) for r in self._repositorios)
+
+    def __bool__(self):
+        return any(self._repositorios)
+
+    def __contains__(self, id_tarefa):
+        return id_tarefa in self._repositorios[self._armazenamento.indice_de(id_tarefa)]
+
+
+class ArmazenamentoFragmentado(Armazenamento):
+    def __init__(self, diretorio, quantidade, criar, politica=None, eventos=None):
+        """
+        Args:
+            diretorio (str): Diretório de dados ("" para o diretório atual)
+            quantidade (int): Número de fragmentos
+            criar (callable): Recebe o diretório de um fragmento e devolve
+                o armazenamento dele
+            politica: Política usada para comparar as primeiras pendentes
+                dos fragmentos (politicas.py); por padrão, a estrita
+            eventos (FluxoEventos): Fluxo que recebe cada alteração, ou None
+
+        Raises:
+            ValueError: Se o diretório já foi criado com outro número de
+                fragmentos
+        """
+        self.diretorio = diretorio or "."
+        self.quantidade = quantidade
+        os.makedirs(self.diretorio, exist_ok=True)
+        manifesto = os.path.join(self.diretorio, "fragmentos.json")
+        if os.path.exists(manifesto):
+            with open(manifesto, "r", encoding="utf-8") as f:
+                existentes = json.load(f)["fragmentos"]
+            if existentes != quantidade:
+                raise ValueError(
+                    f"{self.diretorio} tem {existentes} fragmento(s), não {quantidade}; "
+                    "para mudar, exporte um despejo e importe-o em outro diretório."
+                )
+        else:
+            with open(manifesto, "w", encoding="utf-8") as f:
+                json.dump({"fragmentos": quantidade}, f)
+        self.fragmentos = []
+        for indice in range(quantidade):
+            caminho = os.path.join(self.diretorio, f"fragmento-{indice:02d}")
+            os.makedirs(caminho, exist_ok=True)
+            self.fragmentos.append(criar(caminho))
+        self.ids = BlocosIds(os.path.join(self.diretorio, "ids"))
+        chave = getattr(politica, "chave", None)
+        self._chave = Estrita().chave if chave is None else chave
+        self.atomico = all(f.atomico for f in self.fragmentos)
+        self.tarefas = RepositorioFragmentado(self)
+        self.eventos = eventos
+        if eventos is not None:
+            self.tarefas.inscrever(eventos.ao_alterar)
+        self._pilha = None
+        self._em_transacao = set()
+        self._salvos = [None] * quantidade
+        # Fragmento da reserva de cada trabalhador, quando já se sabe.
+        self._reservas = {}
+
+    def indice_de(self, id_tarefa):
+        """
+        Returns:
+            int: Fragmento onde mora a tarefa com este ID
+        """
+        return id_tarefa % self.quantidade
+
+    def _fragmento(self, indice):
+        # Dentro de uma transação, o fragmento entra na dele ao ser usado
+        # para uma alteração.
+        fragmento = self.fragmentos[indice]
+        if self._pilha is not None and indice not in self._em_transacao:
+            self._pilha.enter_context(fragmento.transacao())
+            self._em_transacao.add(indice)
+        return fragmento
+
+    def carregar(self, manutencao=True):
+        migradas = sum(f.carregar(manutencao) for f in self.fragmentos)
+        self._salvos = [f.versao() for f in self.fragmentos]
+        return migradas
+
+    def salvar(self):
+        for indice, fragmento in enumerate(self.fragmentos):
+            versao = fragmento.versao()
+            if versao != self._salvos[indice]:
+                fragmento.salvar()
+                self._salvos[indice] = versao
+
+    def persistir(self):
+        for fragmento in self.fragmentos:
+            fragmento.persistir()
+        if self.eventos is not None:
+            self.eventos.fechar()
+
+    def fechar(self):
+        for fragmento in self.fragmentos:
+            fragmento.fechar()
+        if self.eventos is not None:
+            self.eventos.fechar()
+
+    @contextmanager
+    def transacao(self):
+        if self._pilha is not None:
+            yield self
+            return
+        # Os eventos só saem depois que todos os fragmentos confirmaram.
+        with self._lote_eventos(self.atomico), ExitStack() as pilha:
+            self._pilha = pilha
+            try:
+                yield self
+            finally:
+                self._pilha = None
+                self._em_transacao = set()
+
+    def proxima_pendente(self):
+        cabecas = []
+        for indice, fragmento in enumerate(self.fragmentos):
+            tarefa = fragmento.proxima_pendente()
+            if tarefa is not None:
+                cabecas.append((self._chave(tarefa), indice, tarefa))
+        if not cabecas:
+            return None
+        _, indice, tarefa = min(cabecas)
+        if self._pilha is None:
+            return tarefa
+        return self._fragmento(indice).proxima_pendente()
+
+    def proximo_id(self, minimo, quantidade=1):
+        return self.ids.reservar(quantidade, minimo)
+
+    def reserva(self, trabalhador):
+        conhecido = self._reservas.get(trabalhador)
+        ordem = range(self.quantidade) if conhecido is None else chain((conhecido,), range(self.quantidade))
+        for indice in ordem:
+            tarefa = self.fragmentos[indice].reserva(trabalhador)
+            if tarefa is not None:
+                self._reservas[trabalhador] = indice
+                if self._pilha is None:
+                    return tarefa
+                return self._fragmento(indice).reserva(trabalhador)
+        self._reservas.pop(trabalhador, None)
+        return None
+
+    def reservar(self, trabalhador, tarefa, expira):
+        indice = self.indice_de(tarefa.id)
+        anterior = self._reservas.get(trabalhador)
+        if anterior is not None and anterior != indice:
+            self._fragmento(anterior).liberar(trabalhador)
+        self._fragmento(indice).reservar(trabalhador, tarefa, expira)
+        self._reservas[trabalhador] = indice
+
+    def liberar(self, trabalhador):
+        indice = self._reservas.pop(trabalhador, None)
+        for i in range(self.quantidade) if indice is None else (indice,):
+            self._fragmento(i).liberar(trabalhador)
+
+    def reservas_vencidas(self, agora):
+        vencidas = []
+        for indice, fragmento in enumerate(self.fragmentos):
+            for trabalhador, tarefa in fragmento.reservas_vencidas(agora):
+                self._reservas[trabalhador] = indice
+                vencidas.append((trabalhador, tarefa))
+        return vencidas
+
+    def sem_reserva(self):
+        return list(chain.from_iterable(f.sem_reserva() for f in self.fragmentos))
+
+    def concluidas_antes(self, limite):
+        # Dentro de uma transação, cada fragmento é lido já na transação
+        # dele, a mesma em que as vencidas serão arquivadas.
+        fragmentos = self.fragmentos if self._pilha is None else [self._fragmento(i) for i in range(self.quantidade)]
+        return list(heapq.merge(*(f.concluidas_antes(limite) for f in fragmentos), key=lambda t: t.conclusao))
+
+    def arquivar(self, tarefas):
+        grupos = {}
+        for tarefa in tarefas:
+            grupos.setdefault(self.indice_de(tarefa.id), []).append(tarefa)
+        for indice, grupo in sorted(grupos.items()):
+            self._fragmento(indice).arquivar(grupo)
+
+    def ler_arquivadas(self, offset=0, limite=None, **filtros):
+        id_tarefa = filtros.get("id_tarefa")
+        if id_tarefa is not None:
+            return self.fragmentos[self.indice_de(id_tarefa)].ler_arquivadas(offset=offset, limite=limite, **filtros)
+        todas = chain.from_iterable(f.ler_arquivadas(**filtros) for f in self.fragmentos)
+        return islice(todas, offset, None if limite is None else offset + limite)
+
+    def particoes_arquivadas(self):
+        totais = {}
+        for fragmento in self.fragmentos:
+            for particao in fragmento.particoes_arquivadas():
+                total = totais.setdefault((particao["mes"], particao["status"]), dict(particao, quantidade=0, bytes=0))
+                total["quantidade"] += particao["quantidade"]
+                total["bytes"] = None if particao["bytes"] is None else (total["bytes"] or 0) + particao["bytes"]
+        return [totais[chave] for chave in sorted(totais)]
+
+    def exportar_arquivadas(self, caminho, ate=None):
+        temporario = caminho + ".tmp"
+        exportadas = 0
+        with open(temporario, "wb") as saida:
+            for indice, fragmento in enumerate(self.fragmentos):
+                parte = f"{caminho}.{indice}"
+                exportadas += fragmento.exportar_arquivadas(parte, ate)
+                with open(parte, "rb") as entrada:
+                    shutil.copyfileobj(entrada, saida)
+                os.remove(parte)
+            saida.flush()
+            os.fsync(saida.fileno())
+        os.replace(temporario, caminho)
+        return exportadas
+
+    def podar_arquivadas(self, ate):
+        return sum(f.podar_arquivadas(ate) for f in self.fragmentos)
+
+    def versao(self):
+        # Cada marca só cresce, então a soma muda sempre que uma delas muda.
+        versoes = [f.versao() for f in self.fragmentos]
+        return sum(v[0] for v in versoes), sum(v[1] for v in versoes), tuple(v[2] for v in versoes)
+
+    def pagina(self, ordem, cursor=None, limite=20, status=None, prioridade=None):
+        paginas = [f.pagina(ordem, cursor, limite, status, prioridade) for f in self.fragmentos]
+        chave = CHAVES[ordem]
+        tarefas = list(islice(heapq.merge(*(p for p, _ in paginas), key=chave), limite))
+        mais = any(c is not None for _, c in paginas) or sum(len(p) for p, _ in paginas) > len(tarefas)
+        return tarefas, (chave(tarefas[-1]) if mais and tarefas else None)
+
+    def buscar(self, consulta, modo="ranqueado", status=None, prioridade=None, limite=20):
+        listas = [f.buscar(consulta, modo, status, prioridade, limite) for f in self.fragmentos]
+        if modo == "booleano":
+            encontradas = heapq.merge(*listas, key=lambda t: -t.id)
+        else:
+            # As pontuações de fragmentos diferentes não são comparáveis:
+            # intercala as melhores de cada um.
+            encontradas = (t for t in chain.from_iterable(zip_longest(*listas)) if t is not None)
+        return list(islice(encontradas, limite))
@@ -0,0 +1,249 @@
+"""
+Snapshot binário das tarefas, lido sob demanda via mmap.
+
+O arquivo guarda as tarefas ordenadas por ID em colunas de largura fixa,
+seguidas de uma tabela de strings com títulos e descrições em UTF-8:
+
+    cabeçalho (32 bytes): "TARF", versão, quantidade n, tamanho das strings
+    ids               int64[n]
+    criacao           int64[n]   microssegundos desde a época (modelo.Tarefa)
+    conclusao         int64[n]   SEM_DATA quando não concluída
+    offsets           int64[2n+1] início de cada título e descrição
+    prioridade        uint8[n]
+    status            uint8[n]
+    origem            uint8[n]
+    strings           bytes
+
+Abrir o arquivo só lê o cabeçalho; cada coluna é uma memoryview sobre o
+mmap, e um objeto Tarefa só é montado quando a posição é pedida. A busca
+por ID é uma busca binária sobre a coluna de ids. As colunas inteiras usam
+a ordem de bytes da máquina, pois o snapshot é um cache local; o formato de
+importação e exportação continua sendo o JSON.
+"""
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from itertools import compress
+
+from modelo import ORIGENS, PRIORIDADES, Tarefa
+
+MAGICO = b"TARF"
+VERSAO = 1
+CABECALHO = struct.Struct("<4sHxxQQ8x")
+SEM_DATA = -1
+
+
+def gravar(caminho, tarefas):
+    """
+    Grava as tarefas em um snapshot binário de forma atômica.
+
+    Args:
+        caminho (str): Caminho do arquivo
+        tarefas (iterable): Tarefas a gravar
+    """
+    tarefas = sorted(tarefas, key=lambda t: t.id)
+    n = len(tarefas)
+    ids = array("q", (t.id for t in tarefas))
+    criacao = array("q", (t.criacao for t in tarefas))
+    conclusao = array("q", (SEM_DATA if t.conclusao is None else t.conclusao for t in tarefas))
+    prioridade = bytes(t.cod_prioridade for t in tarefas)
+    status = bytes(t.cod_status for t in tarefas)
+    origem = bytes(t.cod_origem for t in tarefas)
+    offsets = array("q", [0])
+    partes = []
+    total = 0
+    for t in tarefas:
+        for texto in (t.titulo, t.descricao):
+            codificado = texto.encode("utf-8")
+            partes.append(codificado)
+            total += len(codificado)
+            offsets.append(total)
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        f.write(CABECALHO.pack(MAGICO, VERSAO, n, total))
+        for coluna in (ids, criacao, conclusao, offsets):
+            coluna.tofile(f)
+        f.write(prioridade)
+        f.write(status)
+        f.write(origem)
+        for parte in partes:
+            f.write(parte)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class InstantaneoBinario:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        with open(caminho, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, versao, n, _ = CABECALHO.unpack_from(self._mmap, 0)
+        if magico != MAGICO or versao != VERSAO:
+            self._mmap.close()
+            raise ValueError(f"{caminho} não é um snapshot binário de tarefas (versão {VERSAO}).")
+        self._n = n
+        self._visoes = []
+        self._criacao_crescente = None
+        posicao = CABECALHO.size
+        self.ids, posicao = self._coluna(posicao, 8 * n, "q")
+        self.criacao, posicao = self._coluna(posicao, 8 * n, "q")
+        self.conclusao, posicao = self._coluna(posicao, 8 * n, "q")
+        self._offsets, posicao = self._coluna(posicao, 8 * (2 * n + 1), "q")
+        self.prioridade, posicao = self._coluna(posicao, n, "B")
+        self.status, posicao = self._coluna(posicao, n, "B")
+        self.origem, posicao = self._coluna(posicao, n, "B")
+        self._strings, posicao = self._coluna(posicao, len(self._mmap) - posicao, "B")
+
+    def _coluna(self, inicio, tamanho, formato):
+        visao = memoryview(self._mmap)[inicio:inicio + tamanho].cast(formato)
+        self._visoes.append(visao)
+        return visao, inicio + tamanho
+
+    def __len__(self):
+        return self._n
+
+    def ultimo_id(self):
+        """
+        Maior ID do snapshot, em O(1).
+
+        Returns:
+            int: Maior ID, ou 0 se o snapshot estiver vazio
+        """
+        return self.ids[self._n - 1] if self._n else 0
+
+    def posicao(self, id_tarefa):
+        """
+        Busca binária de um ID na coluna de ids.
+
+        Args:
+            id_tarefa (int): ID procurado
+
+        Returns:
+            int: Posição da tarefa, ou None se o ID não estiver no snapshot
+        """
+        i = bisect_left(self.ids, id_tarefa)
+        if i < self._n and self.ids[i] == id_tarefa:
+            return i
+        return None
+
+    def posicoes_com(self, coluna, codigo):
+        """
+        Percorre as posições cujo código em `coluna` é igual a `codigo`.
+
+        Args:
+            coluna (str): "prioridade", "status" ou "origem"
+            codigo (int): Código procurado
+
+        Yields:
+            int: Posições encontradas, em ordem crescente
+        """
+        dados = bytes(getattr(self, coluna))
+        alvo = bytes([codigo])
+        i = dados.find(alvo)
+        while i != -1:
+            yield i
+            i = dados.find(alvo, i + 1)
+
+    def criacao_crescente(self):
+        """
+        Indica se a data de criação não decresce ao longo das posições (e
+        portanto dos IDs). É o caso comum, pois o ID é dado na criação; só
+        um despejo importado com datas antigas quebra a ordem. Calculado na
+        primeira chamada, em C.
+
+        Returns:
+            bool: True se a coluna de criação estiver em ordem
+        """
+        if self._criacao_crescente is None:
+            valores = self.criacao.tolist()
+            self._criacao_crescente = valores == sorted(valores)
+        return self._criacao_crescente
+
+    def primeiras(self, status, usadas):
+        """
+        Para cada par (prioridade, origem), a primeira posição com o status
+        informado que não esteja marcada em `usadas`.
+
+        As três colunas de códigos são combinadas em uma só, um byte por
+        posição com cada código em uma faixa de bits, por operações sobre
+        inteiros do tamanho da coluna; cada par é então um find sobre ela.
+        Nada disso passa pelo interpretador posição a posição.
+
+        Args:
+            status (int): Código do status
+            usadas (bytearray): 1 nas posições a ignorar
+
+        Yields:
+            int: Posições encontradas
+        """
+        # Origem e prioridade cabem em 2 bits cada; o status, em 3.
+        combinada = (
+            int.from_bytes(self.status, "little") << 4
+            | int.from_bytes(self.prioridade, "little") << 2
+            | int.from_bytes(self.origem, "little")
+        ).to_bytes(self._n, "little")
+        for prioridade in range(len(PRIORIDADES)):
+            for origem in range(len(ORIGENS)):
+                alvo = bytes([status << 4 | prioridade << 2 | origem])
+                i = combinada.find(alvo)
+                while i != -1 and usadas[i]:
+                    i = combinada.find(alvo, i + 1)
+                if i != -1:
+                    yield i
+
+    def concluidas_antes(self, status, limite):
+        """
+        Posições com o status informado e data de conclusão anterior a
+        `limite`. A máscara do status sai de um translate sobre a coluna e
+        o filtro é uma cadeia de compress e map, também sem passar pelo
+        interpretador posição a posição.
+
+        Args:
+            status (int): Código do status
+            limite (int): Data de conclusão limite, em microssegundos
+
+        Returns:
+            iterator: Posições encontradas, em ordem crescente (podem
+            incluir tarefas sem data de conclusão)
+        """
+        tabela = bytearray(256)
+        tabela[status] = 1
+        mascara = bytes(self.status).translate(tabela)
+        return compress(
+            compress(range(self._n), mascara),
+            map(limite.__gt__, compress(self.conclusao, mascara)),
+        )
+
+    def tarefa(self, i):
+        """
+        Monta a tarefa da posição `i` a partir das colunas.
+
+        Args:
+            i (int): Posição no snapshot
+
+        Returns:
+            Tarefa: Tarefa decodificada
+        """
+        offsets = self._offsets
+        strings = self._strings
+        conclusao = self.conclusao[i]
+        return Tarefa.de_codigos(
+            self.ids[i],
+            str(strings[offsets[2 * i]:offsets[2 * i + 1]], "utf-8"),
+            str(strings[offsets[2 * i + 1]:offsets[2 * i + 2]], "utf-8"),
+            self.prioridade[i],
+            self.status[i],
+            self.origem[i],
+            self.criacao[i],
+            None if conclusao == SEM_DATA else conclusao,
+        )
+
+    def fechar(self):
+        """Libera as colunas e o mmap."""
+        for visao in self._visoes:
+            visao.release()
+        self._visoes = []
+        self._mmap.close()
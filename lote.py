@@ -0,0 +1,105 @@
+"""
+Leitura e validação de tarefas para importação em lote.
+
+Os registros vêm de um CSV com cabeçalho (titulo,descricao,prioridade,origem)
+ou de um JSONL com um objeto por linha com as mesmas chaves. A validação é
+feita para o lote inteiro antes de qualquer inserção, de modo que a
+importação só aloca IDs e grava o diário uma vez.
+"""
+import csv
+import json
+
+from modelo import CODIGO_ORIGEM, CODIGO_PRIORIDADE
+
+CAMPOS_LOTE = ("titulo", "descricao", "prioridade", "origem")
+
+
+def ler_csv(fluxo):
+    """
+    Lê registros de um CSV com cabeçalho.
+
+    Args:
+        fluxo (file): Arquivo de texto aberto com newline=""
+
+    Yields:
+        dict: Um registro por linha
+    """
+    yield from csv.DictReader(fluxo)
+
+
+def ler_jsonl(fluxo):
+    """
+    Lê registros de um arquivo com um objeto JSON por linha.
+
+    Args:
+        fluxo (file): Arquivo de texto
+
+    Yields:
+        dict: Um registro por linha não vazia, ou None se a linha não for JSON
+    """
+    for linha in fluxo:
+        if not linha.strip():
+            continue
+        try:
+            yield json.loads(linha)
+        except ValueError:
+            yield None
+
+
+def ler(fluxo, formato):
+    """
+    Lê registros no formato informado.
+
+    Args:
+        fluxo (file): Arquivo de texto
+        formato (str): "csv" ou "jsonl"
+
+    Returns:
+        iterator: Registros lidos
+    """
+    if formato == "csv":
+        return ler_csv(fluxo)
+    if formato == "jsonl":
+        return ler_jsonl(fluxo)
+    raise ValueError(f"Formato desconhecido: {formato}")
+
+
+def validar(registros):
+    """
+    Valida um lote de registros com as mesmas regras do menu.
+
+    Args:
+        registros (iterable): Registros lidos por `ler`
+
+    Returns:
+        tuple: (válidos, erros), em que válidos é uma lista de tuplas
+        (titulo, descricao, prioridade, origem) e erros é uma lista de
+        (número do registro, mensagem)
+    """
+    prioridades = CODIGO_PRIORIDADE
+    origens = CODIGO_ORIGEM
+    validos = []
+    erros = []
+    for numero, registro in enumerate(registros, start=1):
+        if not isinstance(registro, dict):
+            erros.append((numero, "Registro inválido."))
+            continue
+        # Em JSONL os valores podem vir com qualquer tipo; null conta como ausente.
+        nao_texto = next(
+            (c for c in CAMPOS_LOTE if registro.get(c) is not None and not isinstance(registro[c], str)), None
+        )
+        if nao_texto is not None:
+            erros.append((numero, f"Campo {nao_texto!r} deve ser texto."))
+            continue
+        titulo = (registro.get("titulo") or "").strip()
+        prioridade = (registro.get("prioridade") or "").strip()
+        origem = (registro.get("origem") or "").strip()
+        if not titulo:
+            erros.append((numero, "Título é obrigatório."))
+        elif prioridade not in prioridades:
+            erros.append((numero, f"Prioridade inválida: {prioridade!r}."))
+        elif origem not in origens:
+            erros.append((numero, f"Origem inválida: {origem!r}."))
+        else:
+            validos.append((titulo, (registro.get("descricao") or "").strip(), prioridade, origem))
+    return validos, erros
@@ -0,0 +1,303 @@
+"""
+Instrumentação das operações e das chamadas ao armazenamento.
+
+Para cada nome medido guarda o número de chamadas, um histograma de latência
+(faixas em potências de 2 de microssegundos) e os bytes lidos e escritos pelo
+processo durante a chamada, tirados de /proc/self/io (no Linux; em outros
+sistemas os bytes não são medidos). Os bytes incluem tudo o que o processo
+leu ou escreveu no período, inclusive a saída no terminal.
+
+Desligada, a instrumentação não custa nada: `instrumentar` só troca as
+funções pelas versões medidas quando a coleta é ativada (nem o inspect é
+importado antes disso), e `medir` devolve um contexto vazio. Opcionalmente,
+`ativar` também liga o cProfile e o tracemalloc durante a sessão;
+`encerrar` mostra os resultados.
+"""
+import functools
+import sys
+import time
+from contextlib import nullcontext
+
+_ativo = False
+_perfil = None
+_arquivo_perfil = None
+_memoria = False
+_NULO = nullcontext()
+_lidos_proprios = 0
+
+
+def _ler_io():
+    # Desconta o que as próprias leituras de /proc/self/io somaram a rchar.
+    global _lidos_proprios
+    try:
+        with open("/proc/self/io", "rb") as f:
+            dados = f.read()
+    except OSError:
+        return None
+    campos = dict(linha.split(b": ") for linha in dados.splitlines())
+    lidos = int(campos[b"rchar"]) - _lidos_proprios
+    _lidos_proprios += len(dados)
+    return lidos, int(campos[b"wchar"])
+
+
+class Histograma:
+    def __init__(self):
+        self.faixas = [0] * 40
+        self.quantidade = 0
+        self.total = 0
+        self.maximo = 0
+
+    def registrar(self, nanossegundos):
+        """
+        Args:
+            nanossegundos (int): Duração medida
+        """
+        self.faixas[min((nanossegundos // 1000).bit_length(), 39)] += 1
+        self.quantidade += 1
+        self.total += nanossegundos
+        self.maximo = max(self.maximo, nanossegundos)
+
+    def percentil(self, p):
+        """
+        Limite superior da faixa que contém o percentil `p`.
+
+        Returns:
+            float: Segundos, ou None se não houver medições
+        """
+        if not self.quantidade:
+            return None
+        alvo = p / 100 * self.quantidade
+        acumulado = 0
+        for faixa, quantidade in enumerate(self.faixas):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return min((1 << faixa) / 1_000_000, self.maximo / 1e9)
+        return self.maximo / 1e9
+
+
+class Estatistica:
+    def __init__(self):
+        self.chamadas = 0
+        self.latencia = Histograma()
+        self.lidos = 0
+        self.escritos = 0
+
+    def registrar(self, nanossegundos, io_inicio=None, io_fim=None):
+        self.chamadas += 1
+        self.latencia.registrar(nanossegundos)
+        if io_inicio is not None and io_fim is not None:
+            self.lidos += io_fim[0] - io_inicio[0]
+            self.escritos += io_fim[1] - io_inicio[1]
+
+    def para_json(self):
+        latencia = self.latencia
+        return {
+            "chamadas": self.chamadas,
+            "total": latencia.total / 1e9,
+            "media": latencia.total / latencia.quantidade / 1e9 if latencia.quantidade else None,
+            "p50": latencia.percentil(50),
+            "p90": latencia.percentil(90),
+            "p99": latencia.percentil(99),
+            "maximo": latencia.maximo / 1e9,
+            "bytes_lidos": self.lidos,
+            "bytes_escritos": self.escritos,
+        }
+
+
+estatisticas = {}
+
+
+def estatistica(nome):
+    """
+    Returns:
+        Estatistica: Estatística de `nome`, criada se ainda não existir
+    """
+    if nome not in estatisticas:
+        estatisticas[nome] = Estatistica()
+    return estatisticas[nome]
+
+
+def ativo():
+    return _ativo
+
+
+class _Medicao:
+    __slots__ = ("estatistica", "inicio", "io")
+
+    def __init__(self, estatistica):
+        self.estatistica = estatistica
+
+    def __enter__(self):
+        self.io = _ler_io()
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *excecao):
+        self.estatistica.registrar(time.perf_counter_ns() - self.inicio, self.io, _ler_io())
+        return False
+
+
+def medir(nome):
+    """
+    Mede um bloco de código:
+
+        with metricas.medir("servidor.lote"):
+            ...
+
+    Args:
+        nome (str): Nome da medição
+
+    Returns:
+        Contexto que registra a duração e os bytes do bloco (vazio se a
+        coleta estiver desligada)
+    """
+    if not _ativo:
+        return _NULO
+    return _Medicao(estatistica(nome))
+
+
+def _medida(nome, funcao):
+    import inspect
+    estat = estatistica(nome)
+    if inspect.isgeneratorfunction(funcao):
+        # Em um gerador só conta o tempo gasto dentro dele, não o de quem o
+        # consome entre um item e outro.
+        @functools.wraps(funcao)
+        def gerador(*args, **kwargs):
+            iterador = funcao(*args, **kwargs)
+            total = lidos = escritos = 0
+            try:
+                while True:
+                    io = _ler_io()
+                    inicio = time.perf_counter_ns()
+                    try:
+                        item = next(iterador)
+                    except StopIteration:
+                        return
+                    finally:
+                        total += time.perf_counter_ns() - inicio
+                        fim = _ler_io()
+                        if io is not None and fim is not None:
+                            lidos += fim[0] - io[0]
+                            escritos += fim[1] - io[1]
+                    yield item
+            finally:
+                estat.registrar(total, (0, 0), (lidos, escritos))
+        gerador.__medida__ = funcao
+        return gerador
+
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        io = _ler_io()
+        inicio = time.perf_counter_ns()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            estat.registrar(time.perf_counter_ns() - inicio, io, _ler_io())
+    medida.__medida__ = funcao
+    return medida
+
+
+def instrumentar(alvo, nomes, prefixo):
+    """
+    Troca as funções `nomes` de um módulo ou classe pelas versões medidas.
+
+    Só tem efeito com a coleta ativa; chamar de novo não mede duas vezes.
+
+    Args:
+        alvo: Módulo ou classe
+        nomes (iterable): Nomes das funções ou métodos
+        prefixo (str): Prefixo dos nomes nas estatísticas
+    """
+    if not _ativo:
+        return
+    for nome in nomes:
+        funcao = getattr(alvo, nome, None)
+        if funcao is None or hasattr(funcao, "__medida__"):
+            continue
+        setattr(alvo, nome, _medida(f"{prefixo}.{nome}", funcao))
+
+
+def ativar(perfil=None, memoria=False):
+    """
+    Liga a coleta.
+
+    Args:
+        perfil (str): Arquivo onde gravar o cProfile da sessão, ou None
+        memoria (bool): Liga o tracemalloc durante a sessão
+    """
+    global _ativo, _perfil, _arquivo_perfil, _memoria
+    _ativo = True
+    if perfil and _perfil is None:
+        import cProfile
+        _perfil = cProfile.Profile()
+        _arquivo_perfil = perfil
+        _perfil.enable()
+    if memoria and not _memoria:
+        import tracemalloc
+        tracemalloc.start()
+        _memoria = True
+
+
+def para_json():
+    """
+    Returns:
+        dict: Nome -> estatísticas (segundos e bytes)
+    """
+    return {nome: e.para_json() for nome, e in sorted(estatisticas.items()) if e.chamadas}
+
+
+def _formatar_bytes(quantidade):
+    for unidade in ("B", "KiB", "MiB"):
+        if quantidade < 1024:
+            return f"{quantidade:.0f} {unidade}"
+        quantidade /= 1024
+    return f"{quantidade:.1f} GiB"
+
+
+def imprimir(arquivo=None):
+    """
+    Mostra uma tabela com as estatísticas coletadas.
+
+    Args:
+        arquivo: Fluxo de saída (padrão: sys.stdout)
+    """
+    arquivo = arquivo or sys.stdout
+    dados = para_json()
+    if not dados:
+        print("Nenhuma operação medida.", file=arquivo)
+        return
+    print(f"{'Operação':34s} {'Chamadas':>8s} {'Total':>10s} {'Média':>10s} {'p50':>9s} {'p99':>9s} "
+          f"{'Máximo':>10s} {'Lidos':>10s} {'Escritos':>10s}", file=arquivo)
+    for nome, e in dados.items():
+        print(f"{nome:34s} {e['chamadas']:8d} {e['total'] * 1000:8.1f}ms {e['media'] * 1000:8.3f}ms "
+              f"{e['p50'] * 1000:7.3f}ms {e['p99'] * 1000:7.3f}ms {e['maximo'] * 1000:8.3f}ms "
+              f"{_formatar_bytes(e['bytes_lidos']):>10s} {_formatar_bytes(e['bytes_escritos']):>10s}", file=arquivo)
+
+
+def encerrar(arquivo=None):
+    """
+    Mostra as estatísticas e, se ligados, grava o cProfile e mostra os
+    maiores pontos de alocação do tracemalloc.
+
+    Args:
+        arquivo: Fluxo de saída (padrão: sys.stdout)
+    """
+    global _perfil, _memoria
+    arquivo = arquivo or sys.stdout
+    imprimir(arquivo)
+    if _perfil is not None:
+        import pstats
+        _perfil.disable()
+        _perfil.dump_stats(_arquivo_perfil)
+        print(f"\nPerfil gravado em {_arquivo_perfil}. Funções mais caras (tempo acumulado):", file=arquivo)
+        pstats.Stats(_perfil, stream=arquivo).sort_stats("cumulative").print_stats(15)
+        _perfil = None
+    if _memoria:
+        import tracemalloc
+        atual, pico = tracemalloc.get_traced_memory()
+        print(f"\nMemória: atual {_formatar_bytes(atual)} | pico {_formatar_bytes(pico)}", file=arquivo)
+        for linha in tracemalloc.take_snapshot().statistics("lineno")[:10]:
+            print(f"  {linha}", file=arquivo)
+        tracemalloc.stop()
+        _memoria = False
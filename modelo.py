@@ -0,0 +1,192 @@
+"""
+Representação compacta das tarefas.
+
+Cada tarefa é um objeto com __slots__ em vez de um dicionário. Prioridade,
+status e origem ficam guardados como códigos inteiros pequenos (a posição do
+valor em PRIORIDADES, STATUS e ORIGENS) e as datas como inteiros de
+microssegundos desde 1970-01-01, no mesmo horário local usado por
+datetime.now(), o que preserva exatamente as datas gravadas em ISO 8601.
+
+Para não mudar o restante do código, a tarefa continua acessível como um
+dicionário (tarefa["prioridade"], tarefa.get("data_conclusao")), e converte-se
+de e para o formato JSON usado em tarefas.json.
+"""
+from datetime import datetime, timedelta
+
+PRIORIDADES = ("Urgente", "Alta", "Média", "Baixa")
+STATUS = ("Pendente", "Fazendo", "Concluída", "Arquivado", "Excluída")
+ORIGENS = ("E-mail", "Telefone", "Chamado do Sistema")
+
+CODIGO_PRIORIDADE = {p: i for i, p in enumerate(PRIORIDADES)}
+CODIGO_STATUS = {s: i for i, s in enumerate(STATUS)}
+CODIGO_ORIGEM = {o: i for i, o in enumerate(ORIGENS)}
+
+CAMPOS = ("id", "titulo", "descricao", "prioridade", "status", "origem", "data_criacao", "data_conclusao")
+
+_EPOCA = datetime(1970, 1, 1)
+_MICROSSEGUNDO = timedelta(microseconds=1)
+
+
+def para_epoca(data):
+    """
+    Converte uma data para microssegundos desde a época.
+
+    Args:
+        data (datetime): Data sem fuso horário, ou None
+
+    Returns:
+        int: Microssegundos desde 1970-01-01, ou None
+    """
+    if data is None:
+        return None
+    return (data - _EPOCA) // _MICROSSEGUNDO
+
+
+def de_epoca(micros):
+    """
+    Converte microssegundos desde a época de volta para datetime.
+
+    Args:
+        micros (int): Microssegundos desde 1970-01-01, ou None
+
+    Returns:
+        datetime: Data correspondente, ou None
+    """
+    if micros is None:
+        return None
+    return _EPOCA + timedelta(microseconds=micros)
+
+
+class Tarefa:
+    __slots__ = ("id", "titulo", "descricao", "cod_prioridade", "cod_status", "cod_origem", "criacao", "conclusao")
+
+    def __init__(self, id, titulo, descricao, prioridade, status, origem, data_criacao, data_conclusao=None):
+        self.id = id
+        self.titulo = titulo
+        self.descricao = descricao
+        self.cod_prioridade = CODIGO_PRIORIDADE[prioridade]
+        self.cod_status = CODIGO_STATUS[status]
+        self.cod_origem = CODIGO_ORIGEM[origem]
+        self.criacao = para_epoca(data_criacao)
+        self.conclusao = para_epoca(data_conclusao)
+
+    @property
+    def prioridade(self):
+        return PRIORIDADES[self.cod_prioridade]
+
+    @prioridade.setter
+    def prioridade(self, valor):
+        self.cod_prioridade = CODIGO_PRIORIDADE[valor]
+
+    @property
+    def status(self):
+        return STATUS[self.cod_status]
+
+    @status.setter
+    def status(self, valor):
+        self.cod_status = CODIGO_STATUS[valor]
+
+    @property
+    def origem(self):
+        return ORIGENS[self.cod_origem]
+
+    @origem.setter
+    def origem(self, valor):
+        self.cod_origem = CODIGO_ORIGEM[valor]
+
+    @property
+    def data_criacao(self):
+        return de_epoca(self.criacao)
+
+    @data_criacao.setter
+    def data_criacao(self, valor):
+        self.criacao = para_epoca(valor)
+
+    @property
+    def data_conclusao(self):
+        return de_epoca(self.conclusao)
+
+    @data_conclusao.setter
+    def data_conclusao(self, valor):
+        self.conclusao = para_epoca(valor)
+
+    def __getitem__(self, campo):
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __setitem__(self, campo, valor):
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        setattr(self, campo, valor)
+
+    def __contains__(self, campo):
+        return campo in CAMPOS
+
+    def get(self, campo, padrao=None):
+        return getattr(self, campo) if campo in CAMPOS else padrao
+
+    def __repr__(self):
+        return f"Tarefa(id={self.id!r}, titulo={self.titulo!r}, prioridade={self.prioridade!r}, status={self.status!r})"
+
+    @classmethod
+    def de_codigos(cls, id, titulo, descricao, cod_prioridade, cod_status, cod_origem, criacao, conclusao):
+        """
+        Cria uma tarefa diretamente a partir dos códigos e das datas em
+        microssegundos, sem passar pelos rótulos (usado pelo snapshot binário).
+
+        Returns:
+            Tarefa: Tarefa correspondente
+        """
+        tarefa = cls.__new__(cls)
+        tarefa.id = id
+        tarefa.titulo = titulo
+        tarefa.descricao = descricao
+        tarefa.cod_prioridade = cod_prioridade
+        tarefa.cod_status = cod_status
+        tarefa.cod_origem = cod_origem
+        tarefa.criacao = criacao
+        tarefa.conclusao = conclusao
+        return tarefa
+
+    @classmethod
+    def de_json(cls, dados):
+        """
+        Cria uma tarefa a partir do formato gravado em JSON.
+
+        Args:
+            dados (dict): Tarefa com as datas em ISO 8601
+
+        Returns:
+            Tarefa: Tarefa correspondente
+        """
+        conclusao = dados.get("data_conclusao")
+        return cls(
+            dados["id"],
+            dados["titulo"],
+            dados["descricao"],
+            dados["prioridade"],
+            dados["status"],
+            dados["origem"],
+            datetime.fromisoformat(dados["data_criacao"]),
+            datetime.fromisoformat(conclusao) if conclusao else None,
+        )
+
+    def para_json(self):
+        """
+        Converte a tarefa para o formato gravado em JSON.
+
+        Returns:
+            dict: Tarefa com as datas em ISO 8601
+        """
+        conclusao = self.data_conclusao
+        return {
+            "id": self.id,
+            "titulo": self.titulo,
+            "descricao": self.descricao,
+            "prioridade": self.prioridade,
+            "status": self.status,
+            "origem": self.origem,
+            "data_criacao": self.data_criacao.isoformat(),
+            "data_conclusao": conclusao.isoformat() if conclusao else None,
+        }
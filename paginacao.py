@@ -0,0 +1,217 @@
+"""
+Listagem das tarefas em páginas.
+
+As páginas vêm do armazenamento por cursor (Armazenamento.pagina): o cursor
+é a chave de ordenação da última tarefa mostrada e a página seguinte começa
+logo depois dela. Mostrar uma página custa o mesmo com cem ou um milhão de
+tarefas, e só as linhas da página são formatadas.
+
+Ordens (ORDENS) e chaves:
+
+    id          (id,)
+    prioridade  (prioridade, criação, id)   da mais urgente para a menos
+    data        (criação, id)               da mais antiga para a mais nova
+
+IndiceOrdenado mantém essas chaves em memória para o ArmazenamentoJSON;
+Visao é a navegação usada pelo menu, que pode tirar as páginas já formatadas
+de um cache.CacheRelatorios.
+"""
+import sys
+from bisect import bisect_left, bisect_right, insort
+
+from modelo import CODIGO_PRIORIDADE, CODIGO_STATUS
+
+TAMANHO_PAGINA = 20
+
+CHAVES = {
+    "id": lambda t: (t.id,),
+    "prioridade": lambda t: (t.cod_prioridade, t.criacao, t.id),
+    "data": lambda t: (t.criacao, t.id),
+}
+ORDENS = tuple(CHAVES)
+
+
+def codificar_cursor(cursor):
+    """
+    Returns:
+        str: Cursor como texto (para URLs), ou None
+    """
+    return None if cursor is None else ".".join(str(v) for v in cursor)
+
+
+def decodificar_cursor(texto):
+    """
+    Raises:
+        ValueError: Se o texto não for um cursor
+    """
+    if not texto:
+        return None
+    return tuple(int(v) for v in texto.split("."))
+
+
+class IndiceOrdenado:
+    def __init__(self, repositorio):
+        """
+        Args:
+            repositorio (RepositorioTarefas): Tarefas ativas
+        """
+        self._repositorio = repositorio
+        # Ordem -> lista ordenada das chaves, montada na primeira página pedida
+        # naquela ordem e depois mantida pelas notificações.
+        self._chaves = {}
+
+    def ao_alterar(self, evento, tarefa, anterior):
+        if evento == "adicionada":
+            for ordem, chaves in self._chaves.items():
+                insort(chaves, CHAVES[ordem](tarefa))
+        elif evento == "removida":
+            for ordem, chaves in self._chaves.items():
+                self._retirar(chaves, CHAVES[ordem](tarefa))
+        elif evento == "prioridade" and "prioridade" in self._chaves:
+            chaves = self._chaves["prioridade"]
+            self._retirar(chaves, (CODIGO_PRIORIDADE[anterior], tarefa.criacao, tarefa.id))
+            insort(chaves, CHAVES["prioridade"](tarefa))
+
+    @staticmethod
+    def _retirar(chaves, chave):
+        posicao = bisect_left(chaves, chave)
+        if posicao < len(chaves) and chaves[posicao] == chave:
+            del chaves[posicao]
+
+    def pagina(self, ordem, cursor=None, limite=TAMANHO_PAGINA, status=None, prioridade=None):
+        if limite < 1:
+            return [], None
+        chaves = self._chaves.get(ordem)
+        if chaves is None:
+            chaves = self._chaves[ordem] = sorted(map(CHAVES[ordem], self._repositorio))
+        cod_status = None if status is None else CODIGO_STATUS[status]
+        cod_prioridade = None if prioridade is None else CODIGO_PRIORIDADE[prioridade]
+        inicio = 0 if cursor is None else bisect_right(chaves, tuple(cursor))
+        fim = len(chaves)
+        if ordem == "prioridade" and cod_prioridade is not None:
+            # Na ordem por prioridade, o filtro de prioridade é um intervalo.
+            inicio = max(inicio, bisect_left(chaves, (cod_prioridade,)))
+            fim = bisect_left(chaves, (cod_prioridade + 1,))
+        obter = self._repositorio.obter
+        encontradas = []
+        # Com outros filtros, as chaves que não passam são puladas; o custo
+        # cresce com quantas tarefas são puladas, não com o tamanho do
+        # repositório.
+        for posicao in range(inicio, fim):
+            tarefa = obter(chaves[posicao][-1])
+            if cod_status is not None and tarefa.cod_status != cod_status:
+                continue
+            if cod_prioridade is not None and tarefa.cod_prioridade != cod_prioridade:
+                continue
+            if len(encontradas) == limite:
+                return encontradas, CHAVES[ordem](encontradas[-1])
+            encontradas.append(tarefa)
+        return encontradas, None
+
+
+class Visao:
+    def __init__(self, armazenamento, formatar, ordem="id", tamanho=TAMANHO_PAGINA, cache=None):
+        """
+        Args:
+            armazenamento (Armazenamento): De onde vêm as páginas
+            formatar (callable): Recebe uma tarefa e devolve a linha a mostrar
+            ordem (str): Ordem inicial (ORDENS)
+            tamanho (int): Tarefas por página
+            cache (CacheRelatorios): Cache das páginas formatadas, ou None
+        """
+        self.armazenamento = armazenamento
+        self.cache = cache
+        self.formatar = formatar
+        self.ordem = ordem
+        self.tamanho = tamanho
+        self.status = None
+        self.prioridade = None
+
+    def paginas(self):
+        """
+        Yields:
+            list: Linhas de cada página, com a ordem e os filtros atuais
+        """
+        cursor = None
+        while True:
+            if self.cache is not None:
+                linhas, cursor = self.cache.pagina(
+                    self.formatar, self.ordem, cursor, self.tamanho, self.status, self.prioridade,
+                )
+            else:
+                tarefas, cursor = self.armazenamento.pagina(self.ordem, cursor, self.tamanho, self.status, self.prioridade)
+                linhas = [self.formatar(t) for t in tarefas]
+            if linhas:
+                yield linhas
+            if cursor is None:
+                return
+
+    def imprimir(self):
+        """Mostra todas as páginas, sem pausa. Devolve quantas linhas mostrou."""
+        linhas = 0
+        for pagina in self.paginas():
+            print("\n".join(pagina))
+            linhas += len(pagina)
+        return linhas
+
+    def navegar(self, escolher=False):
+        """
+        Mostra uma página de cada vez. Entre as páginas: Enter mostra a
+        próxima, "o" muda a ordem, "f" muda os filtros e "q" sai; com
+        `escolher`, digitar um número devolve esse ID.
+
+        Fora de um terminal todas as páginas são mostradas de uma vez.
+
+        Returns:
+            int: ID digitado, ou None
+        """
+        if not (sys.stdin.isatty() and sys.stdout.isatty()):
+            if not self.imprimir():
+                print("Nenhuma tarefa encontrada.")
+            return None
+        opcoes = "Enter: próxima página | o: ordem | f: filtros | q: sair"
+        if escolher:
+            opcoes = "ID: escolher | " + opcoes
+        paginas = self.paginas()
+        pagina = next(paginas, None)
+        primeira = True
+        while True:
+            if pagina is not None:
+                print("\n".join(pagina))
+            elif primeira:
+                print("Nenhuma tarefa encontrada.")
+            else:
+                print("Fim da lista.")
+            primeira = False
+            comando = input(f"[{opcoes}] ").strip().lower()
+            if comando == "":
+                if pagina is None:
+                    return None
+                pagina = next(paginas, None)
+                continue
+            if comando == "q":
+                return None
+            if escolher and comando.isdigit():
+                return int(comando)
+            if comando == "o":
+                ordem = input(f"Ordenar por ({', '.join(ORDENS)}): ").strip().lower()
+                if ordem not in ORDENS:
+                    print("Ordem inválida.")
+                    continue
+                self.ordem = ordem
+            elif comando == "f":
+                status = input("Status (Enter para todos): ").strip() or None
+                prioridade = input("Prioridade (Enter para todas): ").strip() or None
+                if status is not None and status not in CODIGO_STATUS:
+                    print("Status inválido.")
+                    continue
+                if prioridade is not None and prioridade not in CODIGO_PRIORIDADE:
+                    print("Prioridade inválida.")
+                    continue
+                self.status, self.prioridade = status, prioridade
+            else:
+                print("Opção inválida.")
+                continue
+            paginas = self.paginas()
+            pagina = next(paginas, None)
+            primeira = True
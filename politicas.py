@@ -0,0 +1,159 @@
+"""
+Políticas de escolha da próxima tarefa pendente.
+
+    estrita         maior prioridade, depois a mais antiga (agendador.Agendador)
+    envelhecimento  a prioridade efetiva sobe um nível a cada `passo` de espera
+    prazo           prazo mais próximo: criação + prazo da origem (PRAZOS_ORIGEM)
+    justa           fila justa ponderada entre as origens (PESOS_ORIGEM); dentro
+                    de cada origem, a ordem estrita
+
+Envelhecimento e prazo nunca precisam reordenar o heap com o passar do
+tempo. A prioridade efetiva de uma tarefa em `agora` é
+prioridade - (agora - criação) / passo, e a comparação entre duas tarefas não
+depende de `agora`: basta ordenar por prioridade * passo + criação. O prazo é
+fixo desde a criação. As duas são um Agendador com outra chave, com as mesmas
+operações O(log N).
+
+A fila justa (start-time fair queuing) guarda uma etiqueta por origem e um
+tempo virtual. A vez de uma origem começa em max(etiqueta[o], virtual), e a
+próxima tarefa é a mais urgente da origem com o menor começo; servi-la
+(Pendente -> Fazendo) faz virtual = começo e etiqueta[o] = começo +
+1 / peso[o]. Com pesos iguais as origens se alternam; uma origem de peso 2
+é servida duas vezes para cada vez das de peso 1, e uma origem que ficou
+vazia não acumula crédito, porque volta no tempo virtual atual. Cada
+origem tem o seu Agendador, e servir só muda a etiqueta de uma origem. As
+etiquetas recomeçam a cada carga.
+
+O ArmazenamentoSQLite usa as mesmas políticas com `ordem_sql` (e um índice
+sobre essa expressão) ou, na fila justa, com as etiquetas em uma tabela.
+"""
+from datetime import timedelta
+
+from agendador import Agendador
+from modelo import CODIGO_STATUS, ORIGENS
+
+NOMES = ("estrita", "envelhecimento", "prazo", "justa")
+PASSO_ENVELHECIMENTO = timedelta(hours=24)
+PRAZOS_ORIGEM = {"Telefone": timedelta(hours=4), "Chamado do Sistema": timedelta(hours=8), "E-mail": timedelta(hours=24)}
+PESOS_ORIGEM = {"E-mail": 1, "Telefone": 1, "Chamado do Sistema": 1}
+
+FAZENDO = CODIGO_STATUS["Fazendo"]
+
+
+def _micros(duracao):
+    return duracao // timedelta(microseconds=1)
+
+
+class Estrita(Agendador):
+    def ordem_sql(self):
+        """
+        Returns:
+            str: A mesma ordem, como expressão de ORDER BY sobre `tarefas`
+        """
+        return "prioridade, criacao, id"
+
+
+class Envelhecimento(Agendador):
+    def __init__(self, passo=PASSO_ENVELHECIMENTO):
+        """
+        Args:
+            passo (timedelta): Espera que vale um nível de prioridade
+        """
+        super().__init__()
+        self.passo = _micros(passo)
+
+    def chave(self, tarefa):
+        return tarefa.cod_prioridade * self.passo + tarefa.criacao, tarefa.id
+
+    def ordem_sql(self):
+        return f"prioridade * {self.passo} + criacao, id"
+
+
+class Prazo(Agendador):
+    def __init__(self, prazos=PRAZOS_ORIGEM):
+        """
+        Args:
+            prazos (dict): Origem -> timedelta até o prazo
+        """
+        super().__init__()
+        self.prazos = [_micros(prazos[origem]) for origem in ORIGENS]
+
+    def chave(self, tarefa):
+        return tarefa.criacao + self.prazos[tarefa.cod_origem], tarefa.cod_prioridade, tarefa.id
+
+    def ordem_sql(self):
+        casos = " ".join(f"WHEN {codigo} THEN {prazo}" for codigo, prazo in enumerate(self.prazos))
+        return f"criacao + CASE origem {casos} END, prioridade, id"
+
+
+class FilaJusta:
+    def __init__(self, pesos=PESOS_ORIGEM):
+        """
+        Args:
+            pesos (dict): Origem -> peso (parcela relativa dos atendimentos)
+        """
+        self.custos = [1 / pesos[origem] for origem in ORIGENS]
+        self.filas = [Estrita(codigo) for codigo in range(len(ORIGENS))]
+        self.etiquetas = [0.0] * len(ORIGENS)
+        self.virtual = 0.0
+
+    def carregar(self, repositorio):
+        for fila in self.filas:
+            fila.carregar(repositorio)
+
+    def escolher(self, cabecas):
+        """
+        Args:
+            cabecas (list): Tarefa mais urgente de cada origem (pelo código
+                da origem), ou None para as origens sem pendentes
+
+        Returns:
+            Tarefa: Tarefa da origem com o menor começo, ou None
+        """
+        melhor = None
+        for codigo, tarefa in enumerate(cabecas):
+            if tarefa is None:
+                continue
+            chave = (self._comeco(codigo),) + self.filas[codigo].chave(tarefa)
+            if melhor is None or chave < melhor[0]:
+                melhor = (chave, tarefa)
+        return None if melhor is None else melhor[1]
+
+    def _comeco(self, codigo):
+        return max(self.etiquetas[codigo], self.virtual)
+
+    def servir(self, codigo):
+        """Registra um atendimento da origem `codigo`."""
+        self.virtual = self._comeco(codigo)
+        self.etiquetas[codigo] = self.virtual + self.custos[codigo]
+
+    def proxima(self):
+        return self.escolher([fila.proxima() for fila in self.filas])
+
+    def ao_alterar(self, evento, tarefa, anterior):
+        if evento == "status" and anterior == "Pendente" and tarefa.cod_status == FAZENDO:
+            self.servir(tarefa.cod_origem)
+        self.filas[tarefa.cod_origem].ao_alterar(evento, tarefa, anterior)
+
+
+def criar(nome, passo=PASSO_ENVELHECIMENTO):
+    """
+    Args:
+        nome (str): Um dos NOMES
+        passo (timedelta): Passo do envelhecimento
+
+    Returns:
+        Agendador ou FilaJusta: Política nova, ainda sem tarefas
+
+    Raises:
+        ValueError: Se a política não existir
+    """
+    if nome == "estrita":
+        return Estrita()
+    if nome == "envelhecimento":
+        return Envelhecimento(passo)
+    if nome == "prazo":
+        return Prazo()
+    if nome == "justa":
+        return FilaJusta()
+    raise ValueError(f"Política desconhecida: {nome!r} (use {', '.join(NOMES)}).")
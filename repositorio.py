@@ -0,0 +1,353 @@
+"""
+Repositórios das tarefas ativas.
+
+Repositorio define a interface comum (consulta por ID, filtros por status e
+prioridade, alterações) e a notificação dos ouvintes inscritos. Toda
+alteração deve passar pelos métodos do repositório, que avisam os ouvintes
+(por exemplo, o agendador e o diário).
+
+RepositorioTarefas é a implementação em memória: um índice id -> tarefa e
+índices secundários por status e por prioridade, mantidos consistentes a
+cada alteração.
+
+O repositório também pode partir de um snapshot binário (instantaneo.py):
+nesse caso as tarefas do snapshot só viram objetos quando são acessadas
+por ID, por um filtro de status/prioridade ou por uma iteração completa.
+"""
+from contextlib import contextmanager
+
+from modelo import CODIGO_PRIORIDADE, CODIGO_STATUS
+
+
+class Repositorio:
+    def __init__(self):
+        self._ouvintes = []
+        self._silencioso = False
+        # Conta as alterações, avisadas ou não (cache.py).
+        self.versao = 0
+
+    def inscrever(self, ouvinte):
+        """
+        Registra uma função chamada a cada alteração do repositório.
+
+        O ouvinte recebe (evento, tarefa, anterior), em que evento é
+        "adicionada", "prioridade", "status" ou "removida" e anterior é o
+        valor antigo do campo alterado (ou None).
+
+        Args:
+            ouvinte (callable): Função a ser notificada
+        """
+        self._ouvintes.append(ouvinte)
+
+    def _notificar(self, evento, tarefa, anterior=None):
+        self.versao += 1
+        if self._silencioso:
+            return
+        for ouvinte in self._ouvintes:
+            ouvinte(evento, tarefa, anterior)
+
+    @contextmanager
+    def sem_notificar(self):
+        """
+        Suspende os ouvintes, por exemplo ao reaplicar o diário na carga.
+        """
+        self._silencioso = True
+        try:
+            yield self
+        finally:
+            self._silencioso = False
+
+    def adicionar(self, tarefa):
+        raise NotImplementedError
+
+    def obter(self, id_tarefa):
+        raise NotImplementedError
+
+    def remover(self, id_tarefa):
+        raise NotImplementedError
+
+    def alterar_prioridade(self, tarefa, prioridade):
+        raise NotImplementedError
+
+    def alterar_status(self, tarefa, status, data_conclusao=None):
+        raise NotImplementedError
+
+    def com_status(self, status):
+        raise NotImplementedError
+
+    def com_prioridade(self, prioridade):
+        raise NotImplementedError
+
+    def primeiras_com_status(self, status):
+        """
+        Candidatas à primeira tarefa com o status informado, em qualquer
+        ordem em que tarefas de mesma prioridade e origem sigam (criação,
+        id), como as chaves do agendador, sem percorrer todas as tarefas com
+        o status.
+
+        Args:
+            status (str): Status desejado
+
+        Returns:
+            list: Tarefas candidatas, ou None se o repositório não tiver esse
+            atalho (aí use com_status)
+        """
+        return None
+
+    def concluidas_antes(self, limite):
+        """
+        Tarefas concluídas antes de `limite`, sem percorrer todas as
+        concluídas.
+
+        Args:
+            limite (int): Data de conclusão limite, em microssegundos desde a
+                época (modelo.para_epoca)
+
+        Returns:
+            list: Tarefas encontradas, em qualquer ordem, ou None se o
+            repositório não tiver esse atalho (aí use com_status)
+        """
+        return None
+
+    def maior_id(self):
+        raise NotImplementedError
+
+
+class RepositorioTarefas(Repositorio):
+    def __init__(self):
+        super().__init__()
+        self._por_id = {}
+        self._por_status = {}
+        self._por_prioridade = {}
+        self._limpar_base()
+
+    def _limpar_base(self):
+        self._base = None
+        self._base_usadas = None
+        self._base_restantes = 0
+        self._colunas_completas = set()
+
+    def _indexar(self, tarefa):
+        id_tarefa = tarefa.id
+        self._por_id[id_tarefa] = tarefa
+        self._por_status.setdefault(tarefa.status, {})[id_tarefa] = tarefa
+        self._por_prioridade.setdefault(tarefa.prioridade, {})[id_tarefa] = tarefa
+
+    def carregar(self, tarefas):
+        """
+        Substitui todo o conteúdo do repositório, sem notificar ouvintes.
+
+        Args:
+            tarefas (iterable): Tarefas lidas do armazenamento
+        """
+        self._soltar_base()
+        self._por_id = {}
+        self._por_status = {}
+        self._por_prioridade = {}
+        for tarefa in tarefas:
+            self._indexar(tarefa)
+
+    def carregar_instantaneo(self, instantaneo):
+        """
+        Substitui o conteúdo do repositório por um snapshot binário, sem
+        decodificar nenhuma tarefa.
+
+        Args:
+            instantaneo (InstantaneoBinario): Snapshot aberto
+        """
+        self.carregar(())
+        self._base = instantaneo
+        self._base_usadas = bytearray(len(instantaneo))
+        self._base_restantes = len(instantaneo)
+
+    def _materializar(self, posicao):
+        self._base_usadas[posicao] = 1
+        self._base_restantes -= 1
+        tarefa = self._base.tarefa(posicao)
+        self._indexar(tarefa)
+        return tarefa
+
+    def _materializar_coluna(self, coluna, codigo):
+        chave = (coluna, codigo)
+        if self._base is None or chave in self._colunas_completas:
+            return
+        usadas = self._base_usadas
+        for posicao in self._base.posicoes_com(coluna, codigo):
+            if not usadas[posicao]:
+                self._materializar(posicao)
+        self._colunas_completas.add(chave)
+
+    def _materializar_tudo(self):
+        if self._base is None:
+            return
+        usadas = self._base_usadas
+        posicao = usadas.find(0)
+        while posicao != -1:
+            self._materializar(posicao)
+            posicao = usadas.find(0, posicao + 1)
+        self._soltar_base()
+
+    def _soltar_base(self):
+        # Só é chamado quando todas as tarefas do snapshot já viraram objetos
+        # (ou foram descartadas), então o mmap pode ser fechado.
+        if self._base is not None:
+            self._base.fechar()
+        self._limpar_base()
+
+    def primeiras_com_status(self, status):
+        # Do snapshot só sai a primeira posição de cada par (prioridade,
+        # origem), que é a de menor (criação, id) quando a coluna de criação
+        # segue a dos IDs; as tarefas já decodificadas entram todas.
+        base = self._base
+        codigo = CODIGO_STATUS[status]
+        if base is None or ("status", codigo) in self._colunas_completas or not base.criacao_crescente():
+            return None
+        candidatas = list(self._por_status.get(status, {}).values())
+        candidatas.extend([self._materializar(p) for p in base.primeiras(codigo, self._base_usadas)])
+        return candidatas
+
+    def concluidas_antes(self, limite):
+        base = self._base
+        codigo = CODIGO_STATUS["Concluída"]
+        if base is None or ("status", codigo) in self._colunas_completas:
+            return None
+        usadas = self._base_usadas
+        posicoes = [p for p in base.concluidas_antes(codigo, limite) if not usadas[p]]
+        encontradas = [
+            t for t in self._por_status.get("Concluída", {}).values()
+            if t.conclusao is not None and t.conclusao < limite
+        ]
+        encontradas.extend(t for t in map(self._materializar, posicoes) if t.conclusao is not None)
+        return encontradas
+
+    def maior_id(self):
+        """
+        Maior ID presente no repositório, sem decodificar o snapshot.
+
+        Returns:
+            int: Maior ID, ou 0 se o repositório estiver vazio
+        """
+        maior = max(self._por_id, default=0)
+        if self._base is not None:
+            maior = max(maior, self._base.ultimo_id())
+        return maior
+
+    def adicionar(self, tarefa):
+        """
+        Adiciona uma tarefa nova ao repositório.
+
+        Args:
+            tarefa (Tarefa): Tarefa a ser adicionada
+        """
+        self._indexar(tarefa)
+        self._notificar("adicionada", tarefa)
+
+    def obter(self, id_tarefa):
+        """
+        Busca uma tarefa pelo ID em O(1).
+
+        Args:
+            id_tarefa (int): ID da tarefa
+
+        Returns:
+            Tarefa: Tarefa encontrada, ou None
+        """
+        tarefa = self._por_id.get(id_tarefa)
+        if tarefa is None and self._base is not None:
+            posicao = self._base.posicao(id_tarefa)
+            if posicao is not None and not self._base_usadas[posicao]:
+                tarefa = self._materializar(posicao)
+        return tarefa
+
+    def remover(self, id_tarefa):
+        """
+        Remove uma tarefa e suas entradas nos índices em O(1).
+
+        Args:
+            id_tarefa (int): ID da tarefa
+
+        Returns:
+            Tarefa: Tarefa removida, ou None se o ID não existir
+        """
+        if self.obter(id_tarefa) is None:
+            return None
+        tarefa = self._por_id.pop(id_tarefa)
+        del self._por_status[tarefa.status][id_tarefa]
+        del self._por_prioridade[tarefa.prioridade][id_tarefa]
+        self._notificar("removida", tarefa)
+        return tarefa
+
+    def alterar_prioridade(self, tarefa, prioridade):
+        """
+        Altera a prioridade de uma tarefa mantendo o índice por prioridade.
+
+        Args:
+            tarefa (Tarefa): Tarefa do repositório
+            prioridade (str): Nova prioridade
+        """
+        anterior = tarefa.prioridade
+        del self._por_prioridade[anterior][tarefa.id]
+        tarefa.prioridade = prioridade
+        self._por_prioridade.setdefault(prioridade, {})[tarefa.id] = tarefa
+        self._notificar("prioridade", tarefa, anterior)
+
+    def alterar_status(self, tarefa, status, data_conclusao=None):
+        """
+        Altera o status de uma tarefa mantendo o índice por status.
+
+        Args:
+            tarefa (Tarefa): Tarefa do repositório
+            status (str): Novo status
+            data_conclusao (datetime): Data de conclusão, se aplicável
+        """
+        anterior = tarefa.status
+        del self._por_status[anterior][tarefa.id]
+        tarefa.status = status
+        if data_conclusao is not None:
+            tarefa.data_conclusao = data_conclusao
+        self._por_status.setdefault(status, {})[tarefa.id] = tarefa
+        self._notificar("status", tarefa, anterior)
+
+    def com_status(self, status):
+        """
+        Retorna uma visão das tarefas com o status informado.
+
+        A visão acompanha o repositório; copie-a com list() antes de alterar
+        o status das tarefas durante a iteração.
+
+        Args:
+            status (str): Status desejado
+
+        Returns:
+            iterable: Tarefas com o status
+        """
+        self._materializar_coluna("status", CODIGO_STATUS[status])
+        return self._por_status.get(status, {}).values()
+
+    def com_prioridade(self, prioridade):
+        """
+        Retorna uma visão das tarefas com a prioridade informada.
+
+        Args:
+            prioridade (str): Prioridade desejada
+
+        Returns:
+            iterable: Tarefas com a prioridade
+        """
+        self._materializar_coluna("prioridade", CODIGO_PRIORIDADE[prioridade])
+        return self._por_prioridade.get(prioridade, {}).values()
+
+    def __iter__(self):
+        self._materializar_tudo()
+        return iter(self._por_id.values())
+
+    def __len__(self):
+        return len(self._por_id) + self._base_restantes
+
+    def __contains__(self, id_tarefa):
+        if id_tarefa in self._por_id:
+            return True
+        if self._base is None:
+            return False
+        posicao = self._base.posicao(id_tarefa)
+        return posicao is not None and not self._base_usadas[posicao]
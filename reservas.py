@@ -0,0 +1,130 @@
+"""
+Reservas das tarefas em andamento, uma por trabalhador.
+
+Cada trabalhador (um operador do menu, um processo, um cliente do servidor)
+tem no máximo uma tarefa em andamento, reservada até uma data de expiração
+ou sem expiração. Um trabalhador que cai sem concluir a tarefa deixa de
+renovar a reserva, e a tarefa volta a ficar pendente quando a reserva vence.
+
+Reservas guarda as reservas do armazenamento JSON em memória, com um heap
+das expirações: como no agendador, a entrada de uma reserva substituída ou
+liberada é apenas invalidada e descartada quando chega ao topo. A cada
+alteração as reservas são regravadas em um arquivo JSON pequeno, sem fsync;
+se ele se perder, as tarefas em andamento sem reserva são tratadas na carga
+(tarefas.adotar_sem_reserva). O armazenamento SQLite guarda as reservas em
+uma tabela.
+"""
+import heapq
+import itertools
+import json
+import os
+from datetime import datetime
+
+from modelo import de_epoca, para_epoca
+
+
+class Reservas:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._por_trabalhador = {}
+        self._por_id = {}
+        self._heap = []
+        self._sequencia = itertools.count()
+
+    def carregar(self):
+        """Lê as reservas gravadas, se houver."""
+        self._por_trabalhador = {}
+        self._por_id = {}
+        self._heap = []
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, "r", encoding="utf-8") as f:
+            gravadas = json.load(f)
+        for trabalhador, reserva in gravadas.items():
+            expira = reserva["expira"]
+            self._registrar(trabalhador, reserva["id"], para_epoca(datetime.fromisoformat(expira)) if expira else None)
+
+    def _gravar(self):
+        gravadas = {
+            trabalhador: {"id": entrada[3], "expira": de_epoca(entrada[0]).isoformat() if entrada[0] is not None else None}
+            for trabalhador, entrada in self._por_trabalhador.items()
+        }
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(gravadas, f, ensure_ascii=False)
+        os.replace(temporario, self.caminho)
+
+    def _invalidar(self, entrada):
+        del self._por_trabalhador[entrada[2]]
+        del self._por_id[entrada[3]]
+        entrada[2] = None
+
+    def _registrar(self, trabalhador, id_tarefa, expira):
+        for anterior in (self._por_trabalhador.get(trabalhador), self._por_id.get(id_tarefa)):
+            if anterior is not None and anterior[2] is not None:
+                self._invalidar(anterior)
+        # A sequência desempata expirações iguais, então a comparação nunca
+        # chega ao trabalhador, que vira None na invalidação.
+        entrada = [expira, next(self._sequencia), trabalhador, id_tarefa]
+        self._por_trabalhador[trabalhador] = entrada
+        self._por_id[id_tarefa] = entrada
+        if expira is not None:
+            heapq.heappush(self._heap, entrada)
+
+    def id_de(self, trabalhador):
+        """
+        Args:
+            trabalhador (str): Identificador do trabalhador
+
+        Returns:
+            int: ID da tarefa reservada, ou None
+        """
+        entrada = self._por_trabalhador.get(trabalhador)
+        return entrada[3] if entrada is not None else None
+
+    def __contains__(self, id_tarefa):
+        return id_tarefa in self._por_id
+
+    def reservar(self, trabalhador, id_tarefa, expira):
+        """
+        Reserva uma tarefa para o trabalhador, substituindo a reserva anterior
+        dele e qualquer outra reserva da mesma tarefa.
+
+        Args:
+            trabalhador (str): Identificador do trabalhador
+            id_tarefa (int): ID da tarefa
+            expira (int): Expiração em microssegundos desde a época, ou None
+        """
+        self._registrar(trabalhador, id_tarefa, expira)
+        self._gravar()
+
+    def liberar(self, trabalhador):
+        """
+        Desfaz a reserva do trabalhador, se houver.
+
+        Args:
+            trabalhador (str): Identificador do trabalhador
+        """
+        entrada = self._por_trabalhador.get(trabalhador)
+        if entrada is not None:
+            self._invalidar(entrada)
+            self._gravar()
+
+    def vencidas(self, agora):
+        """
+        Reservas com expiração anterior a `agora`. Elas continuam valendo até
+        serem liberadas.
+
+        Args:
+            agora (int): Microssegundos desde a época
+
+        Returns:
+            list: Pares (trabalhador, id da tarefa)
+        """
+        heap = self._heap
+        vencidas = []
+        while heap and heap[0][0] < agora:
+            entrada = heapq.heappop(heap)
+            if entrada[2] is not None:
+                vencidas.append((entrada[2], entrada[3]))
+        return vencidas
@@ -0,0 +1,425 @@
+"""
+Servidor HTTP/JSON local sobre asyncio.
+
+Expõe as operações de tarefas.py em um socket local, para vários clientes ao
+mesmo tempo:
+
+    GET    /tarefas                        lista (status, prioridade, limite, offset)
+    POST   /tarefas                        cria {titulo, descricao, prioridade, origem}
+    GET    /tarefas/<id>                   consulta
+    PATCH  /tarefas/<id>                   altera {prioridade}
+    DELETE /tarefas/<id>                   exclui
+    GET    /trabalhadores/<nome>           tarefa em andamento do trabalhador
+    POST   /trabalhadores/<nome>/proxima   reserva a próxima tarefa {duracao_segundos}
+    POST   /trabalhadores/<nome>/renovar   renova a reserva {duracao_segundos}
+    POST   /trabalhadores/<nome>/concluir  conclui a tarefa em andamento
+    POST   /arquivar                       arquiva as concluídas antigas
+    GET    /arquivadas                     relatório de arquivadas (mesmos filtros, inicio,
+                                           fim e campo_data para um período)
+    GET    /pagina                         página por cursor (ordem, cursor, limite, status, prioridade)
+    GET    /busca                          busca textual (q, modo, status, prioridade, limite)
+    GET    /eventos                        eventos do fluxo de alterações a partir de um
+                                           offset (desde, limite); com espera=S, espera
+                                           até S segundos por eventos novos
+    GET    /estatisticas                   estatísticas de desempenho (com --stats)
+
+Todas as alterações passam por um único escritor (Escritor), que tira da
+fila todos os pedidos acumulados e os aplica em uma só transação do
+armazenamento: com o diário, um lote inteiro custa uma escrita e um fsync, e
+as respostas só saem depois dele. Sem o diário, o snapshot é regravado em
+segundo plano no máximo uma vez por intervalo. As leituras são respondidas
+direto, sem esperar a fila; como o escritor aplica cada lote sem ceder o
+laço de eventos, elas nunca veem um lote pela metade.
+"""
+import asyncio
+import json
+import signal
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from eventos import INTERVALO_ESPERA
+import metricas
+import paginacao
+import tarefas as app
+
+RAZOES = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+          409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+LIMITE_CORPO = 1 << 20
+LIMITE_LISTA = 100
+LIMITE_ESPERA = 30
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class Escritor:
+    def __init__(self, intervalo_salvamento=1.0):
+        """
+        Args:
+            intervalo_salvamento (float): Segundos entre dois snapshots em
+                segundo plano quando o diário está desligado
+        """
+        self.intervalo_salvamento = intervalo_salvamento
+        self._fila = asyncio.Queue()
+        self._salvamento = None
+
+    async def executar(self, funcao, *args):
+        """
+        Enfileira uma alteração e espera o lote dela ser gravado.
+
+        Args:
+            funcao (callable): Operação de tarefas.py
+
+        Returns:
+            Resultado da operação (ou a exceção que ela lançou é relançada)
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((funcao, args, futuro))
+        return await futuro
+
+    async def rodar(self):
+        """Aplica os pedidos da fila em lotes, até ser cancelado."""
+        while True:
+            lote = [await self._fila.get()]
+            while not self._fila.empty():
+                lote.append(self._fila.get_nowait())
+            resultados = []
+            try:
+                with metricas.medir("servidor.lote"), app.armazenamento.transacao():
+                    for funcao, args, _ in lote:
+                        try:
+                            resultados.append((True, funcao(*args)))
+                        except Exception as e:
+                            resultados.append((False, e))
+            except Exception as e:
+                resultados = [(False, e)] * len(lote)
+            for (_, _, futuro), (ok, valor) in zip(lote, resultados):
+                if futuro.done():
+                    continue
+                if ok:
+                    futuro.set_result(valor)
+                else:
+                    futuro.set_exception(valor)
+            if not app.USAR_DIARIO:
+                self._agendar_salvamento()
+
+    def _agendar_salvamento(self):
+        if self._salvamento is None:
+            self._salvamento = asyncio.get_running_loop().call_later(self.intervalo_salvamento, self._salvar)
+
+    def _salvar(self):
+        self._salvamento = None
+        app.save_data()
+
+
+def _inteiro(texto, nome, minimo=None):
+    try:
+        valor = int(texto)
+    except (TypeError, ValueError):
+        raise ErroHTTP(400, f"{nome} deve ser um número inteiro.")
+    if minimo is not None and valor < minimo:
+        raise ErroHTTP(400, f"{nome} deve ser no mínimo {minimo}.")
+    return valor
+
+
+def _data(texto, nome):
+    try:
+        return None if texto is None else datetime.fromisoformat(texto)
+    except ValueError:
+        raise ErroHTTP(400, f"{nome} deve ser uma data ISO 8601.")
+
+
+def _texto(corpo, campo, padrao=None):
+    # Campo ausente fica com o padrão; null, números etc. são recusados em vez
+    # de virarem "None" ou "3" no título.
+    if campo not in corpo:
+        return padrao
+    valor = corpo[campo]
+    if not isinstance(valor, str):
+        raise ErroHTTP(400, f"{campo} deve ser texto.")
+    return valor
+
+
+def _duracao(corpo):
+    segundos = corpo.get("duracao_segundos")
+    if segundos is None:
+        return app.DURACAO_RESERVA
+    if not isinstance(segundos, (int, float)) or segundos <= 0:
+        raise ErroHTTP(400, "duracao_segundos deve ser um número positivo.")
+    return timedelta(seconds=segundos)
+
+
+class Servidor:
+    def __init__(self, escritor):
+        self.escritor = escritor
+
+    async def despachar(self, metodo, caminho, consulta, corpo):
+        """
+        Encaminha um pedido para a operação correspondente.
+
+        Returns:
+            tuple: (status HTTP, corpo da resposta)
+        """
+        partes = [unquote(p) for p in caminho.split("/") if p]
+        if partes == ["tarefas"]:
+            if metodo == "GET":
+                return 200, self.listar(consulta)
+            if metodo == "POST":
+                tarefa = await self.escritor.executar(
+                    app.adicionar_tarefa, _texto(corpo, "titulo", ""), _texto(corpo, "descricao", ""),
+                    _texto(corpo, "prioridade"), _texto(corpo, "origem"),
+                )
+                return 201, tarefa.para_json()
+        elif len(partes) == 2 and partes[0] == "tarefas":
+            id_tarefa = _inteiro(partes[1], "ID")
+            if metodo == "GET":
+                tarefa = app.tarefas.obter(id_tarefa)
+                if tarefa is None:
+                    raise ErroHTTP(404, "ID inválido.")
+                return 200, tarefa.para_json()
+            if id_tarefa not in app.tarefas:
+                raise ErroHTTP(404, "ID inválido.")
+            if metodo == "PATCH":
+                tarefa = await self.escritor.executar(app.alterar_prioridade, id_tarefa, _texto(corpo, "prioridade"))
+                return 200, tarefa.para_json()
+            if metodo == "DELETE":
+                tarefa = await self.escritor.executar(app.remover_tarefa, id_tarefa)
+                if tarefa is None:
+                    raise ErroHTTP(500, "Erro ao salvar tarefa arquivada.")
+                return 200, tarefa.para_json()
+        elif partes and partes[0] == "trabalhadores" and len(partes) in (2, 3):
+            return await self.trabalhador(metodo, partes[1], partes[2] if len(partes) == 3 else None, corpo)
+        elif partes == ["arquivar"] and metodo == "POST":
+            arquivadas = await self.escritor.executar(app.arquivar_concluidas)
+            if arquivadas is None:
+                raise ErroHTTP(500, "Erro ao salvar tarefa arquivada.")
+            return 200, {"arquivadas": [t.id for t in arquivadas]}
+        elif partes == ["arquivadas"] and metodo == "GET":
+            return 200, self.listar_arquivadas(consulta)
+        elif partes == ["pagina"] and metodo == "GET":
+            return 200, self.pagina(consulta)
+        elif partes == ["busca"] and metodo == "GET":
+            try:
+                encontradas = app.buscar_tarefas(
+                    consulta.get("q", ""), consulta.get("modo", "ranqueado"), consulta.get("status"),
+                    consulta.get("prioridade"), _inteiro(consulta.get("limite", LIMITE_LISTA), "limite", 1),
+                )
+            except ValueError as e:
+                raise ErroHTTP(400, str(e))
+            return 200, [t.para_json() for t in encontradas]
+        elif partes == ["eventos"] and metodo == "GET":
+            return 200, await self.eventos(consulta)
+        elif partes == ["estatisticas"] and metodo == "GET":
+            return 200, {"ativo": metricas.ativo(), "operacoes": metricas.para_json()}
+        else:
+            raise ErroHTTP(404, "Recurso não encontrado.")
+        raise ErroHTTP(405, "Método não permitido.")
+
+    async def trabalhador(self, metodo, nome, acao, corpo):
+        if acao is None and metodo == "GET":
+            tarefa = app.armazenamento.reserva(nome)
+            return 200, tarefa.para_json() if tarefa is not None else None
+        if metodo != "POST":
+            raise ErroHTTP(405, "Método não permitido.")
+        if acao == "proxima":
+            try:
+                tarefa = await self.escritor.executar(app.reservar_proxima, nome, _duracao(corpo))
+            except ValueError as e:
+                raise ErroHTTP(409, str(e))
+            return 200, tarefa.para_json() if tarefa is not None else None
+        if acao == "renovar":
+            try:
+                tarefa = await self.escritor.executar(app.renovar_reserva, nome, _duracao(corpo))
+            except ValueError as e:
+                raise ErroHTTP(404, str(e))
+            return 200, tarefa.para_json()
+        if acao == "concluir":
+            tarefa = await self.escritor.executar(app.concluir_tarefa_atual, nome)
+            if tarefa is None:
+                raise ErroHTTP(404, "Nenhuma tarefa em andamento para concluir.")
+            return 200, tarefa.para_json()
+        raise ErroHTTP(404, "Recurso não encontrado.")
+
+    def listar(self, consulta):
+        status = consulta.get("status")
+        prioridade = consulta.get("prioridade")
+        if status is not None and not app.validar_status(status):
+            raise ErroHTTP(400, "Status inválido.")
+        if prioridade is not None and not app.validar_prioridade(prioridade):
+            raise ErroHTTP(400, "Prioridade inválida.")
+        limite = _inteiro(consulta.get("limite", LIMITE_LISTA), "limite", 1)
+        offset = _inteiro(consulta.get("offset", 0), "offset", 0)
+        if status is not None:
+            candidatas = app.tarefas.com_status(status)
+        elif prioridade is not None:
+            candidatas = app.tarefas.com_prioridade(prioridade)
+        else:
+            candidatas = app.tarefas
+        lista = []
+        for t in candidatas:
+            if prioridade is not None and t.prioridade != prioridade:
+                continue
+            if offset:
+                offset -= 1
+                continue
+            if len(lista) >= limite:
+                break
+            lista.append(t.para_json())
+        return lista
+
+    def pagina(self, consulta):
+        try:
+            cursor = paginacao.decodificar_cursor(consulta.get("cursor"))
+        except ValueError:
+            raise ErroHTTP(400, "Cursor inválido.")
+        try:
+            tarefas, cursor = app.listar_pagina(
+                consulta.get("ordem", "id"), cursor, _inteiro(consulta.get("limite", LIMITE_LISTA), "limite", 1),
+                consulta.get("status"), consulta.get("prioridade"),
+            )
+        except ValueError as e:
+            raise ErroHTTP(400, str(e))
+        return {"tarefas": [t.para_json() for t in tarefas], "cursor": paginacao.codificar_cursor(cursor)}
+
+    def listar_arquivadas(self, consulta):
+        filtros = {campo: consulta[campo] for campo in ("status", "prioridade", "origem") if campo in consulta}
+        filtros.setdefault("status", "Arquivado")
+        campo_data = consulta.get("campo_data", "data_criacao")
+        if campo_data not in ("data_criacao", "data_conclusao"):
+            raise ErroHTTP(400, "campo_data deve ser data_criacao ou data_conclusao.")
+        return list(app.armazenamento.ler_arquivadas(
+            inicio=_data(consulta.get("inicio"), "inicio"),
+            fim=_data(consulta.get("fim"), "fim"),
+            campo_data=campo_data,
+            offset=_inteiro(consulta.get("offset", 0), "offset", 0),
+            limite=_inteiro(consulta.get("limite", LIMITE_LISTA), "limite", 1),
+            **filtros,
+        ))
+
+    async def eventos(self, consulta):
+        if app.armazenamento.eventos is None:
+            raise ErroHTTP(404, "O fluxo de eventos está desligado.")
+        desde = _inteiro(consulta.get("desde", 0), "desde", 0)
+        limite = _inteiro(consulta.get("limite", LIMITE_LISTA), "limite", 1)
+        espera = min(_inteiro(consulta.get("espera", 0), "espera", 0), LIMITE_ESPERA)
+        laco = asyncio.get_running_loop()
+        prazo = laco.time() + espera
+        while True:
+            try:
+                eventos = app.armazenamento.eventos.ler(desde, limite)
+            except ValueError as e:
+                raise ErroHTTP(400, str(e))
+            if eventos or laco.time() >= prazo:
+                break
+            await asyncio.sleep(INTERVALO_ESPERA)
+        return {"eventos": eventos, "proximo": eventos[-1]["offset"] + 1 if eventos else desde}
+
+    async def atender(self, leitor, escritor):
+        """Atende uma conexão HTTP/1.1, com keep-alive."""
+        try:
+            while True:
+                try:
+                    cabecalho = await leitor.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                linhas = cabecalho.decode("latin-1").split("\r\n")
+                try:
+                    metodo, alvo, versao = linhas[0].split(" ", 2)
+                except ValueError:
+                    break
+                # Clientes que não codificam o caminho mandam UTF-8 cru.
+                alvo = alvo.encode("latin-1").decode("utf-8", "replace")
+                cabecalhos = {}
+                for linha in linhas[1:]:
+                    nome, _, valor = linha.partition(":")
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                fechar = versao == "HTTP/1.0" or cabecalhos.get("connection", "").lower() == "close"
+                tamanho = cabecalhos.get("content-length") or "0"
+                # Sem um tamanho válido não há como achar o fim do corpo: a
+                # conexão é fechada depois da resposta.
+                tamanho = int(tamanho) if tamanho.isascii() and tamanho.isdigit() else None
+                if tamanho is None:
+                    status, resposta, fechar = 400, {"erro": "Content-Length inválido."}, True
+                elif tamanho > LIMITE_CORPO:
+                    status, resposta, fechar = 413, {"erro": "Corpo muito grande."}, True
+                else:
+                    corpo = await leitor.readexactly(tamanho) if tamanho else b""
+                    status, resposta = await self.responder(metodo, alvo, corpo)
+                dados = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+                conexao = "Connection: close\r\n" if fechar else ""
+                escritor.write(
+                    f"HTTP/1.1 {status} {RAZOES[status]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(dados)}\r\n"
+                    f"{conexao}\r\n".encode("latin-1") + dados
+                )
+                await escritor.drain()
+                if fechar:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    async def responder(self, metodo, alvo, corpo):
+        url = urlsplit(alvo)
+        consulta = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+        try:
+            dados = json.loads(corpo) if corpo else {}
+            if not isinstance(dados, dict):
+                raise ErroHTTP(400, "O corpo deve ser um objeto JSON.")
+            return await self.despachar(metodo, url.path, consulta, dados)
+        except ErroHTTP as e:
+            return e.status, {"erro": str(e)}
+        except ValueError as e:
+            return 400, {"erro": str(e)}
+        except Exception as e:
+            return 500, {"erro": f"Erro interno: {e}"}
+
+
+async def servir(host, porta, intervalo_salvamento=1.0):
+    """
+    Carrega as tarefas e atende pedidos até ser cancelado.
+
+    Args:
+        host (str): Endereço local
+        porta (int): Porta TCP
+        intervalo_salvamento (float): Segundos entre snapshots sem diário
+    """
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    escritor = Escritor(intervalo_salvamento)
+    servidor = Servidor(escritor)
+    tarefa_escritor = asyncio.create_task(escritor.rodar())
+    varredura = None
+    if app.INTERVALO_VARREDURA:
+        async def varrer():
+            while True:
+                await asyncio.sleep(app.INTERVALO_VARREDURA)
+                await escritor.executar(app.arquivar_concluidas)
+        varredura = asyncio.create_task(varrer())
+    rede = await asyncio.start_server(servidor.atender, host, porta)
+    print(f"Servidor de tarefas em http://{host}:{porta}")
+    try:
+        async with rede:
+            await rede.serve_forever()
+    finally:
+        if varredura is not None:
+            varredura.cancel()
+        tarefa_escritor.cancel()
+
+
+def executar(host="127.0.0.1", porta=8080):
+    """Roda o servidor até Ctrl+C (ou SIGTERM) e grava as tarefas ao sair."""
+    try:
+        asyncio.run(servir(host, porta))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        app.save_data()
+        app.armazenamento.fechar()
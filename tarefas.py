@@ -1,75 +1,453 @@
+"""
+Sistema de gestão de tarefas: menu, linha de comando e as operações usadas
+pelo servidor, pela importação em lote e por outros programas.
+
+O armazenamento é um global do módulo (`armazenamento`), criado na
+importação para DIRETORIO_DADOS; todas as operações usam esse global, então
+um processo atende uma equipe só. Para servir outra equipe, rode outro
+processo com TAREFAS_DIRETORIO apontando para o diretório dela.
+"""
+import argparse
+import io
 import json
 import os
+import sys
+import threading
 from datetime import datetime, timedelta
 
-tarefas = []  
+from armazenamento import ArmazenamentoJSON, ArmazenamentoOcupado
+from arquivamento import VarreduraPeriodica
+from busca import MODOS as MODOS_BUSCA
+from cache import CacheRelatorios
+from eventos import FluxoEventos
+import metricas
+import paginacao
+import politicas
+from modelo import CODIGO_ORIGEM, CODIGO_PRIORIDADE, CODIGO_STATUS, Tarefa, para_epoca
+
+# Os arquivos abaixo ficam em DIRETORIO_DADOS (padrão: o diretório atual).
+# Cada equipe usa o seu diretório, e os processos de equipes diferentes não
+# disputam arquivos nem travas. Com FRAGMENTOS > 1, as tarefas da equipe são
+# divididas por ID entre subdiretórios com os mesmos arquivos (fragmentos.py).
+DIRETORIO_DADOS = os.environ.get("TAREFAS_DIRETORIO", "")
+FRAGMENTOS = int(os.environ.get("TAREFAS_FRAGMENTOS", "1"))
+ARQUIVO_TAREFAS = "tarefas.json"
+ARQUIVO_INSTANTANEO = "tarefas.bin"
+ARQUIVO_DIARIO = "tarefas.log"
+# Arquivadas particionadas por mês e status (arquivo.py); os dois arquivos
+# dos formatos anteriores são migrados para as partições na carga.
+DIRETORIO_ARQUIVADAS = "tarefas_arquivadas"
+ARQUIVO_ARQUIVADAS = "tarefas_arquivadas.jsonl"
+ARQUIVO_ARQUIVADAS_LEGADO = "tarefas_arquivadas.json"
+ARQUIVO_RESERVAS = "tarefas_reservas.json"
+ARQUIVO_BANCO = "tarefas.db"
+# "json" usa os arquivos acima; "sqlite" guarda tudo em ARQUIVO_BANCO e, na
+# primeira execução, copia para o banco as tarefas já gravadas em JSON.
+BACKEND = os.environ.get("TAREFAS_BACKEND", "json")
+# Com o diário ativo, cada alteração é anexada a ARQUIVO_DIARIO e o snapshot
+# em ARQUIVO_TAREFAS só é reescrito na compactação (save_data).
+USAR_DIARIO = os.environ.get("TAREFAS_DIARIO", "1") != "0"
+LIMITE_COMPACTACAO = 10000
+# "binario" grava o snapshot em ARQUIVO_INSTANTANEO, que load_data abre via
+# mmap e decodifica sob demanda; o JSON continua servindo para importação
+# (quando ainda não há snapshot binário) e exportação (exportar_json).
+FORMATO_SNAPSHOT = os.environ.get("TAREFAS_SNAPSHOT", "json")
+# Tarefas concluídas há mais de RETENCAO são arquivadas. Com
+# INTERVALO_VARREDURA > 0, o arquivamento também roda sozinho em segundo
+# plano enquanto o menu está aberto.
+RETENCAO = timedelta(days=float(os.environ.get("TAREFAS_RETENCAO_DIAS", "7")))
+INTERVALO_VARREDURA = float(os.environ.get("TAREFAS_VARREDURA_MINUTOS", "0")) * 60
+# Cada trabalhador tem no máximo uma tarefa em andamento. O menu reserva as
+# tarefas para TRABALHADOR sem expiração; outros trabalhadores reservam com
+# reservar_proxima, por DURACAO_RESERVA, e renovam a reserva enquanto
+# trabalham. Reservas vencidas devolvem a tarefa para a fila.
+TRABALHADOR = os.environ.get("TAREFAS_TRABALHADOR", "local")
+# Política de escolha da próxima pendente (politicas.py): "estrita",
+# "envelhecimento" (sobe um nível de prioridade a cada PASSO_ENVELHECIMENTO
+# de espera), "prazo" (prazo por origem) ou "justa" (fila justa entre as
+# origens).
+POLITICA = os.environ.get("TAREFAS_POLITICA", "estrita")
+PASSO_ENVELHECIMENTO = timedelta(hours=float(os.environ.get("TAREFAS_ENVELHECIMENTO_HORAS", "24")))
+DURACAO_RESERVA = timedelta(minutes=float(os.environ.get("TAREFAS_RESERVA_MINUTOS", "30")))
+# Cada alteração também vira um evento, com offset, no log de segmentos em
+# DIRETORIO_EVENTOS (eventos.py); painéis e outros consumidores leem só os
+# eventos depois do último offset que processaram ("eventos" na linha de
+# comando, GET /eventos no servidor).
+DIRETORIO_EVENTOS = "tarefas_eventos"
+USAR_EVENTOS = os.environ.get("TAREFAS_EVENTOS", "1") != "0"
+
+# Funções medidas quando a coleta de estatísticas está ligada (--stats ou a
+# opção 11 do menu). Desligada, nada é trocado e a medição não custa nada.
+OPERACOES_MEDIDAS = (
+    "load_data", "save_data", "save_arquivadas", "exportar_json", "adicionar_tarefa", "importar_tarefas",
+    "importar_despejo", "exportar_despejo", "proxima_tarefa", "listar_tarefas",
+    "devolver_reservas_vencidas", "reservar_proxima", "reservar_proximas", "renovar_reserva",
+    "alterar_prioridade", "concluir_tarefa_atual", "concluir_tarefas_atuais", "remover_tarefa", "arquivar_concluidas", "criar_tarefa", "verificar_urgencia",
+    "atualizar_prioridade", "concluir_tarefa", "arquivar_tarefas_antigas", "excluir_tarefa", "relatorio",
+    "relatorio_arquivados", "painel", "calcular_painel", "buscar_tarefas", "listar_pagina", "exportar_arquivadas", "podar_arquivadas",
+    "podar_eventos",
+)
+CHAMADAS_ARMAZENAMENTO = (
+    "carregar", "salvar", "persistir", "proxima_pendente", "concluidas_antes", "reservar", "liberar",
+    "reservas_vencidas", "arquivar", "ler_arquivadas", "exportar_json", "buscar", "pagina",
+    "exportar_arquivadas", "podar_arquivadas",
+)
+COMPONENTES_MEDIDOS = {
+    "diario": ("registrar", "sincronizar", "reproduzir", "truncar"),
+    "eventos": ("anexar", "ler", "podar"),
+    "arquivo": ("anexar_lote", "ler", "migrar", "fechar_antigas", "exportar", "podar"),
+}
+
+def criar_armazenamento_json(diretorio=DIRETORIO_DADOS, eventos=None):
+    def caminho(nome):
+        return os.path.join(diretorio, nome)
+    return ArmazenamentoJSON(
+        caminho(ARQUIVO_TAREFAS), caminho(ARQUIVO_INSTANTANEO), caminho(ARQUIVO_DIARIO), caminho(DIRETORIO_ARQUIVADAS),
+        (caminho(ARQUIVO_ARQUIVADAS_LEGADO), caminho(ARQUIVO_ARQUIVADAS)), caminho(ARQUIVO_RESERVAS), formato=FORMATO_SNAPSHOT, usar_diario=USAR_DIARIO, limite_compactacao=LIMITE_COMPACTACAO,
+        agendador=politicas.criar(POLITICA, PASSO_ENVELHECIMENTO), eventos=eventos,
+    )
+
+def criar_armazenamento_em(diretorio, eventos=None):
+    if BACKEND == "sqlite":
+        from armazenamento_sqlite import ArmazenamentoSQLite
+        existe_json = any(os.path.exists(os.path.join(diretorio, c)) for c in (
+            ARQUIVO_TAREFAS, ARQUIVO_INSTANTANEO, DIRETORIO_ARQUIVADAS, ARQUIVO_ARQUIVADAS,
+        ))
+        return ArmazenamentoSQLite(
+            os.path.join(diretorio, ARQUIVO_BANCO),
+            origem=(lambda: criar_armazenamento_json(diretorio)) if existe_json else None,
+            politica=politicas.criar(POLITICA, PASSO_ENVELHECIMENTO), eventos=eventos,
+        )
+    return criar_armazenamento_json(diretorio, eventos)
+
+def criar_armazenamento(diretorio=DIRETORIO_DADOS, fragmentos=FRAGMENTOS):
+    eventos = FluxoEventos(os.path.join(diretorio, DIRETORIO_EVENTOS)) if USAR_EVENTOS else None
+    if fragmentos > 1:
+        from fragmentos import ArmazenamentoFragmentado
+        return ArmazenamentoFragmentado(
+            diretorio, fragmentos, criar_armazenamento_em, politicas.criar(POLITICA, PASSO_ENVELHECIMENTO), eventos,
+        )
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    return criar_armazenamento_em(diretorio, eventos)
+
+armazenamento = criar_armazenamento()
+tarefas = armazenamento.tarefas
+# Relatório, relatório de arquivadas e painel já formatados; veja cache.py.
+cache_relatorios = CacheRelatorios(armazenamento)
 id_counter = 1  
+# Protege o repositório entre as operações do menu e a varredura periódica.
+trava = threading.RLock()
 
 def validar_prioridade(prioridade):
-    return prioridade in ["Urgente", "Alta", "Média", "Baixa"]
+    return prioridade in CODIGO_PRIORIDADE
 
 def validar_origem(origem):
-    return origem in ["E-mail", "Telefone", "Chamado do Sistema"]
+    return origem in CODIGO_ORIGEM
 
 def validar_status(status):
-    return status in ["Pendente", "Fazendo", "Concluída", "Arquivado", "Excluída"]
+    return status in CODIGO_STATUS
 
-def load_data():
-    global tarefas
+def load_data(manutencao=True):
     try:
-        if os.path.exists("tarefas.json"):
-            with open("tarefas.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-                tarefas = []
-                for t in data:
-                    t["data_criacao"] = datetime.fromisoformat(t["data_criacao"])
-                    if "data_conclusao" in t and t["data_conclusao"]:
-                        t["data_conclusao"] = datetime.fromisoformat(t["data_conclusao"])
-                    tarefas.append(t)
-                global id_counter
-                if tarefas:
-                    id_counter = max(t["id"] for t in tarefas) + 1
-        else:
-            
-            with open("tarefas.json", "w", encoding="utf-8") as f:
-                json.dump([], f)
+        migradas = armazenamento.carregar(manutencao)
+        if migradas:
+            print(f"{migradas} tarefa(s) migrada(s) para {armazenamento.destino_migracao}.")
+        adotar_sem_reserva()
+        global id_counter
+        if tarefas:
+            id_counter = tarefas.maior_id() + 1
+    except ArmazenamentoOcupado:
+        raise
     except Exception as e:
         print(f"Erro ao carregar tarefas: {e}")
 
+def exportar_json(caminho):
+    armazenamento.exportar_json(caminho)
+
 def save_data():
     try:
-        data = []
-        for t in tarefas:
-            t_copy = t.copy()
-            t_copy["data_criacao"] = t["data_criacao"].isoformat()
-            if "data_conclusao" in t and t["data_conclusao"]:
-                t_copy["data_conclusao"] = t["data_conclusao"].isoformat()
-            data.append(t_copy)
-        with open("tarefas.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        armazenamento.salvar()
     except Exception as e:
         print(f"Erro ao salvar tarefas: {e}")
 
-def save_arquivadas(tarefa):
+def save_arquivadas(tarefas_arquivadas):
     try:
-        if not os.path.exists("tarefas_arquivadas.json"):
-            with open("tarefas_arquivadas.json", "w", encoding="utf-8") as f:
-                json.dump([], f)
-        with open("tarefas_arquivadas.json", "r", encoding="utf-8") as f:
-            arquivadas = json.load(f)
-        tarefa_copy = tarefa.copy()
-        tarefa_copy["data_criacao"] = tarefa["data_criacao"].isoformat()
-        if "data_conclusao" in tarefa and tarefa["data_conclusao"]:
-            tarefa_copy["data_conclusao"] = tarefa["data_conclusao"].isoformat()
-        arquivadas.append(tarefa_copy)
-        with open("tarefas_arquivadas.json", "w", encoding="utf-8") as f:
-            json.dump(arquivadas, f, ensure_ascii=False, indent=4)
+        armazenamento.arquivar(tarefas_arquivadas)
+        return True
     except Exception as e:
         print(f"Erro ao salvar tarefa arquivada: {e}")
+        return False
+
+# Operações sem entrada/saída, usadas pelo menu, pela importação em lote e
+# por outros programas. Erros de validação viram ValueError.
+
+def reservar_ids(quantidade):
+    global id_counter
+    inicio = armazenamento.proximo_id(id_counter, quantidade)
+    id_counter = inicio + quantidade
+    return range(inicio, inicio + quantidade)
+
+def adicionar_tarefa(titulo, descricao, prioridade, origem):
+    titulo = titulo.strip()
+    if not titulo:
+        raise ValueError("Título é obrigatório.")
+    if not validar_prioridade(prioridade):
+        raise ValueError("Prioridade inválida.")
+    if not validar_origem(origem):
+        raise ValueError("Origem inválida.")
+    with armazenamento.transacao():
+        tarefa = Tarefa(reservar_ids(1)[0], titulo, descricao.strip(), prioridade, "Pendente", origem, datetime.now())
+        tarefas.adicionar(tarefa)
+    return tarefa
+
+def importar_tarefas(registros):
+    import lote
+    validos, erros = lote.validar(registros)
+    agora = datetime.now()
+    with armazenamento.transacao():
+        novas = [
+            Tarefa(id_tarefa, titulo, descricao, prioridade, "Pendente", origem, agora)
+            for id_tarefa, (titulo, descricao, prioridade, origem) in zip(reservar_ids(len(validos)), validos)
+        ]
+        for tarefa in novas:
+            tarefas.adicionar(tarefa)
+    return novas, erros
+
+def importar_despejo(caminho, processos=None):
+    # Os IDs do despejo só dão a ordem; as tarefas recebem IDs novos.
+    import despejo
+    validas, erros = despejo.ler(caminho, processos)
+    with armazenamento.transacao():
+        novas = [
+            Tarefa.de_codigos(id_tarefa, *campos)
+            for id_tarefa, (_, *campos) in zip(reservar_ids(len(validas)), validas)
+        ]
+        for tarefa in novas:
+            tarefas.adicionar(tarefa)
+    return novas, erros
+
+def exportar_despejo(caminho, processos=None):
+    import despejo
+    return despejo.exportar(armazenamento, caminho, processos)
+
+def adotar_sem_reserva():
+    # Tarefas em andamento sem reserva vêm de dados anteriores às reservas
+    # (um único "Fazendo" global) ou de reservas perdidas: a primeira fica
+    # com TRABALHADOR e as demais voltam para a fila.
+    with armazenamento.transacao():
+        for tarefa in armazenamento.sem_reserva():
+            if armazenamento.reserva(TRABALHADOR) is None:
+                armazenamento.reservar(TRABALHADOR, tarefa, None)
+            else:
+                tarefas.alterar_status(tarefa, "Pendente")
+
+def devolver_reservas_vencidas(agora=None):
+    agora = datetime.now() if agora is None else agora
+    with armazenamento.transacao():
+        vencidas = armazenamento.reservas_vencidas(para_epoca(agora))
+        for trabalhador, tarefa in vencidas:
+            tarefas.alterar_status(tarefa, "Pendente")
+            armazenamento.liberar(trabalhador)
+    return [tarefa for _, tarefa in vencidas]
+
+def reservar_proxima(trabalhador, duracao=DURACAO_RESERVA):
+    agora = datetime.now()
+    with armazenamento.transacao():
+        devolver_reservas_vencidas(agora)
+        if armazenamento.reserva(trabalhador) is not None:
+            raise ValueError("Já existe uma tarefa em andamento.")
+        tarefa = armazenamento.proxima_pendente()
+        if tarefa is not None:
+            tarefas.alterar_status(tarefa, "Fazendo")
+            armazenamento.reservar(trabalhador, tarefa, None if duracao is None else para_epoca(agora + duracao))
+    return tarefa
+
+# Reserva uma tarefa para cada um de vários trabalhadores em uma transação só:
+# o BEGIN IMMEDIATE e o COMMIT (e a trava de escrita do banco) são pagos uma
+# vez por lote. Quem já tem tarefa em andamento fica de fora; quem fica sem
+# tarefa porque a fila acabou recebe None.
+def reservar_proximas(trabalhadores, duracao=DURACAO_RESERVA):
+    agora = datetime.now()
+    expira = None if duracao is None else para_epoca(agora + duracao)
+    reservadas = {}
+    with armazenamento.transacao():
+        devolver_reservas_vencidas(agora)
+        for trabalhador in trabalhadores:
+            if armazenamento.reserva(trabalhador) is not None:
+                continue
+            tarefa = armazenamento.proxima_pendente()
+            if tarefa is not None:
+                tarefas.alterar_status(tarefa, "Fazendo")
+                armazenamento.reservar(trabalhador, tarefa, expira)
+            reservadas[trabalhador] = tarefa
+    return reservadas
+
+def renovar_reserva(trabalhador, duracao=DURACAO_RESERVA):
+    with armazenamento.transacao():
+        tarefa = armazenamento.reserva(trabalhador)
+        if tarefa is None:
+            raise ValueError("Nenhuma tarefa em andamento.")
+        armazenamento.reservar(trabalhador, tarefa, para_epoca(datetime.now() + duracao))
+    return tarefa
+
+def iniciar_proxima_tarefa(trabalhador=TRABALHADOR):
+    return reservar_proxima(trabalhador, duracao=None)
+
+def proxima_tarefa():
+    return armazenamento.proxima_pendente()
+
+def alterar_prioridade(id_tarefa, prioridade):
+    tarefa = tarefas.obter(id_tarefa)
+    if tarefa is None:
+        raise ValueError("ID inválido.")
+    if not validar_prioridade(prioridade):
+        raise ValueError("Prioridade inválida.")
+    tarefas.alterar_prioridade(tarefa, prioridade)
+    return tarefa
+
+def concluir_tarefa_atual(trabalhador=TRABALHADOR):
+    with armazenamento.transacao():
+        tarefa = armazenamento.reserva(trabalhador)
+        if tarefa is not None:
+            tarefas.alterar_status(tarefa, "Concluída", data_conclusao=datetime.now())
+            armazenamento.liberar(trabalhador)
+    return tarefa
+
+def concluir_tarefas_atuais(trabalhadores):
+    concluidas = []
+    with armazenamento.transacao():
+        for trabalhador in trabalhadores:
+            tarefa = concluir_tarefa_atual(trabalhador)
+            if tarefa is not None:
+                concluidas.append(tarefa)
+    return concluidas
+
+def remover_tarefa(id_tarefa):
+    tarefa = tarefas.obter(id_tarefa)
+    if tarefa is None:
+        raise ValueError("ID inválido.")
+    status_anterior = tarefa["status"]
+    with armazenamento.transacao():
+        tarefas.alterar_status(tarefa, "Excluída")
+        if not save_arquivadas([tarefa]):
+            tarefas.alterar_status(tarefa, status_anterior)
+            return None
+        tarefas.remover(id_tarefa)
+    return tarefa
+
+def arquivar_concluidas(retencao=None):
+    retencao = RETENCAO if retencao is None else retencao
+    with armazenamento.transacao():
+        a_remover = armazenamento.concluidas_antes(para_epoca(datetime.now() - retencao))
+        for tarefa in a_remover:
+            tarefas.alterar_status(tarefa, "Arquivado")
+        if not save_arquivadas(a_remover):
+            for tarefa in a_remover:
+                tarefas.alterar_status(tarefa, "Concluída")
+            return None
+        for t in a_remover:
+            tarefas.remover(t["id"])
+    return a_remover
+
+def buscar_tarefas(consulta, modo="ranqueado", status=None, prioridade=None, limite=20):
+    if modo not in MODOS_BUSCA:
+        raise ValueError("Modo de busca inválido.")
+    if status is not None and not validar_status(status):
+        raise ValueError("Status inválido.")
+    if prioridade is not None and not validar_prioridade(prioridade):
+        raise ValueError("Prioridade inválida.")
+    return armazenamento.buscar(consulta, modo, status, prioridade, limite)
+
+def listar_pagina(ordem="id", cursor=None, limite=paginacao.TAMANHO_PAGINA, status=None, prioridade=None):
+    if ordem not in paginacao.ORDENS:
+        raise ValueError("Ordem inválida.")
+    if limite < 1:
+        raise ValueError("Limite inválido.")
+    if status is not None and not validar_status(status):
+        raise ValueError("Status inválido.")
+    if prioridade is not None and not validar_prioridade(prioridade):
+        raise ValueError("Prioridade inválida.")
+    return armazenamento.pagina(ordem, cursor, limite, status, prioridade)
+
+def listar_tarefas(status=None, prioridade=None):
+    # Com um filtro, só as tarefas dele são lidas (e, no snapshot binário,
+    # decodificadas).
+    if status is not None and not validar_status(status):
+        raise ValueError("Status inválido.")
+    if prioridade is not None and not validar_prioridade(prioridade):
+        raise ValueError("Prioridade inválida.")
+    if status is not None:
+        encontradas = tarefas.com_status(status)
+    elif prioridade is not None:
+        encontradas = tarefas.com_prioridade(prioridade)
+    else:
+        encontradas = tarefas
+    return sorted(
+        (t for t in encontradas if prioridade is None or t.prioridade == prioridade),
+        key=lambda t: t.id,
+    )
+
+def validar_mes(mes):
+    try:
+        datetime.strptime(mes, "%Y-%m")
+    except (TypeError, ValueError):
+        return False
+    return len(mes) == 7
+
+def exportar_arquivadas(caminho, ate=None):
+    if ate is not None and not validar_mes(ate):
+        raise ValueError("Mês inválido; use AAAA-MM.")
+    return armazenamento.exportar_arquivadas(caminho, ate)
+
+def podar_arquivadas(ate, exportar_para=None):
+    if not validar_mes(ate):
+        raise ValueError("Mês inválido; use AAAA-MM.")
+    if exportar_para is not None:
+        armazenamento.exportar_arquivadas(exportar_para, ate)
+    return armazenamento.podar_arquivadas(ate)
+
+def fluxo_eventos():
+    if armazenamento.eventos is None:
+        raise ValueError("O fluxo de eventos está desligado (TAREFAS_EVENTOS=0).")
+    return armazenamento.eventos
+
+def mostrar_eventos(desde=None, assinante=None, seguir=False, saida=None):
+    fluxo = fluxo_eventos()
+    saida = sys.stdout if saida is None else saida
+    assinatura = fluxo.assinatura(assinante) if assinante else None
+    if desde is None:
+        desde = fluxo.inicio() if assinatura is None else assinatura.offset
+    eventos = fluxo.acompanhar(desde) if seguir else fluxo.ler(desde, None)
+    mostrados = 0
+    ultimo = None
+    try:
+        for ultimo in eventos:
+            saida.write(json.dumps(ultimo, ensure_ascii=False, separators=(",", ":")) + "\n")
+            mostrados += 1
+            if seguir:
+                saida.flush()
+                # O offset só é salvo depois que os eventos saíram; no pior
+                # caso, os últimos são mostrados de novo na próxima vez.
+                if assinatura is not None and mostrados % 1000 == 0:
+                    assinatura.confirmar(ultimo)
+    finally:
+        saida.flush()
+        if assinatura is not None and ultimo is not None:
+            assinatura.confirmar(ultimo)
+    return mostrados
+
+def podar_eventos(antes_de=None):
+    return fluxo_eventos().podar(antes_de)
+
+def varrer_em_segundo_plano():
+    with trava:
+        arquivar_concluidas()
+
+varredura = VarreduraPeriodica(INTERVALO_VARREDURA, varrer_em_segundo_plano)
 
 def criar_tarefa():
     print("Executando criar_tarefa")
-    global tarefas, id_counter
     titulo = input("Título da tarefa (obrigatório): ").strip()
     if not titulo:
         print("Título é obrigatório.")
@@ -87,86 +465,74 @@ def criar_tarefa():
         if validar_origem(origem):
             break
         print("Origem inválida. Tente novamente.")
-    tarefa = {
-        "id": id_counter,
-        "titulo": titulo,
-        "descricao": descricao,
-        "prioridade": prioridade,
-        "status": "Pendente",
-        "origem": origem,
-        "data_criacao": datetime.now(),
-        "data_conclusao": None
-    }
-    tarefas.append(tarefa)
-    id_counter += 1
+    adicionar_tarefa(titulo, descricao, prioridade, origem)
     print("Tarefa criada com sucesso!")
 
 def verificar_urgencia():
     print("Executando verificar_urgencia")
-    global tarefas
-    prioridades = ["Urgente", "Alta", "Média", "Baixa"]
-    if any(t["status"] == "Fazendo" for t in tarefas):
-        print("Já existe uma tarefa em andamento.")
+    try:
+        tarefa = iniciar_proxima_tarefa()
+    except ValueError as e:
+        print(e)
+        return
+    if tarefa is None:
+        print("Não há tarefas pendentes.")
         return
-    for prioridade in prioridades:
-        for tarefa in tarefas:
-            if tarefa["prioridade"] == prioridade and tarefa["status"] == "Pendente":
-                tarefa["status"] = "Fazendo"
-                print("Tarefa selecionada para execução:")
-                print(f"ID: {tarefa['id']} | Título: {tarefa['titulo']} | Prioridade: {tarefa['prioridade']} | Status: {tarefa['status']}")
-                return
-    print("Não há tarefas pendentes.")
+    print("Tarefa selecionada para execução:")
+    print(f"ID: {tarefa['id']} | Título: {tarefa['titulo']} | Prioridade: {tarefa['prioridade']} | Status: {tarefa['status']}")
+
+def escolher_id(mensagem, formatar, ordem="id"):
+    # O ID pode ser digitado direto; a lista paginada só aparece se pedida.
+    while True:
+        resposta = input(f"{mensagem} (Enter para listar): ").strip()
+        if resposta:
+            try:
+                id_escolha = int(resposta)
+            except ValueError:
+                print("Digite um ID numérico válido.")
+                continue
+        else:
+            print("Tarefas disponíveis:")
+            id_escolha = paginacao.Visao(armazenamento, formatar, ordem).navegar(escolher=True)
+            if id_escolha is None:
+                continue
+        if id_escolha in tarefas:
+            return id_escolha
+        print("ID inválido.")
 
 def atualizar_prioridade():
     print("Executando atualizar_prioridade")
-    global tarefas
     if not tarefas:
         print("Nenhuma tarefa cadastrada.")
         return
-    print("Tarefas disponíveis:")
-    for t in tarefas:
-        print(f"ID: {t['id']} - {t['titulo']} (Prioridade: {t['prioridade']})")
-    while True:
-        try:
-            id_escolha = int(input("Digite o ID da tarefa para alterar prioridade: "))
-            tarefa = next((t for t in tarefas if t["id"] == id_escolha), None)
-            if tarefa:
-                break
-            print("ID inválido.")
-        except ValueError:
-            print("Digite um ID numérico válido.")
+    id_escolha = escolher_id(
+        "Digite o ID da tarefa para alterar prioridade",
+        lambda t: f"ID: {t['id']} - {t['titulo']} (Prioridade: {t['prioridade']})",
+        ordem="prioridade",
+    )
+    tarefa = tarefas.obter(id_escolha)
     print("Prioridades possíveis: Urgente, Alta, Média, Baixa")
     while True:
         nova_prioridade = input("Nova prioridade: ").strip()
         if validar_prioridade(nova_prioridade):
-            tarefa["prioridade"] = nova_prioridade
+            alterar_prioridade(tarefa["id"], nova_prioridade)
             print("Prioridade atualizada com sucesso!")
             break
         print("Prioridade inválida. Tente novamente.")
 
 def concluir_tarefa():
     print("Executando concluir_tarefa")
-    global tarefas
-    tarefa_fazendo = next((t for t in tarefas if t["status"] == "Fazendo"), None)
+    tarefa_fazendo = concluir_tarefa_atual()
     if not tarefa_fazendo:
         print("Nenhuma tarefa em andamento para concluir.")
         return
-    tarefa_fazendo["status"] = "Concluída"
-    tarefa_fazendo["data_conclusao"] = datetime.now()
     print(f"Tarefa '{tarefa_fazendo['titulo']}' concluída.")
 
 def arquivar_tarefas_antigas():
     print("Executando arquivar_tarefas_antigas")
-    global tarefas
-    agora = datetime.now()
-    a_remover = []
-    for tarefa in tarefas:
-        if tarefa["status"] == "Concluída" and tarefa["data_conclusao"] and (agora - tarefa["data_conclusao"]) > timedelta(days=7):
-            tarefa["status"] = "Arquivado"
-            save_arquivadas(tarefa)
-            a_remover.append(tarefa)
-    for t in a_remover:
-        tarefas.remove(t)
+    a_remover = arquivar_concluidas()
+    if a_remover is None:
+        return
     if a_remover:
         print(f"{len(a_remover)} tarefa(s) arquivada(s).")
     else:
@@ -174,60 +540,130 @@ def arquivar_tarefas_antigas():
 
 def excluir_tarefa():
     print("Executando excluir_tarefa")
-    global tarefas
     if not tarefas:
         print("Nenhuma tarefa cadastrada.")
         return
-    print("Tarefas disponíveis:")
-    for t in tarefas:
-        print(f"ID: {t['id']} - {t['titulo']} (Status: {t['status']})")
-    while True:
-        try:
-            id_escolha = int(input("Digite o ID da tarefa para excluir: "))
-            tarefa = next((t for t in tarefas if t["id"] == id_escolha), None)
-            if tarefa:
-                tarefa["status"] = "Excluída"
-                save_arquivadas(tarefa)
-                tarefas.remove(tarefa)
-                print("Tarefa excluída com sucesso!")
-                break
-            print("ID inválido.")
-        except ValueError:
-            print("Digite um ID numérico válido.")
+    id_escolha = escolher_id(
+        "Digite o ID da tarefa para excluir",
+        lambda t: f"ID: {t['id']} - {t['titulo']} (Status: {t['status']})",
+    )
+    if remover_tarefa(id_escolha):
+        print("Tarefa excluída com sucesso!")
 
 def relatorio():
     print("Executando relatorio")
-    global tarefas
     if not tarefas:
         print("Nenhuma tarefa cadastrada.")
         return
     print("Relatório de Tarefas:")
-    for t in tarefas:
-        tempo_execucao = ""
-        if t["status"] == "Concluída" and t["data_conclusao"]:
-            delta = t["data_conclusao"] - t["data_criacao"]
-            tempo_execucao = f" | Tempo de Execução: {delta}"
-        print(f"ID: {t['id']} | Título: {t['titulo']} | Descrição: {t['descricao']} | Prioridade: {t['prioridade']} | Status: {t['status']} | Origem: {t['origem']} | Data Criação: {t['data_criacao'].strftime('%d/%m/%Y %H:%M')}{tempo_execucao}")
-
-def relatorio_arquivados():
+    paginacao.Visao(armazenamento, formatar_relatorio, cache=cache_relatorios).navegar()
+
+def formatar_relatorio(t):
+    tempo_execucao = ""
+    if t["status"] == "Concluída" and t["data_conclusao"]:
+        delta = t["data_conclusao"] - t["data_criacao"]
+        tempo_execucao = f" | Tempo de Execução: {delta}"
+    return f"ID: {t['id']} | Título: {t['titulo']} | Descrição: {t['descricao']} | Prioridade: {t['prioridade']} | Status: {t['status']} | Origem: {t['origem']} | Data Criação: {t['data_criacao'].strftime('%d/%m/%Y %H:%M')}{tempo_execucao}"
+
+def relatorio_arquivados(**filtros):
     print("Executando relatorio_arquivados")
     try:
-        if not os.path.exists("tarefas_arquivadas.json"):
+        if BACKEND == "json" and FRAGMENTOS == 1 and not os.path.isdir(os.path.join(DIRETORIO_DADOS, DIRETORIO_ARQUIVADAS)):
             print("Nenhum arquivo de arquivados encontrado.")
             return
-        with open("tarefas_arquivadas.json", "r", encoding="utf-8") as f:
-            arquivadas = json.load(f)
-        arquivadas_filtradas = [t for t in arquivadas if t["status"] == "Arquivado"]
-        if not arquivadas_filtradas:
+        filtros.setdefault("status", "Arquivado")
+        encontrou = False
+        for linha in cache_relatorios.arquivadas(formatar_arquivada, **filtros):
+            if not encontrou:
+                print("Relatório de Tarefas Arquivadas:")
+                encontrou = True
+            print(linha)
+        if not encontrou:
             print("Nenhuma tarefa arquivada.")
-            return
-        print("Relatório de Tarefas Arquivadas:")
-        for t in arquivadas_filtradas:
-            print(f"ID: {t['id']} | Título: {t['titulo']} | Descrição: {t['descricao']} | Prioridade: {t['prioridade']} | Status: {t['status']} | Origem: {t['origem']} | Data Criação: {t['data_criacao']}")
     except Exception as e:
         print(f"Erro ao carregar relatório arquivado: {e}")
 
+def formatar_arquivada(t):
+    return f"ID: {t['id']} | Título: {t['titulo']} | Descrição: {t['descricao']} | Prioridade: {t['prioridade']} | Status: {t['status']} | Origem: {t['origem']} | Data Criação: {t['data_criacao']}"
+
+def resumo_arquivadas():
+    particoes = armazenamento.particoes_arquivadas()
+    if not particoes:
+        print("Nenhuma tarefa arquivada.")
+        return
+    print(f"{'Mês':<8} {'Status':<10} {'Tarefas':>10} {'Bytes':>12}")
+    for p in particoes:
+        tamanho = "-" if p["bytes"] is None else p["bytes"]
+        print(f"{p['mes']:<8} {p['status']:<10} {p['quantidade']:>10} {tamanho:>12}")
+
+def painel():
+    print("Executando painel")
+    try:
+        linhas = cache_relatorios.agregado("painel", calcular_painel)
+    except Exception as e:
+        print(f"Erro ao carregar painel: {e}")
+        return
+    print("\n".join(linhas))
+
+def calcular_painel():
+    import analise
+    colunas = analise.carregar(tarefas, armazenamento.ler_arquivadas())
+    if not len(colunas):
+        return ["Nenhuma tarefa cadastrada."]
+    linhas = ["Painel de Indicadores:"]
+    for campo in ("prioridade", "origem"):
+        linhas.append(f"Por {campo}:")
+        for rotulo, r in analise.resumo_por(colunas, campo).items():
+            tempo_medio = timedelta(seconds=round(r["tempo_medio"])) if r["tempo_medio"] is not None else "-"
+            linhas.append(f"  {rotulo}: {r['total']} tarefa(s) | Concluídas: {r['concluidas']} | Vazão: {r['vazao_diaria']:.1f}/dia | Tempo Médio: {tempo_medio}")
+    contagem = analise.contar_por(colunas, "status")
+    linhas.append("Por status: " + " | ".join(f"{status}: {n}" for status, n in contagem.items()))
+    percentis = analise.percentis_conclusao(colunas)
+    if percentis[50] is not None:
+        linhas.append("Tempo até conclusão: " + " | ".join(f"p{p}: {timedelta(seconds=round(s))}" for p, s in percentis.items()))
+    return linhas
+
+def buscar():
+    print("Executando buscar")
+    consulta = input("Palavras a buscar (+palavra exige, -palavra exclui): ").strip()
+    modo = input("Modo (ranqueado ou booleano, Enter para ranqueado): ").strip() or "ranqueado"
+    status = input("Status (Enter para todos): ").strip() or None
+    prioridade = input("Prioridade (Enter para todas): ").strip() or None
+    try:
+        encontradas = buscar_tarefas(consulta, modo, status, prioridade)
+    except ValueError as e:
+        print(e)
+        return
+    if not encontradas:
+        print("Nenhuma tarefa encontrada.")
+        return
+    print("Tarefas Encontradas:")
+    for t in encontradas:
+        print(f"ID: {t['id']} | Título: {t['titulo']} | Descrição: {t['descricao']} | Prioridade: {t['prioridade']} | Status: {t['status']}")
+
+def ativar_estatisticas(perfil=None, memoria=False):
+    metricas.ativar(perfil, memoria)
+    metricas.instrumentar(sys.modules[__name__], OPERACOES_MEDIDAS, "tarefas")
+    metricas.instrumentar(type(armazenamento), CHAMADAS_ARMAZENAMENTO, "armazenamento")
+    for nome, metodos in COMPONENTES_MEDIDOS.items():
+        componente = getattr(armazenamento, nome, None)
+        if componente is not None:
+            metricas.instrumentar(type(componente), metodos, nome)
+
+def estatisticas():
+    if not metricas.ativo():
+        ativar_estatisticas()
+        print("Coleta de estatísticas ativada. Escolha esta opção de novo para ver os números.")
+        return
+    print("Estatísticas de Desempenho:")
+    metricas.imprimir()
+    for nome in ("linhas", "paginas", "agregados"):
+        lru = getattr(cache_relatorios, nome)
+        print(f"Cache de {nome}: {len(lru)} entrada(s) | Acertos: {lru.acertos} | Falhas: {lru.falhas}")
+
 def menu():
+    if INTERVALO_VARREDURA:
+        varredura.iniciar()
     while True:
         print("\nMenu de Operações:")
         print("1 - Criar Tarefa")
@@ -238,26 +674,176 @@ def menu():
         print("6 - Excluir Tarefa")
         print("7 - Relatório")
         print("8 - Relatório Arquivados")
+        print("10 - Painel de Indicadores")
+        print("11 - Estatísticas de Desempenho")
+        print("12 - Buscar Tarefas")
         print("9 - Sair")
         escolha = input("Escolha uma opção: ").strip()
-        if escolha == "1":
-            criar_tarefa()
-        elif escolha == "2":
-            verificar_urgencia()
-        elif escolha == "3":
-            atualizar_prioridade()
-        elif escolha == "4":
-            concluir_tarefa()
-        elif escolha == "5":
-            arquivar_tarefas_antigas()
-        elif escolha == "6":
-            excluir_tarefa()
-        elif escolha == "7":
-            relatorio()
-        elif escolha == "8":
-            relatorio_arquivados()
-        elif escolha == "9":
-            save_data
-            break
-        else:
-            print("Opção invalida. Tente novamente")
\ No newline at end of file
+        with trava:
+            if escolha == "1":
+                criar_tarefa()
+            elif escolha == "2":
+                verificar_urgencia()
+            elif escolha == "3":
+                atualizar_prioridade()
+            elif escolha == "4":
+                concluir_tarefa()
+            elif escolha == "5":
+                arquivar_tarefas_antigas()
+            elif escolha == "6":
+                excluir_tarefa()
+            elif escolha == "7":
+                relatorio()
+            elif escolha == "8":
+                relatorio_arquivados()
+            elif escolha == "10":
+                painel()
+            elif escolha == "11":
+                estatisticas()
+            elif escolha == "12":
+                buscar()
+            elif escolha == "9":
+                save_data()
+                break
+            else:
+                print("Opção invalida. Tente novamente")
+    varredura.parar()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sistema de Gestão de Tarefas")
+    parser.add_argument("--stats", "--estatisticas", dest="estatisticas", action="store_true",
+                        help="mede as operações e mostra as estatísticas ao sair")
+    parser.add_argument("--perfil", metavar="ARQUIVO", help="grava um cProfile da sessão (implica --stats)")
+    parser.add_argument("--memoria", action="store_true", help="acompanha as alocações com tracemalloc (implica --stats)")
+    comandos = parser.add_subparsers(dest="comando")
+    importar = comandos.add_parser("importar", help="importa tarefas em lote da entrada padrão")
+    importar.add_argument("--formato", choices=["csv", "jsonl"], default="csv",
+                          help="csv com cabeçalho titulo,descricao,prioridade,origem, ou uma tarefa JSON por linha")
+    carga = comandos.add_parser("importar-despejo", help="importa um despejo completo (.json ou .jsonl) com IDs novos")
+    carga.add_argument("arquivo")
+    carga.add_argument("--processos", type=int, help="processos em paralelo (padrão: um por núcleo)")
+    descarga = comandos.add_parser("exportar", help="exporta as tarefas ativas para um despejo .json ou .jsonl")
+    descarga.add_argument("arquivo")
+    descarga.add_argument("--processos", type=int, help="processos em paralelo (padrão: um por núcleo)")
+    arquivadas = comandos.add_parser("arquivadas", help="resume, consulta, exporta ou apaga as tarefas arquivadas")
+    acoes = arquivadas.add_subparsers(dest="acao")
+    acoes.add_parser("resumo", help="tarefas arquivadas por mês e status (padrão)")
+    consulta = acoes.add_parser("relatorio", help="relatório das arquivadas em um período")
+    consulta.add_argument("--de", type=datetime.fromisoformat, metavar="AAAA-MM-DD", help="data inicial (inclusiva)")
+    consulta.add_argument("--ate", type=datetime.fromisoformat, metavar="AAAA-MM-DD", help="data final (exclusiva)")
+    consulta.add_argument("--conclusao", action="store_true", help="filtra pela data de conclusão, não a de criação")
+    consulta.add_argument("--status", choices=["Arquivado", "Excluída"], default="Arquivado")
+    exportar = acoes.add_parser("exportar", help="copia as arquivadas para um arquivo JSONL")
+    exportar.add_argument("saida")
+    exportar.add_argument("--ate", metavar="AAAA-MM", help="só os meses anteriores a este")
+    podar = acoes.add_parser("podar", help="apaga as arquivadas dos meses anteriores a --ate")
+    podar.add_argument("--ate", metavar="AAAA-MM", required=True)
+    podar.add_argument("--exportar", metavar="ARQUIVO", help="exporta antes de apagar")
+    fluxo = comandos.add_parser("eventos", help="mostra o fluxo de alterações em JSONL, a partir de um offset")
+    fluxo.add_argument("--desde", type=int, metavar="OFFSET",
+                       help="primeiro offset (padrão: o salvo pelo assinante, ou o mais antigo)")
+    fluxo.add_argument("--assinante", metavar="NOME", help="retoma do offset salvo com esse nome e o atualiza")
+    fluxo.add_argument("--seguir", action="store_true", help="continua esperando por eventos novos (Ctrl+C encerra)")
+    fluxo.add_argument("--podar", action="store_true", help="apaga os segmentos já lidos por todos os assinantes")
+    proxima = comandos.add_parser("proxima", help="mostra a próxima tarefa pendente pela política de escolha")
+    proxima.add_argument("--reservar", action="store_true",
+                         help="reserva a tarefa para --trabalhador por TAREFAS_RESERVA_MINUTOS")
+    proxima.add_argument("--trabalhador", default=TRABALHADOR, help="padrão: TAREFAS_TRABALHADOR")
+    varrer = comandos.add_parser("arquivar", help="arquiva as tarefas concluídas há mais que a retenção")
+    varrer.add_argument("--dias", type=float, help="retenção em dias (padrão: TAREFAS_RETENCAO_DIAS)")
+    listagem = comandos.add_parser("relatorio", help="lista as tarefas ativas em ordem de ID")
+    listagem.add_argument("--status", choices=["Pendente", "Fazendo", "Concluída"])
+    listagem.add_argument("--prioridade", choices=list(CODIGO_PRIORIDADE))
+    servidor = comandos.add_parser("servidor", help="atende pedidos HTTP/JSON em um socket local")
+    servidor.add_argument("--host", default="127.0.0.1")
+    servidor.add_argument("--porta", type=int, default=8080)
+    args = parser.parse_args(argv)
+    if args.estatisticas or args.perfil or args.memoria:
+        ativar_estatisticas(args.perfil, args.memoria)
+    # "eventos" só lê o fluxo: não carrega as tarefas nem trava os arquivos delas.
+    # "proxima" e "relatorio" não mexem nas arquivadas: pulam a manutenção
+    # delas na carga.
+    if args.comando != "eventos":
+        try:
+            load_data(manutencao=args.comando not in ("proxima", "relatorio"))
+        except ArmazenamentoOcupado as e:
+            sys.exit(str(e))
+    if args.comando == "importar":
+        import lote
+        entrada = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        criadas, erros = importar_tarefas(lote.ler(entrada, args.formato))
+        for linha, mensagem in erros:
+            print(f"Registro {linha}: {mensagem}", file=sys.stderr)
+        print(f"{len(criadas)} tarefa(s) importada(s).")
+        armazenamento.persistir()
+    elif args.comando == "importar-despejo":
+        try:
+            criadas, erros = importar_despejo(args.arquivo, args.processos)
+        except OSError as e:
+            sys.exit(f"Erro ao ler o despejo: {e}")
+        for numero, mensagem in erros:
+            print(f"Registro {numero}: {mensagem}" if numero else mensagem, file=sys.stderr)
+        print(f"{len(criadas)} tarefa(s) importada(s).")
+        armazenamento.persistir()
+    elif args.comando == "exportar":
+        try:
+            print(f"{exportar_despejo(args.arquivo, args.processos)} tarefa(s) exportada(s) para {args.arquivo}.")
+        except OSError as e:
+            sys.exit(f"Erro ao exportar: {e}")
+    elif args.comando == "arquivadas":
+        try:
+            if args.acao == "relatorio":
+                relatorio_arquivados(
+                    status=args.status, inicio=args.de, fim=args.ate,
+                    campo_data="data_conclusao" if args.conclusao else "data_criacao",
+                )
+            elif args.acao == "exportar":
+                print(f"{exportar_arquivadas(args.saida, args.ate)} tarefa(s) exportada(s) para {args.saida}.")
+            elif args.acao == "podar":
+                print(f"{podar_arquivadas(args.ate, args.exportar)} tarefa(s) arquivada(s) apagada(s).")
+            else:
+                resumo_arquivadas()
+        except (OSError, ValueError) as e:
+            sys.exit(f"Erro nas arquivadas: {e}")
+    elif args.comando == "eventos":
+        try:
+            if args.podar:
+                print(f"{podar_eventos()} evento(s) apagado(s).")
+            else:
+                mostrar_eventos(args.desde, args.assinante, args.seguir)
+        except KeyboardInterrupt:
+            pass
+        except (OSError, ValueError) as e:
+            sys.exit(f"Erro no fluxo de eventos: {e}")
+    elif args.comando == "proxima":
+        try:
+            tarefa = reservar_proxima(args.trabalhador) if args.reservar else proxima_tarefa()
+        except ValueError as e:
+            sys.exit(str(e))
+        print("Não há tarefas pendentes." if tarefa is None else formatar_relatorio(tarefa))
+        if args.reservar:
+            armazenamento.persistir()
+    elif args.comando == "arquivar":
+        arquivadas_agora = arquivar_concluidas(None if args.dias is None else timedelta(days=args.dias))
+        if arquivadas_agora is None:
+            sys.exit(1)
+        print(f"{len(arquivadas_agora)} tarefa(s) arquivada(s).")
+        armazenamento.persistir()
+    elif args.comando == "relatorio":
+        encontradas = listar_tarefas(args.status, args.prioridade)
+        if not encontradas:
+            print("Nenhuma tarefa encontrada.")
+        for tarefa in encontradas:
+            print(formatar_relatorio(tarefa))
+    elif args.comando == "servidor":
+        import servidor as servidor_http
+        servidor_http.executar(args.host, args.porta)
+    else:
+        menu()
+    if metricas.ativo():
+        metricas.encerrar(sys.stderr)
+
+if __name__ == "__main__":
+    # servidor.py importa "tarefas": que ele use este módulo, já carregado.
+    sys.modules.setdefault("tarefas", sys.modules[__name__])
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# tarefas.py cria o armazenamento ao ser importado; os testes usam um
+# diretório de dados temporário em vez do diretório atual.
+os.environ.setdefault("TAREFAS_DIRETORIO", tempfile.mkdtemp(prefix="tarefas-testes-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from armazenamento import ArmazenamentoJSON
+from modelo import Tarefa
+
+
+class TestTrocaDeFormato(unittest.TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp(prefix="tarefas-formato-")
+
+    def abrir(self, formato):
+        def caminho(nome):
+            return os.path.join(self.diretorio, nome)
+        armazenamento = ArmazenamentoJSON(
+            caminho("tarefas.json"), caminho("tarefas.bin"), caminho("tarefas.log"), caminho("tarefas_arquivadas"),
+            (), caminho("tarefas_reservas.json"), formato=formato,
+        )
+        armazenamento.carregar()
+        return armazenamento
+
+    def gravar(self, formato, id_tarefa):
+        armazenamento = self.abrir(formato)
+        armazenamento.tarefas.adicionar(
+            Tarefa(id_tarefa, f"tarefa {id_tarefa}", "", "Alta", "Pendente", "E-mail", datetime.now())
+        )
+        armazenamento.salvar()
+        armazenamento.fechar()
+
+    def ids(self, formato):
+        armazenamento = self.abrir(formato)
+        try:
+            return sorted(t.id for t in armazenamento.tarefas)
+        finally:
+            armazenamento.fechar()
+
+    def test_binario_para_json(self):
+        self.gravar("json", 1)
+        self.gravar("binario", 2)
+        self.assertEqual(self.ids("json"), [1, 2])
+
+    def test_json_para_binario(self):
+        self.gravar("binario", 1)
+        self.gravar("json", 2)
+        self.assertEqual(self.ids("binario"), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
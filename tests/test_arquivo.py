@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+import unittest
+
+from arquivo import ArquivoTarefas
+
+
+def _registro(id_tarefa, status="Arquivado"):
+    return {
+        "id": id_tarefa, "titulo": f"tarefa {id_tarefa}", "descricao": "", "prioridade": "Alta",
+        "status": status, "origem": "E-mail", "data_criacao": "2026-09-01T10:00:00",
+        "data_conclusao": "2026-09-02T10:00:00",
+    }
+
+
+class TestArquivo(unittest.TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp(prefix="tarefas-arquivo-")
+        self.antigo = os.path.join(self.diretorio, "antigas.jsonl")
+
+    def gravar_antigo(self, registros):
+        with open(self.antigo, "w", encoding="utf-8") as f:
+            for t in registros:
+                f.write(json.dumps(t) + "\n")
+
+    def ids(self):
+        return sorted(t["id"] for t in ArquivoTarefas(self.diretorio).ler())
+
+    def test_indice_sem_arquivo_vira_particao_vazia(self):
+        arquivo = ArquivoTarefas(self.diretorio)
+        self.gravar_antigo([_registro(1), _registro(2)])
+        arquivo.migrar(self.antigo)
+        arquivo.gravar_indices()
+        particao, = arquivo.particoes()
+        os.remove(particao.caminho)
+        self.assertEqual(self.ids(), [])
+        particao, = ArquivoTarefas(self.diretorio).particoes()
+        self.assertEqual(particao.quantidade, 0)
+
+    def test_migracao_repetida_nao_duplica(self):
+        registros = [_registro(1), _registro(2), _registro(3, "Excluída")]
+        # Uma migração anterior anexou parte do arquivo e caiu antes de renomeá-lo.
+        self.gravar_antigo(registros[:1])
+        ArquivoTarefas(self.diretorio).migrar(self.antigo)
+        self.gravar_antigo(registros)
+        self.assertEqual(ArquivoTarefas(self.diretorio).migrar(self.antigo), 3)
+        self.assertEqual(self.ids(), [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
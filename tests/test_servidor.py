@@ -0,0 +1,35 @@
+import asyncio
+import unittest
+
+from servidor import ErroHTTP, Servidor
+import tarefas as app
+
+
+class TestLimites(unittest.TestCase):
+    def despachar(self, caminho, consulta):
+        return asyncio.run(Servidor(None).despachar("GET", caminho, consulta, {}))
+
+    def test_limite_abaixo_de_um_e_recusado(self):
+        for caminho in ("/tarefas", "/pagina", "/busca", "/arquivadas"):
+            for limite in ("0", "-1"):
+                with self.subTest(caminho=caminho, limite=limite):
+                    with self.assertRaises(ErroHTTP) as erro:
+                        self.despachar(caminho, {"limite": limite})
+                    self.assertEqual(erro.exception.status, 400)
+
+    def test_offset_negativo_e_recusado(self):
+        for caminho in ("/tarefas", "/arquivadas"):
+            with self.subTest(caminho=caminho):
+                with self.assertRaises(ErroHTTP) as erro:
+                    self.despachar(caminho, {"offset": "-1"})
+                self.assertEqual(erro.exception.status, 400)
+
+    def test_limite_um_devolve_uma_tarefa(self):
+        for titulo in ("primeira", "segunda"):
+            app.adicionar_tarefa(titulo, "", "Alta", "E-mail")
+        status, lista = self.despachar("/tarefas", {"limite": "1"})
+        self.assertEqual((status, len(lista)), (200, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()